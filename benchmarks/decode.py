@@ -0,0 +1,60 @@
+"""Benchmark decoding MARC in the main process against decode_records.
+
+The bibs of a synthetic catalog in a SQLite stand-in are fetched once,
+undecoded, and then decoded serially and in process pools of
+``--workers`` processes, both returning whole records and with a
+transform that returns a single subfield.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import standin
+
+from pyvger.marc import decode_records
+
+
+def first_note(record):
+    """Pick out one value, as an export transform would."""
+    return record["500"]["a"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bibs", type=int, default=5000)
+    parser.add_argument("--workers", default="2,4,8,16")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "voyager.db")
+    standin.populate(db_path, bibs=args.bibs, holdings_per_bib=1)
+    voy = standin.StandInVoy(db_path)
+    bibs = list(voy.iter_bibs(lib_id=1, include_suppressed=True, arraysize=1000))
+    raws = [bib.raw_marc for bib in bibs]
+    print("%d bibs on %d CPUs" % (len(bibs), os.cpu_count()))
+
+    def fresh():
+        for bib, raw in zip(bibs, raws):
+            bib.record = raw
+        return bibs
+
+    start = time.perf_counter()
+    for bib in fresh():
+        bib.record
+    elapsed = time.perf_counter() - start
+    print("serial decode: %.0f records/s" % (len(bibs) / elapsed))
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        for transform in (None, first_note):
+            start = time.perf_counter()
+            count = sum(1 for _ in decode_records(fresh(), workers=workers, transform=transform))
+            elapsed = time.perf_counter() - start
+            print(
+                "decode_records, %d workers%s: %.0f records/s"
+                % (workers, ", transform" if transform else "", count / elapsed)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark raw MARC export against parsing records with iter_bibs.
+
+Both write the bibs of a synthetic catalog in a SQLite stand-in, whose
+round trips are delayed by ``--latency`` seconds, to a file.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bibs", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.001)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "voyager.db")
+    standin.populate(db_path, bibs=args.bibs, holdings_per_bib=1)
+    voy = standin.StandInVoy(db_path, latency=args.latency)
+
+    start = time.perf_counter()
+    count = 0
+    with open(os.path.join(workdir, "parsed.mrc"), "wb") as fp:
+        for bib in voy.iter_bibs(lib_id=1, include_suppressed=True, arraysize=1000):
+            fp.write(bib.record.as_marc())
+            count += 1
+    elapsed = time.perf_counter() - start
+    print("iter_bibs + as_marc: %d records, %.0f records/s" % (count, count / elapsed))
+
+    for name in ("raw.mrc", "raw.mrc.gz"):
+        stats = voy.export_raw_bibs(
+            os.path.join(workdir, name), lib_id=1, include_suppressed=True
+        )
+        print(
+            "export_raw_bibs to %s: %d records, %.0f records/s, %d bytes"
+            % (name, stats["records"], stats["records_per_second"], stats["bytes"])
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""Benchmark bulk iteration with different cursor fetch sizes.
+
+Runs ``iter_bibs`` and ``iter_items`` over a synthetic catalog in a
+SQLite stand-in whose round trips are delayed by ``--latency`` seconds,
+once for each ``--arraysize``, and reports records per second and the
+number of round trips made.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bibs", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--arraysize", type=int, nargs="*", default=[100, 1000, 5000])
+    parser.add_argument("--prefetchrows", type=int, default=None)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), "voyager.db")
+    standin.populate(db_path, bibs=args.bibs)
+    voy = standin.StandInVoy(db_path, latency=args.latency)
+
+    scans = {
+        "iter_bibs": lambda **kw: voy.iter_bibs(lib_id=1, include_suppressed=True, **kw),
+        "iter_items": lambda **kw: voy.iter_items(locations=[1, 2, 3], **kw),
+    }
+    for name, scan in scans.items():
+        for arraysize in args.arraysize:
+            before = voy.connection.round_trips
+            start = time.perf_counter()
+            count = sum(1 for _ in scan(arraysize=arraysize, prefetchrows=args.prefetchrows))
+            elapsed = time.perf_counter() - start
+            print(
+                "%s arraysize=%d: %d records, %.0f records/s, %d round trips"
+                % (name, arraysize, count, count / elapsed, voy.connection.round_trips - before)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Benchmark the memory used to hold many items.
+
+Compares a list of ItemRecords with the same records stored in a
+__dict__ (as ItemRecord used to be), and an ItemBatch. Text values are
+built separately for every item, as they are when read from a database.
+"""
+import argparse
+import random
+import tracemalloc
+
+from pyvger.core import ItemBatch, ItemRecord
+
+
+class DictItemRecord(object):
+    """ItemRecord attributes kept in an instance __dict__."""
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+def make_values(count, seed=0):
+    """Generate the attributes of count items."""
+    rng = random.Random(seed)
+    for item_id in range(1, count + 1):
+        yield {
+            "holding_id": item_id // 2 + 1,
+            "item_id": item_id,
+            "item_type_id": rng.randint(1, 20),
+            "perm_location_id": rng.randint(1, 300),
+            "add_item_to_top": False,
+            "caption": "",
+            "chron": "%d" % rng.randint(1950, 2020),
+            "copy_number": rng.randint(0, 3),
+            "enumeration": "v.%d" % rng.randint(1, 40),
+            "free_text": "",
+            "media_type_id": None,
+            "piece_count": 1,
+            "price": "%d.%02d" % (rng.randint(0, 200), rng.randint(0, 99)),
+            "spine_label": "",
+            "temp_location_id": None,
+            "temp_type_id": None,
+            "year": "",
+            "voyager_interface": None,
+            "note": None,
+            "notes": [],
+            "barcode": "3%013d" % item_id,
+            "statuses": [" ".join(("Not", "Charged"))] if rng.random() < 0.9 else ["Charged"],
+        }
+
+
+def measure(build, count):
+    """Get the bytes allocated by build for count items."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(make_values(count))
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=200000)
+    args = parser.parse_args()
+
+    builds = {
+        "dict-based records": lambda values: [DictItemRecord(**v) for v in values],
+        "ItemRecord (__slots__)": lambda values: [ItemRecord(**v) for v in values],
+        "ItemBatch": lambda values: ItemBatch.from_items(ItemRecord(**v) for v in values),
+    }
+    for name, build in builds.items():
+        used = measure(build, args.items)
+        print("%s: %.1f MB, %.0f bytes/item" % (name, used / 1e6, used / args.items))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark tag-projected field extraction against full pymarc decoding.
+
+Both read tags 001, 035, 245 and 852 from a synthetic corpus of
+bibliographic records with ``--notes`` other fields each.
+"""
+import argparse
+import random
+import time
+
+import pymarc
+
+from pyvger.marc import extract_fields
+
+TAGS = ("001", "035", "245", "852")
+
+
+def make_corpus(count, notes, seed=0):
+    """Build a list of MARC records as bytes."""
+    rng = random.Random(seed)
+    corpus = []
+    for n in range(count):
+        record = pymarc.Record(force_utf8=True)
+        record.add_field(pymarc.Field(tag="001", data=str(n)))
+        record.add_field(pymarc.Field(tag="008", data="200101s2020    pau           000 0 eng d"))
+        record.add_field(
+            pymarc.Field(tag="035", indicators=[" ", " "], subfields=[pymarc.Subfield("a", "(OCoLC)%d" % n)])
+        )
+        record.add_field(
+            pymarc.Field(
+                tag="245",
+                indicators=["1", "0"],
+                subfields=[pymarc.Subfield("a", "Title number %d :" % n), pymarc.Subfield("b", "a subtitle.")],
+            )
+        )
+        for m in range(rng.randint(notes // 2, notes * 3 // 2)):
+            record.add_field(
+                pymarc.Field(
+                    tag=rng.choice(("500", "504", "650", "700")),
+                    indicators=[" ", "0"],
+                    subfields=[pymarc.Subfield("a", "Note %d on record %d, with some extra words." % (m, n))],
+                )
+            )
+        record.add_field(
+            pymarc.Field(
+                tag="852", indicators=["0", " "], subfields=[pymarc.Subfield("b", "hill"), pymarc.Subfield("h", "QA76")]
+            )
+        )
+        corpus.append(record.as_marc())
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--notes", type=int, default=20)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.records, args.notes)
+
+    def full(marc):
+        return pymarc.Record(marc).get_fields(*TAGS)
+
+    def projected(marc):
+        return extract_fields(marc, TAGS)
+
+    for name, extract in (("pymarc", full), ("extract_fields", projected)):
+        start = time.perf_counter()
+        count = sum(len(extract(marc)) for marc in corpus)
+        elapsed = time.perf_counter() - start
+        print("%s: %d fields, %.0f records/s" % (name, count, len(corpus) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Benchmark ItemRecord.save one item at a time against Voy.save_items.
+
+Items of a synthetic catalog in a SQLite stand-in, whose round trips are
+delayed by ``--latency`` seconds, are saved through a fake BatchCat
+client whose calls take ``--batchcat-latency`` seconds.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import standin
+
+from pyvger.test.fakebatchcat import FakeBatchCatClient
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bibs", type=int, default=250)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--batchcat-latency", type=float, default=0.002)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "voyager.db")
+    standin.populate(db_path, bibs=args.bibs)
+    voy = standin.StandInVoy(db_path, latency=args.latency, cat_location="hill")
+
+    voy.batchcat = FakeBatchCatClient(voy, latency=args.batchcat_latency)
+    start = time.perf_counter()
+    count = 0
+    for item in list(voy.iter_items(locations=[1, 2, 3], include_suppressed_mfhd=True)):
+        voy._cat_location_id = None  # as before save_items, a lookup per item
+        item.save()
+        count += 1
+    elapsed = time.perf_counter() - start
+    print("iter_items + ItemRecord.save: %d items, %.0f items/s" % (count, count / elapsed))
+
+    voy.batchcat = FakeBatchCatClient(voy, latency=args.batchcat_latency)
+    start = time.perf_counter()
+    stats = voy.save_items(voy.iter_items(locations=[1, 2, 3], include_suppressed_mfhd=True))
+    elapsed = time.perf_counter() - start
+    print(
+        "save_items(iter_items): %d items, %.0f items/s overall, %d failed"
+        % (stats["saved"], stats["saved"] / elapsed, stats["failed"])
+    )
+
+
+if __name__ == "__main__":
+    main()
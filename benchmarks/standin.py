@@ -0,0 +1,375 @@
+"""SQLite stand-in for a Voyager Oracle database, used by the benchmarks.
+
+The schema only has the columns pyvger uses. A shim rewrites the
+Oracle-specific ``utl_i18n.string_to_raw`` call so the SQL in
+``pyvger.core`` runs unchanged, and can imitate the network round trips
+of a remote Oracle server.
+"""
+import datetime
+import hashlib
+import queue
+import random
+import sqlite3
+import time
+
+import pymarc
+
+import sqlalchemy as sqla
+
+from pyvger.core import Voy
+
+SCHEMA = """
+CREATE TABLE bib_master (bib_id INTEGER PRIMARY KEY, suppress_in_opac TEXT,
+    library_id INTEGER, create_date TIMESTAMP);
+CREATE TABLE bib_data (bib_id INTEGER, seqnum INTEGER, record_segment TEXT);
+CREATE TABLE bib_history (bib_id INTEGER, action_date TIMESTAMP);
+CREATE TABLE bib_location (bib_id INTEGER, location_id INTEGER);
+CREATE TABLE bib_mfhd (bib_id INTEGER, mfhd_id INTEGER);
+CREATE TABLE bib_index (bib_id INTEGER, index_code TEXT, normal_heading TEXT);
+CREATE TABLE bib_text (bib_id INTEGER, title TEXT);
+CREATE TABLE mfhd_master (mfhd_id INTEGER PRIMARY KEY, suppress_in_opac TEXT,
+    location_id INTEGER, display_call_no TEXT);
+CREATE TABLE mfhd_data (mfhd_id INTEGER, seqnum INTEGER, record_segment TEXT);
+CREATE TABLE mfhd_history (mfhd_id INTEGER, action_date TIMESTAMP);
+CREATE TABLE location (location_id INTEGER PRIMARY KEY, location_code TEXT,
+    location_display_name TEXT, library_id INTEGER);
+CREATE TABLE item (item_id INTEGER PRIMARY KEY, perm_location INTEGER,
+    item_type_id INTEGER, copy_number INTEGER, media_type_id INTEGER,
+    pieces INTEGER, price INTEGER, spine_label TEXT, temp_location INTEGER,
+    temp_item_type_id INTEGER);
+CREATE TABLE mfhd_item (mfhd_id INTEGER, item_id INTEGER, item_enum TEXT,
+    chron TEXT, caption TEXT, freetext TEXT, year TEXT);
+CREATE TABLE item_note (item_id INTEGER, item_note TEXT);
+CREATE TABLE item_barcode (item_id INTEGER, item_barcode TEXT,
+    barcode_status TEXT);
+CREATE TABLE item_status (item_id INTEGER, item_status INTEGER);
+CREATE TABLE item_status_type (item_status_type INTEGER PRIMARY KEY,
+    item_status_desc TEXT);
+CREATE TABLE patron (patron_id INTEGER PRIMARY KEY, last_name TEXT);
+CREATE TABLE patron_address (patron_id INTEGER, address_line1 TEXT);
+CREATE TABLE circ_transactions (patron_id INTEGER, item_id INTEGER);
+CREATE TABLE call_slip (call_slip_id INTEGER PRIMARY KEY, item_id INTEGER);
+CREATE TABLE elink_index (record_id INTEGER, link TEXT);
+"""
+
+
+# Store datetimes in the format sqlalchemy binds them in, so that dates
+# compare equal however they got into the database.
+sqlite3.register_adapter(
+    datetime.datetime, lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")
+)
+
+
+class ShimCursor(sqlite3.Cursor):
+    """Cursor that translates Oracle function names for SQLite.
+
+    Like a cx_Oracle cursor, executing a statement is one round trip that
+    also returns the first ``prefetchrows`` rows, and every later
+    ``arraysize`` rows take another round trip. Each round trip sleeps
+    for the connection's latency.
+    """
+
+    prefetchrows = 2
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.arraysize = 100
+        self._buffered = 0
+
+    def _round_trip(self):
+        self.connection.round_trips += 1
+        if self.connection.latency:
+            time.sleep(self.connection.latency)
+
+    def _fetched(self, count):
+        for _ in range(count):
+            if self._buffered <= 0:
+                self._round_trip()
+                self._buffered = self.arraysize
+            self._buffered -= 1
+
+    def execute(self, sql, parameters=()):
+        sql = sql.replace("utl_i18n.string_to_raw", "utl_i18n_string_to_raw")
+        self.connection.statements += 1
+        self._round_trip()
+        self._buffered = self.prefetchrows
+        return super().execute(sql, parameters)
+
+    def __next__(self):
+        row = super().__next__()
+        self._fetched(1)
+        return row
+
+    def fetchone(self):
+        row = super().fetchone()
+        if row is not None:
+            self._fetched(1)
+        return row
+
+    def fetchmany(self, size=None):
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = super().fetchall()
+        self._fetched(len(rows))
+        return rows
+
+
+class ShimConnection(sqlite3.Connection):
+    """Connection whose cursors are ShimCursors.
+
+    :ivar latency: seconds each round trip takes
+    :ivar round_trips: number of round trips made so far
+    :ivar statements: number of statements executed so far
+    """
+
+    latency = 0
+    round_trips = 0
+    statements = 0
+
+    def cursor(self, factory=ShimCursor):
+        return super().cursor(factory)
+
+
+def _string_to_raw(value):
+    if value is None:
+        return None
+    return value.encode("utf8")
+
+
+def connect(path, schema="pittdb", latency=0):
+    """Open the stand-in database at path, attached under the schema name.
+
+    :param path: path of the database file
+    :param schema: schema name to attach the database as
+    :param latency: seconds each round trip takes
+    """
+    conn = sqlite3.connect(
+        ":memory:", factory=ShimConnection, check_same_thread=False
+    )
+    conn.latency = latency
+    conn.create_function("utl_i18n_string_to_raw", 1, _string_to_raw)
+    conn.execute("ATTACH DATABASE ? AS %s" % schema, (path,))
+    return conn
+
+
+def create_schema(path, schema="pittdb"):
+    """Create the stand-in tables in a new database file."""
+    conn = connect(path, schema)
+    for statement in SCHEMA.split(";"):
+        if statement.strip():
+            conn.execute(
+                statement.replace("CREATE TABLE ", "CREATE TABLE %s." % schema, 1)
+            )
+    conn.commit()
+    return conn
+
+
+def _marc(control_number, notes, extra_tag=None):
+    """Build a MARC record as text, padded with notes to the wanted size."""
+    record = pymarc.Record()
+    record.add_field(pymarc.Field(tag="001", data=str(control_number)))
+    if extra_tag is not None:
+        record.add_field(pymarc.Field(tag=extra_tag, data=str(control_number)))
+    for n in range(notes):
+        record.add_field(
+            pymarc.Field(
+                tag="500",
+                indicators=[" ", " "],
+                subfields=[pymarc.Subfield("a", "Note %d for record %d." % (n, control_number))],
+            )
+        )
+    return record.as_marc().decode("utf8")
+
+
+def _segments(marc, size=990):
+    """Split a record the way Voyager stores it in record_segment rows."""
+    return [marc[i : i + size] for i in range(0, len(marc), size)]
+
+
+def populate(path, bibs=1000, holdings_per_bib=2, items_per_holding=2, seed=0):
+    """Create and fill a stand-in database with a synthetic catalog.
+
+    Bibs get several ``bib_data`` segments, and every bib, holding and item
+    gets history, barcode and status rows. Roughly one record in seven is
+    suppressed.
+
+    :param path: path of the new database file
+    :param bibs: number of bibliographic records
+    :param holdings_per_bib: number of holdings attached to each bib
+    :param items_per_holding: number of items attached to each holding
+    :param seed: random seed, so that catalogs are reproducible
+    """
+    rng = random.Random(seed)
+    conn = create_schema(path)
+    conn.executemany(
+        "INSERT INTO pittdb.location VALUES (?, ?, ?, ?)",
+        [(1, "hill", "Hillman", 1), (2, "law", "Law", 1), (3, "other", "Other", 2)],
+    )
+    conn.executemany(
+        "INSERT INTO pittdb.item_status_type VALUES (?, ?)",
+        [(1, "Not Charged"), (2, "Charged"), (3, "Lost")],
+    )
+    start = datetime.datetime(2015, 1, 1)
+    mfhd_id = item_id = 0
+    for bib_id in range(1, bibs + 1):
+        conn.execute(
+            "INSERT INTO pittdb.bib_master VALUES (?, ?, ?, ?)",
+            (bib_id, "Y" if bib_id % 7 == 0 else "N", 1, start),
+        )
+        marc = _marc(bib_id, rng.randint(5, 60))
+        conn.executemany(
+            "INSERT INTO pittdb.bib_data VALUES (?, ?, ?)",
+            [(bib_id, n, seg) for n, seg in enumerate(_segments(marc), 1)],
+        )
+        conn.executemany(
+            "INSERT INTO pittdb.bib_history VALUES (?, ?)",
+            [(bib_id, start + datetime.timedelta(days=rng.randint(0, 2000))) for _ in range(2)],
+        )
+        for _ in range(holdings_per_bib):
+            mfhd_id += 1
+            location_id = rng.choice((1, 2, 3))
+            conn.execute(
+                "INSERT INTO pittdb.bib_location VALUES (?, ?)", (bib_id, location_id)
+            )
+            conn.execute("INSERT INTO pittdb.bib_mfhd VALUES (?, ?)", (bib_id, mfhd_id))
+            conn.execute(
+                "INSERT INTO pittdb.mfhd_master VALUES (?, ?, ?, ?)",
+                (mfhd_id, "Y" if mfhd_id % 7 == 0 else "N", location_id, "QA%d .P%d" % (bib_id, mfhd_id)),
+            )
+            marc = _marc(mfhd_id, rng.randint(1, 5), extra_tag="004")
+            conn.executemany(
+                "INSERT INTO pittdb.mfhd_data VALUES (?, ?, ?)",
+                [(mfhd_id, n, seg) for n, seg in enumerate(_segments(marc), 1)],
+            )
+            conn.execute(
+                "INSERT INTO pittdb.mfhd_history VALUES (?, ?)",
+                (mfhd_id, start + datetime.timedelta(days=rng.randint(0, 2000))),
+            )
+            for copy_number in range(1, items_per_holding + 1):
+                item_id += 1
+                conn.execute(
+                    "INSERT INTO pittdb.item VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (item_id, location_id, 1, copy_number, None, 1, rng.randint(0, 9999), "", None, None),
+                )
+                conn.execute(
+                    "INSERT INTO pittdb.mfhd_item VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (mfhd_id, item_id, "v.%d" % copy_number, "", "", "", ""),
+                )
+                for n in range(rng.choice((0, 0, 1, 2))):
+                    conn.execute(
+                        "INSERT INTO pittdb.item_note VALUES (?, ?)",
+                        (item_id, "note %d" % n),
+                    )
+                conn.executemany(
+                    "INSERT INTO pittdb.item_barcode VALUES (?, ?, ?)",
+                    [(item_id, "3%013d" % item_id, "1"), (item_id, "9%013d" % item_id, "2")],
+                )
+                conn.execute(
+                    "INSERT INTO pittdb.item_status VALUES (?, ?)",
+                    (item_id, rng.choice((1, 1, 1, 2, 3))),
+                )
+    for statement in (
+        "CREATE INDEX pittdb.bib_data_id ON bib_data (bib_id, seqnum)",
+        "CREATE INDEX pittdb.bib_history_id ON bib_history (bib_id)",
+        "CREATE INDEX pittdb.bib_location_id ON bib_location (bib_id)",
+        "CREATE INDEX pittdb.bib_mfhd_id ON bib_mfhd (bib_id)",
+        "CREATE INDEX pittdb.mfhd_data_id ON mfhd_data (mfhd_id, seqnum)",
+        "CREATE INDEX pittdb.mfhd_history_id ON mfhd_history (mfhd_id)",
+        "CREATE INDEX pittdb.mfhd_item_id ON mfhd_item (item_id)",
+        "CREATE INDEX pittdb.mfhd_item_mfhd ON mfhd_item (mfhd_id)",
+        "CREATE INDEX pittdb.item_note_id ON item_note (item_id)",
+        "CREATE INDEX pittdb.item_barcode_id ON item_barcode (item_id)",
+        "CREATE INDEX pittdb.item_barcode_barcode ON item_barcode (item_barcode)",
+        "CREATE INDEX pittdb.item_status_id ON item_status (item_id)",
+    ):
+        conn.execute(statement)
+    conn.commit()
+    conn.close()
+
+
+class StandInPool(object):
+    """Stand-in for a cx_Oracle SessionPool handing out stand-in connections.
+
+    :param path: path of the stand-in database file
+    :param schema: schema name the database is attached under
+    :param size: maximum number of connections
+    """
+
+    def __init__(self, path, schema, size, latency=0):
+        self.path = path
+        self.schema = schema
+        self.latency = latency
+        self.max = size
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(None)
+
+    def acquire(self):
+        conn = self._idle.get()
+        if conn is None:
+            conn = connect(self.path, self.schema, self.latency)
+        return _PooledConnection(conn, self)
+
+    def release(self, connection):
+        self._idle.put(connection._conn)
+
+    def close(self):
+        pass
+
+
+class _PooledConnection(object):
+    """Connection that returns itself to its pool when closed."""
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def close(self):
+        self._pool.release(self)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class StandInVoy(Voy):
+    """A Voy connected to a stand-in database.
+
+    :param path: path of the stand-in database file
+    :param latency: seconds each round trip to the database takes
+    """
+
+    def __init__(self, path, latency=0, **kwargs):
+        self.standin_path = path
+        self.latency = latency
+        super().__init__(
+            oracleuser="standin", oraclepass="", oracledsn=path, **kwargs
+        )
+
+    def _connect(self, cfg):
+        if cfg.get("pool_max"):
+            self.pool = StandInPool(
+                self.standin_path,
+                self.oracle_database,
+                int(cfg["pool_max"]),
+                self.latency,
+            )
+            self.engine = sqla.create_engine(
+                "sqlite://", creator=self.pool.acquire, poolclass=sqla.pool.NullPool
+            )
+        else:
+            self.connection = connect(
+                self.standin_path, self.oracle_database, self.latency
+            )
+            self.engine = sqla.create_engine(
+                "sqlite://", creator=lambda: self.connection
+            )
+
+    def _schema_fingerprint(self):
+        rows = self.engine.execute(
+            "SELECT name, sql FROM %s.sqlite_master ORDER BY name"
+            % self.oracle_database
+        ).fetchall()
+        return hashlib.sha1(repr(rows).encode("utf8")).hexdigest()
@@ -0,0 +1,68 @@
+"""Benchmark Voy() startup with a cold and a warm schema cache.
+
+Tables are reflected on first use, so each run constructs a Voy and
+then touches the tables named by ``--tables`` (all of them by default).
+
+Run against a real Voyager database with ``--config``, or against a
+local SQLite stand-in whose round trips are delayed by ``--latency``
+seconds to imitate a remote Oracle data dictionary.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from pyvger.constants import TABLE_NAMES
+from pyvger.core import Voy
+from pyvger.schema import SchemaCache
+
+import standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--config", help="pyvger configuration file")
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tables", nargs="*", default=TABLE_NAMES)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    cache_path = os.path.join(workdir, "schema.cache")
+    if args.config:
+
+        def make_voy():
+            return Voy(config=args.config, schema_cache=cache_path)
+
+    else:
+        db_path = os.path.join(workdir, "voyager.db")
+        standin.create_schema(db_path).close()
+
+        def make_voy():
+            return standin.StandInVoy(
+                db_path, latency=args.latency, schema_cache=cache_path
+            )
+
+    def start_up():
+        start = time.perf_counter()
+        voy = make_voy()
+        for table_name in args.tables:
+            voy.tables[table_name]
+        return time.perf_counter() - start
+
+    timings = {"cold": [], "warm": []}
+    for _ in range(args.repeat):
+        SchemaCache(cache_path).invalidate()
+        timings["cold"].append(start_up())
+        timings["warm"].append(start_up())
+
+    for name, values in timings.items():
+        print(
+            "%s start: median %.4fs, min %.4fs over %d runs"
+            % (name, statistics.median(values), min(values), len(values))
+        )
+
+
+if __name__ == "__main__":
+    main()
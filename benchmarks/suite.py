@@ -0,0 +1,201 @@
+"""Throughput benchmarks for the public Voy API against a synthetic catalog.
+
+A catalog of ``--bibs`` bibs is generated in a SQLite stand-in for the
+Voyager database (see standin.py), whose round trips are delayed by
+``--latency`` seconds. Every case is run once for time and once under
+tracemalloc for memory, and reports records/s, statements executed,
+round trips and peak memory.
+
+Save a run with ``--save`` and check a later one against it with
+``--baseline``. The exit status is 1 if a case got slower by more than
+``--tolerance`` or executes more statements than before.
+
+    python suite.py --bibs 2000 --save before.json
+    python suite.py --bibs 2000 --baseline before.json
+"""
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import sqlalchemy as sqla
+
+import standin
+
+
+def _count(iterable):
+    return sum(1 for _ in iterable)
+
+
+def _cases(sample):
+    """List the benchmark cases as (name, function taking a Voy and returning a record count) tuples."""
+    bibids, mfhdids, item_ids = sample["bibs"], sample["mfhds"], sample["items"]
+    return [
+        ("get_bib", lambda voy: _count(voy.get_bib(bibid)["001"] for bibid in bibids)),
+        ("get_bib fields=001", lambda voy: _count(voy.get_bib(bibid, fields=["001"])["001"] for bibid in bibids)),
+        ("get_bib include=barcodes,statuses", lambda voy: _count(
+            item
+            for bibid in bibids
+            for mfhd in voy.get_bib(bibid, include=("barcodes", "statuses")).holdings()
+            for item in mfhd.get_items(include_barcodes=True, include_statuses=True)
+        )),
+        ("get_raw_bib", lambda voy: _count(voy.get_raw_bib(bibid) for bibid in bibids)),
+        ("get_mfhd", lambda voy: _count(voy.get_mfhd(mfhdid) for mfhdid in mfhdids)),
+        ("get_item", lambda voy: _count(voy.get_item(item_id) for item_id in item_ids)),
+        ("get_item barcode=", lambda voy: _count(voy.get_item(barcode="3%013d" % item_id) for item_id in item_ids)),
+        ("get_items_by_barcodes", lambda voy: len(
+            voy.get_items_by_barcodes("3%013d" % item_id for item_id in sample["all_items"])["items"]
+        )),
+        ("get_item_statuses", lambda voy: _count(voy.get_item_statuses(item_id) for item_id in item_ids)),
+        ("bib_id_for_item", lambda voy: _count(voy.bib_id_for_item(item_id) for item_id in item_ids)),
+        ("get_item_statuses_many", lambda voy: len(voy.get_item_statuses_many(sample["all_items"]))),
+        ("bib_ids_for_items", lambda voy: len(voy.bib_ids_for_items(sample["all_items"]))),
+        ("get_bibs", lambda voy: _count(voy.get_bibs(sample["all_bibs"]))),
+        ("get_mfhds", lambda voy: _count(voy.get_mfhds(sample["all_mfhds"]))),
+        ("get_items", lambda voy: _count(voy.get_items(sample["all_items"]))),
+        ("iter_bibs", lambda voy: _count(voy.iter_bibs(lib_id=1, include_suppressed=True))),
+        ("iter_bibs decoded", lambda voy: _count(
+            bib.record for bib in voy.iter_bibs(lib_id=1, include_suppressed=True)
+        )),
+        ("iter_bibs paged", lambda voy: _count(
+            voy.iter_bibs(lib_id=1, include_suppressed=True, page_size=1000)
+        )),
+        ("iter_mfhds", lambda voy: _count(voy.iter_mfhds(lib_id=1, include_suppressed=True))),
+        ("iter_mfhds stream", lambda voy: _count(
+            voy.iter_mfhds(lib_id=1, include_suppressed=True, stream=True)
+        )),
+        ("iter_items", lambda voy: _count(voy.iter_items(locations=[1, 2, 3], include_suppressed_mfhd=True))),
+        ("iter_items barcodes,statuses", lambda voy: _count(
+            voy.iter_items(
+                locations=[1, 2, 3], include_suppressed_mfhd=True, include_barcodes=True, include_statuses=True
+            )
+        )),
+        ("iter_changed_bibs", lambda voy: _count(voy.iter_changed_bibs())),
+        ("export_raw_bibs", lambda voy: voy.export_raw_bibs(
+            io.BytesIO(), lib_id=1, include_suppressed=True
+        )["records"]),
+        ("export_items_table", lambda voy: voy.export_items_table(
+            io.BytesIO(), locations=[1, 2, 3], include_suppressed_mfhd=True
+        )["rows"]),
+    ]
+
+
+def _run(voy, function, trace):
+    """Run a case, returning its record count, seconds, statements, round trips and peak bytes."""
+    connection = voy.connection
+    statements, round_trips = connection.statements, connection.round_trips
+    if trace:
+        tracemalloc.start()
+    start = time.perf_counter()
+    count = function(voy)
+    seconds = time.perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return (
+        count,
+        seconds,
+        connection.statements - statements,
+        connection.round_trips - round_trips,
+        peak,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bibs", type=int, default=2000)
+    parser.add_argument("--holdings-per-bib", type=int, default=2)
+    parser.add_argument("--items-per-holding", type=int, default=2)
+    parser.add_argument("--sample", type=int, default=200, help="records looked up one at a time")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case; the fastest counts")
+    parser.add_argument("--cases", help="comma-separated names of the cases to run")
+    parser.add_argument("--save", help="file to save the results to, as JSON")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "voyager.db")
+    standin.populate(
+        db_path,
+        bibs=args.bibs,
+        holdings_per_bib=args.holdings_per_bib,
+        items_per_holding=args.items_per_holding,
+    )
+    voy = standin.StandInVoy(db_path, latency=args.latency)
+    mfhds = args.bibs * args.holdings_per_bib
+    items = mfhds * args.items_per_holding
+    rng = random.Random(0)
+    sample = {
+        "bibs": rng.sample(range(1, args.bibs + 1), min(args.sample, args.bibs)),
+        "mfhds": rng.sample(range(1, mfhds + 1), min(args.sample, mfhds)),
+        "items": rng.sample(range(1, items + 1), min(args.sample, items)),
+        "all_bibs": range(1, args.bibs + 1),
+        "all_mfhds": range(1, mfhds + 1),
+        "all_items": range(1, items + 1),
+    }
+    cases = _cases(sample)
+    if args.cases:
+        names = args.cases.split(",")
+        cases = [case for case in cases if case[0] in names]
+
+    # reflect the tables before anything is measured
+    for table_name in voy.tables:
+        try:
+            voy.tables[table_name]
+        except sqla.exc.NoSuchTableError:
+            pass
+    results = {}
+    print("%-36s %8s %10s %10s %11s %9s" % ("case", "records", "records/s", "statements", "round trips", "peak MB"))
+    for name, function in cases:
+        runs = [_run(voy, function, trace=False) for _ in range(args.repeat)]
+        count, seconds, statements, round_trips, _ = min(runs, key=lambda run: run[1])
+        peak = _run(voy, function, trace=True)[4]
+        results[name] = {
+            "records": count,
+            "records_per_second": count / seconds if seconds else 0.0,
+            "statements": statements,
+            "round_trips": round_trips,
+            "peak_bytes": peak,
+        }
+        print(
+            "%-36s %8d %10.0f %10d %11d %9.1f"
+            % (name, count, results[name]["records_per_second"], statements, round_trips, peak / 1e6)
+        )
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump({"args": vars(args), "results": results}, fp, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)["results"]
+        regressions = []
+        for name, result in results.items():
+            before = baseline.get(name)
+            if before is None:
+                continue
+            if result["records_per_second"] < before["records_per_second"] * (1 - args.tolerance):
+                regressions.append(
+                    "%s: %.0f records/s, was %.0f"
+                    % (name, result["records_per_second"], before["records_per_second"])
+                )
+            if result["statements"] > before["statements"]:
+                regressions.append(
+                    "%s: %d statements, was %d" % (name, result["statements"], before["statements"])
+                )
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
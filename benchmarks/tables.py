@@ -0,0 +1,62 @@
+"""Benchmark export_items_table against writing iter_items results to CSV.
+
+Both write the items of a synthetic catalog in a SQLite stand-in, whose
+round trips are delayed by ``--latency`` seconds. Parquet and Arrow
+output need pyarrow.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+import tracemalloc
+
+import standin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--bibs", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.001)
+    parser.add_argument("--formats", default="csv,parquet,arrow")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    db_path = os.path.join(workdir, "voyager.db")
+    standin.populate(db_path, bibs=args.bibs)
+    voy = standin.StandInVoy(db_path, latency=args.latency)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = 0
+    with open(os.path.join(workdir, "iter_items.csv"), "w", newline="") as fp:
+        writer = csv.writer(fp)
+        for item in voy.iter_items(locations=[1, 2, 3], include_suppressed_mfhd=True):
+            writer.writerow(
+                [item.item_id, item.holding_id, item.perm_location_id, item.temp_location_id, item.copy_number,
+                 item.price, item.spine_label, item.enumeration, item.chron, " | ".join(item.notes)]
+            )
+            count += 1
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print("iter_items + csv: %d rows, %.0f rows/s, peak %.1f MB" % (count, count / elapsed, peak / 1e6))
+
+    for table_format in args.formats.split(","):
+        tracemalloc.start()
+        stats = voy.export_items_table(
+            os.path.join(workdir, "items." + table_format),
+            locations=[1, 2, 3],
+            include_suppressed_mfhd=True,
+            batch_size=5000,
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(
+            "export_items_table to %s: %d rows, %.0f rows/s, peak %.1f MB"
+            % (table_format, stats["rows"], stats["rows_per_second"], peak / 1e6)
+        )
+
+
+if __name__ == "__main__":
+    main()
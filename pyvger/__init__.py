@@ -1,6 +1,7 @@
 """pyvger - interact with Ex Libris Voyager."""
 import os
 
+from pyvger.aio import AsyncVoy
 from pyvger.core import Voy
 from pyvger.helper import recode
 from pyvger.version import __version__
@@ -8,4 +9,4 @@ from pyvger.version import __version__
 os.environ["NLS_LANG"] = "American_America.UTF8"
 
 
-__all__ = ["Voy", "__version__", "recode"]
+__all__ = ["AsyncVoy", "Voy", "__version__", "recode"]
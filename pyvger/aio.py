@@ -0,0 +1,122 @@
+"""asyncio interface to Voyager."""
+import asyncio
+from concurrent import futures
+import functools
+import itertools
+import weakref
+
+
+class AsyncVoy(object):
+    """
+    Awaitable interface to a Voy object.
+
+    The blocking database calls of the wrapped Voy run in a bounded
+    thread pool, so many lookups can be awaited at once without blocking
+    the event loop and without a thread per request.
+
+    Each database call, and each async iterator for as long as it runs,
+    takes one of max_concurrency slots, so that no more sessions are
+    used at once than the Voy's session pool has: max_concurrency is
+    lowered to pool_max if it is larger. Calls beyond that wait for a
+    slot. A Voy without a session pool has a single connection, which
+    can't be used from several threads at once, so its calls are run one
+    at a time. An iterator holds its slot until it is exhausted or
+    closed, and one using workers (see Voy.iter_bibs) uses more sessions
+    than the slot accounts for.
+
+    :param voy: the Voy to use; give it a session pool (pool_max) to run calls concurrently
+    :param max_concurrency: maximum number of database calls and iterators running at once
+    :param executor: concurrent.futures.Executor to run calls in; by default a thread pool of max_concurrency threads
+    :param chunk_size: number of records an async iterator fetches from the database thread at a time
+    """
+
+    def __init__(self, voy, max_concurrency=8, executor=None, chunk_size=100):
+        if voy.pool is None:
+            max_concurrency = 1
+        else:
+            max_concurrency = max(1, min(max_concurrency, voy.pool.max))
+        self.voy = voy
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self._own_executor = executor is None
+        if executor is None:
+            executor = futures.ThreadPoolExecutor(max_workers=max_concurrency)
+        self.executor = executor
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def _semaphore(self):
+        """Get the semaphore limiting concurrency on the running event loop."""
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return semaphore
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a blocking function in the executor, within the concurrency limit."""
+        async with self._semaphore():
+            return await self._run_unlimited(func, *args, **kwargs)
+
+    async def _run_unlimited(self, func, *args, **kwargs):
+        """Run a blocking function in the executor, for a caller that already holds a slot."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def get_bib(self, bibid, fields=None):
+        """Get a bibliographic record; see Voy.get_bib."""
+        return await self._run(self.voy.get_bib, bibid, fields=fields)
+
+    async def get_mfhd(self, mfhdid, fields=None):
+        """Get a holdings record; see Voy.get_mfhd."""
+        return await self._run(self.voy.get_mfhd, mfhdid, fields=fields)
+
+    async def get_item(self, item_id=None, barcode=None):
+        """Get an item record; see Voy.get_item."""
+        return await self._run(self.voy.get_item, item_id=item_id, barcode=barcode)
+
+    async def _iterate(self, make_iterator):
+        """Drive a blocking iterator from the executor, a chunk at a time.
+
+        The iterator keeps a session while it streams, so it holds a slot
+        from start to finish.
+        """
+        async with self._semaphore():
+            iterator = await self._run_unlimited(make_iterator)
+            try:
+                while True:
+                    chunk = await self._run_unlimited(
+                        lambda: list(itertools.islice(iterator, self.chunk_size))
+                    )
+                    if not chunk:
+                        return
+                    for record in chunk:
+                        yield record
+            finally:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    await self._run_unlimited(close)
+
+    def iter_bibs(self, *args, **kwargs):
+        """Iterate asynchronously over bibs; takes the arguments of Voy.iter_bibs."""
+        return self._iterate(lambda: self.voy.iter_bibs(*args, **kwargs))
+
+    def iter_mfhds(self, *args, **kwargs):
+        """Iterate asynchronously over holdings; takes the arguments of Voy.iter_mfhds."""
+        return self._iterate(lambda: self.voy.iter_mfhds(*args, **kwargs))
+
+    def iter_items(self, *args, **kwargs):
+        """Iterate asynchronously over items; takes the arguments of Voy.iter_items."""
+        return self._iterate(lambda: self.voy.iter_items(*args, **kwargs))
+
+    def close(self):
+        """Shut down the executor if this object created it."""
+        if self._own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,225 @@
+"""Read-through cache of MARC records fetched from Voyager."""
+from collections import OrderedDict
+import pickle
+import sqlite3
+import threading
+
+
+class CacheEntry(object):
+    """
+    A cached record.
+
+    :param last_date: most recent history action_date when the record was fetched
+    :param data: database values the record is built from; the MARC bytes come first
+    :param record: built record object, or None if it hasn't been built yet
+    """
+
+    __slots__ = ("last_date", "data", "record")
+
+    def __init__(self, last_date, data, record=None):
+        self.last_date = last_date
+        self.data = data
+        self.record = record
+
+    @property
+    def size(self):
+        """Get the size of the entry's MARC data in bytes."""
+        return len(self.data[0])
+
+
+class SQLiteRecordStore(object):
+    """
+    On-disk store of record data in a SQLite database.
+
+    Only the database values are stored, never built record objects, so
+    entries survive between processes and pyvger versions.
+
+    :param path: path of the SQLite database file
+    :param table: name of the table to keep records in
+    """
+
+    def __init__(self, path, table="pyvger_record"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS %s (key TEXT PRIMARY KEY, value BLOB)"
+                % table
+            )
+
+    def get(self, key):
+        """Get the (last_date, data) tuple saved for key, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM %s WHERE key = ?" % self.table, (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return pickle.loads(row[0])
+
+    def put(self, key, last_date, data):
+        """Save the data of a record and the date it was last changed."""
+        value = pickle.dumps((last_date, data), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO %s (key, value) VALUES (?, ?)" % self.table,
+                (key, value),
+            )
+
+    def delete(self, key):
+        """Remove the record saved for key."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM %s WHERE key = ?" % self.table, (key,))
+
+    def clear(self):
+        """Remove every record."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM %s" % self.table)
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
+
+
+class RecordCache(object):
+    """
+    Least-recently-used cache of records, with an optional on-disk store.
+
+    Entries are keyed by record type ("bib" or "mfhd") and ID, and carry
+    the record's last history action_date. A lookup with a different
+    date is a miss and drops the stale entry. Entries evicted from
+    memory stay in the store, if there is one, and are promoted back to
+    memory when next used.
+
+    Cached record objects are shared between callers, so they should be
+    treated as read-only.
+
+    :param maxsize: maximum number of records kept in memory
+    :param max_bytes: maximum total size of the MARC data kept in memory, or None for no limit
+    :param store: on-disk store (see SQLiteRecordStore), or None
+    :param validate: whether to check each record's last change date in the database before using it
+
+    :ivar hits: number of lookups answered from memory or the store
+    :ivar misses: number of lookups that had to go to the database
+    :ivar evictions: number of entries dropped from memory to stay within the limits
+    :ivar stale: number of entries dropped because the record had changed
+    """
+
+    def __init__(self, maxsize=10000, max_bytes=None, store=None, validate=True):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.store = store
+        self.validate = validate
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.stale = 0
+        self._bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _store_key(key):
+        return "%s:%s" % key
+
+    def get(self, record_type, record_id, last_date=None):
+        """Look up a record.
+
+        :param record_type: "bib" or "mfhd"
+        :param record_id: Voyager record ID
+        :param last_date: the record's current last change date; ignored unless validating
+        :return: CacheEntry, or None on a miss
+        """
+        key = (record_type, int(record_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self.store is not None:
+                saved = self.store.get(self._store_key(key))
+                if saved is not None:
+                    entry = self._add(key, CacheEntry(*saved))
+            if entry is not None and self.validate and entry.last_date != last_date:
+                self.stale += 1
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, record_type, record_id, last_date, data, record=None):
+        """Add a record, replacing any entry for the same ID.
+
+        :param record_type: "bib" or "mfhd"
+        :param record_id: Voyager record ID
+        :param last_date: the record's last change date
+        :param data: database values the record is built from; the MARC bytes come first
+        :param record: built record object, or None
+        :return: the new CacheEntry
+        """
+        key = (record_type, int(record_id))
+        entry = CacheEntry(last_date, data, record)
+        with self._lock:
+            self._remove(key, from_store=False)
+            if self.store is not None:
+                self.store.put(self._store_key(key), last_date, data)
+            return self._add(key, entry)
+
+    def _add(self, key, entry):
+        """Put an entry in memory, evicting the least recently used ones."""
+        self._entries[key] = entry
+        self._bytes += entry.size
+        while len(self._entries) > 1 and self._over_limit():
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def _over_limit(self):
+        """Check whether memory holds more entries or bytes than allowed."""
+        if len(self._entries) > self.maxsize:
+            return True
+        return self.max_bytes is not None and self._bytes > self.max_bytes
+
+    def _remove(self, key, from_store=True):
+        """Drop an entry from memory and, optionally, from the store."""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+        if from_store and self.store is not None:
+            self.store.delete(self._store_key(key))
+
+    def invalidate(self, record_type, record_id):
+        """Drop a record from the cache."""
+        with self._lock:
+            self._remove((record_type, int(record_id)))
+
+    def clear(self):
+        """Drop every record from memory and the store, and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.stale = 0
+            if self.store is not None:
+                self.store.clear()
+
+    def stats(self):
+        """Get the cache counters and current size.
+
+        :return: dict of hits, misses, evictions, stale, records and bytes
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "stale": self.stale,
+                "records": len(self._entries),
+                "bytes": self._bytes,
+            }
@@ -0,0 +1,111 @@
+"""Checkpoint stores recording how far a scan has progressed."""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+
+
+class FileCheckpoint(object):
+    """
+    Checkpoints stored in a JSON file.
+
+    Each checkpoint is a JSON-serializable value saved under a key; the
+    file is rewritten atomically on every save, so a crash never leaves
+    a half-written checkpoint behind.
+
+    :param path: path of the JSON file
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        try:
+            with open(self.path) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return {}
+
+    def _write(self, checkpoints):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as fp:
+                json.dump(checkpoints, fp, sort_keys=True)
+            os.replace(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, key):
+        """Get the saved value for key, or None if there is none."""
+        with self._lock:
+            return self._read().get(key)
+
+    def save(self, key, value):
+        """Save a value for key."""
+        with self._lock:
+            checkpoints = self._read()
+            checkpoints[key] = value
+            self._write(checkpoints)
+
+    def clear(self, key=None):
+        """Remove the value for key, or every value if key is None."""
+        with self._lock:
+            checkpoints = self._read() if key is not None else {}
+            checkpoints.pop(key, None)
+            self._write(checkpoints)
+
+
+class SQLiteCheckpoint(object):
+    """
+    Checkpoints stored in a SQLite database.
+
+    :param path: path of the SQLite database file
+    :param table: name of the table to keep checkpoints in
+    """
+
+    def __init__(self, path, table="pyvger_checkpoint"):
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS %s (key TEXT PRIMARY KEY, value TEXT)"
+                % table
+            )
+
+    def load(self, key):
+        """Get the saved value for key, or None if there is none."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM %s WHERE key = ?" % self.table, (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0])
+
+    def save(self, key, value):
+        """Save a value for key."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO %s (key, value) VALUES (?, ?)" % self.table,
+                (key, json.dumps(value)),
+            )
+
+    def clear(self, key=None):
+        """Remove the value for key, or every value if key is None."""
+        with self._lock, self._conn:
+            if key is None:
+                self._conn.execute("DELETE FROM %s" % self.table)
+            else:
+                self._conn.execute(
+                    "DELETE FROM %s WHERE key = ?" % self.table, (key,)
+                )
+
+    def close(self):
+        """Close the database connection."""
+        self._conn.close()
@@ -38,4 +38,6 @@ TABLE_NAMES = (
     "circ_transactions",
     "call_slip",
     "elink_index",
+    "bib_history",
+    "mfhd_history",
 )
@@ -1,29 +1,170 @@
 """core pyvger objects."""
+import array
+import contextlib
+import copy
 from decimal import Decimal
+import hashlib
+import itertools
+import json
+import operator
+import sys
+import time
 import warnings
 
 import arrow
 
 import cx_Oracle as cx
 
-import pymarc
-
 import six.moves.configparser as configparser
 
 import sqlalchemy as sqla
 
-from pyvger.constants import RELATIONS, TABLE_NAMES
+from pyvger.cache import RecordCache, SQLiteRecordStore
 from pyvger.exceptions import (
     BatchCatNotAvailableError,
     NoSuchItemException,
     PyVgerException,
 )
+from pyvger.export import table_format, table_writer
+from pyvger.helper import chunked, output_stream, parallel_batches, read_ahead
+from pyvger.instrument import InstrumentedCursor, QueryInstrumentation
+from pyvger.marc import check_marc, decode_marc, extract_fields
+from pyvger.schema import LazyTables, SchemaCache
+from pyvger.tracing import span
 
 try:
     from pyvger import batchcat
 except BatchCatNotAvailableError:
     batchcat = None
 
+# Oracle refuses IN lists with more than 1000 expressions
+MAX_IN_LIST = 1000
+
+# columns of the tables written by Voy.export_items_table and export_holdings_table
+ITEM_TABLE_COLUMNS = [
+    ("item_id", "int"),
+    ("mfhd_id", "int"),
+    ("perm_location", "int"),
+    ("perm_location_code", "str"),
+    ("temp_location", "int"),
+    ("temp_location_code", "str"),
+    ("item_type_id", "int"),
+    ("temp_item_type_id", "int"),
+    ("media_type_id", "int"),
+    ("copy_number", "int"),
+    ("pieces", "int"),
+    ("price_cents", "int"),
+    ("spine_label", "str"),
+    ("item_enum", "str"),
+    ("chron", "str"),
+    ("year", "str"),
+    ("caption", "str"),
+    ("freetext", "str"),
+    ("notes", "list"),
+]
+# related records get_bib, get_bibs and iter_bibs can load along with bibs,
+# and the ones each of them needs
+INCLUDE_OPTIONS = {
+    "holdings": (),
+    "items": ("holdings",),
+    "barcodes": ("holdings", "items"),
+    "statuses": ("holdings", "items"),
+}
+
+HOLDINGS_TABLE_COLUMNS = [
+    ("mfhd_id", "int"),
+    ("bib_id", "int"),
+    ("location_id", "int"),
+    ("location_code", "str"),
+    ("location_display_name", "str"),
+    ("display_call_no", "str"),
+    ("suppressed", "bool"),
+    ("last_date", "datetime"),
+]
+
+# number of IDs per keyset page when a scan is checkpointed but no page size is given
+DEFAULT_PAGE_SIZE = 10000
+
+
+def _checkpoint_key(scan, **filters):
+    """Build a checkpoint key identifying a scan and its filters."""
+    return "%s %s" % (scan, json.dumps(filters, sort_keys=True, default=str))
+
+
+def _bind_list(values, prefix):
+    """Build an Oracle bind-variable list for an IN clause.
+
+    :param values: values to bind
+    :param prefix: prefix for the generated bind names
+    :return: tuple of SQL fragment and bind parameter dict
+    """
+    params = {"%s%d" % (prefix, i): value for i, value in enumerate(values)}
+    return ", ".join(":%s" % name for name in params), params
+
+
+def _suppressed(value, record_type, record_id):
+    """Convert a suppress_in_opac column value to a bool."""
+    if value == "Y":
+        return True
+    elif value == "N":
+        return False
+    raise PyVgerException(
+        "Bad suppression value %r for %s %s" % (value, record_type, record_id)
+    )
+
+
+def _includes(include):
+    """Check the names of related records to load, adding the ones they need.
+
+    :param include: iterable of names from INCLUDE_OPTIONS
+    :return: frozenset of names
+    """
+    names = set()
+    for name in include or ():
+        if name not in INCLUDE_OPTIONS:
+            raise ValueError("can't include %r; options are %s" % (name, ", ".join(INCLUDE_OPTIONS)))
+        names.add(name)
+        names.update(INCLUDE_OPTIONS[name])
+    return frozenset(names)
+
+
+def _intern(value):
+    """Intern strings, so that equal values in a batch share storage."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def _check_marc(marc, record_type, record_id):
+    """Check that a MARC record can be decoded, without decoding it.
+
+    :param marc: bytes of the MARC record
+    :param record_type: "bib" or "mfhd", for error messages
+    :param record_id: Voyager record ID, for error messages
+    """
+    try:
+        check_marc(marc)
+    except ValueError as e:
+        raise PyVgerException(
+            "Can't decode MARC for %s %s" % (record_type, record_id)
+        ) from e
+
+
+def _parse_marc(marc, record_type, record_id):
+    """Decode a single MARC record.
+
+    :param marc: bytes of the MARC record
+    :param record_type: "bib" or "mfhd", for error messages
+    :param record_id: Voyager record ID, for error messages
+    :return: pymarc.Record
+    """
+    try:
+        return decode_marc(marc)
+    except ValueError as e:
+        raise PyVgerException(
+            "Can't decode MARC for %s %s" % (record_type, record_id)
+        ) from e
+
 
 class Voy(object):
     """
@@ -39,10 +180,49 @@ class Voy(object):
     :param voy_path: path to directory containing Voyager.ini for BatchCat
     :param cat_location: location name of cataloging location
     :param library_id: library ID number
+    :param schema_cache: path of a file in which to cache reflected table definitions
+    :param pool_max: maximum number of sessions; if given, use a session pool instead of a single connection
+    :param pool_min: number of sessions the pool opens at startup and keeps open
+    :param pool_increment: number of sessions the pool opens when it needs more
+    :param pool_wait_timeout: milliseconds to wait for a free session before raising an error;
+        by default, wait as long as it takes
+    :param arraysize: number of rows fetched per round trip by every cursor
+    :param prefetchrows: number of rows returned along with the execution of every query (cx_Oracle 8 or later)
+    :param record_cache: pyvger.cache.RecordCache used by get_bib, get_raw_bib and get_mfhd
+    :param record_cache_size: number of records to cache in memory, if record_cache isn't given
+    :param record_cache_path: path of a SQLite file in which to also cache records on disk
+    :param instrumentation: True or a pyvger.instrument.QueryInstrumentation to record the queries run (see instrument)
+    :param tracer: pyvger.tracing.Tracer timing the stages records are built in
+
+    Tables are reflected the first time they're used; see register_table
+    to use tables that aren't in pyvger.constants.TABLE_NAMES.
+
+    With a single connection, every query shares one Oracle session. With a
+    session pool, each query checks a session out of the pool and returns it
+    when done, so one Voy can be used from several threads at once; in that
+    case the connection attribute is None. A thread that needs a session
+    while all pool_max are in use waits for one. The iterators' workers
+    each use a session, so pool_max should be at least the number of
+    workers; an iterator that isn't paged also holds one more while it
+    reads its IDs. Workers only parallelize the queries: records are
+    checked as they are built, in the workers, but their MARC is decoded
+    in the thread that uses it (see pyvger.marc.decode_records to decode
+    on several cores).
+
+    The bulk methods also take arraysize and prefetchrows arguments that
+    override the Voy's settings for their own queries; large values cut
+    the number of round trips when fetching many rows over a slow link.
+
+    With a record cache, get_bib, get_raw_bib and get_mfhd first look up
+    the record's latest history date, which is a single index lookup, and
+    reuse the cached record if it hasn't changed since.
     """
 
     def __init__(self, oracle_database="pittdb", config=None, **kwargs):
         self.connection = None
+        self.pool = None
+        self.instrumentation = None
+        self.tracer = None
         self.oracle_database = oracle_database
         cfg = {}
         if config is not None:
@@ -57,6 +237,15 @@ class Voy(object):
                 "voy_path",
                 "cat_location",
                 "library_id",
+                "schema_cache",
+                "pool_min",
+                "pool_max",
+                "pool_increment",
+                "pool_wait_timeout",
+                "arraysize",
+                "prefetchrows",
+                "record_cache_size",
+                "record_cache_path",
             ]
             for item in config_keys:
                 val = cf.get("Voyager", item, fallback="", raw=True).strip('"')
@@ -69,32 +258,55 @@ class Voy(object):
 
         cfg.update(kwargs)
 
-        if all(arg in cfg for arg in ["oracleuser", "oraclepass", "oracledsn"]):
-            self.connection = cx.connect(
-                cfg["oracleuser"], cfg["oraclepass"], cfg["oracledsn"]
+        self.arraysize = int(cfg["arraysize"]) if cfg.get("arraysize") else None
+        if cfg.get("prefetchrows") not in (None, ""):
+            self.prefetchrows = int(cfg["prefetchrows"])
+        else:
+            self.prefetchrows = None
+
+        if cfg.get("record_cache") is not None:
+            self.record_cache = cfg["record_cache"]
+        elif cfg.get("record_cache_size") or cfg.get("record_cache_path"):
+            self.record_cache = RecordCache(
+                maxsize=int(cfg.get("record_cache_size") or 10000),
+                store=(
+                    SQLiteRecordStore(cfg["record_cache_path"])
+                    if cfg.get("record_cache_path")
+                    else None
+                ),
             )
-            self.engine = sqla.create_engine(
-                "oracle://", creator=lambda: self.connection
+        else:
+            self.record_cache = None
+
+        if cfg.get("instrumentation"):
+            self.instrument(
+                None if cfg["instrumentation"] is True else cfg["instrumentation"]
             )
-            metadata = sqla.MetaData()
-            tables_to_load = TABLE_NAMES
-
-            self.tables = {}
-            for table_name in tables_to_load:
-                self.tables[table_name] = sqla.Table(
-                    table_name,
-                    metadata,
-                    schema=oracle_database,
-                    autoload=True,
-                    autoload_with=self.engine,
-                )
 
-            for parent, foreign in RELATIONS:
-                parent_column = getattr(self.tables[parent[0]].c, parent[1])
-                foreign_key = getattr(self.tables[foreign[0]].c, foreign[1])
-                parent_column.append_foreign_key(sqla.ForeignKey(foreign_key))
+        self.tracer = cfg.get("tracer")
+
+        if cfg.get("schema_cache"):
+            self.schema_cache = SchemaCache(cfg["schema_cache"])
+        else:
+            self.schema_cache = None
+
+        if all(arg in cfg for arg in ["oracleuser", "oraclepass", "oracledsn"]):
+            self._schema_cache_key = "%s@%s/%s" % (
+                cfg["oracleuser"],
+                cfg["oracledsn"],
+                oracle_database,
+            )
+            self._connect(cfg)
+            sqla.event.listen(
+                self.engine, "before_cursor_execute", self._before_cursor_execute
+            )
+            sqla.event.listen(
+                self.engine, "after_cursor_execute", self._after_cursor_execute
+            )
+            self.tables = self._load_tables()
 
         self.cat_location = cfg.get("cat_location")
+        self._cat_location_id = None
         self.library_id = cfg.get("library_id")
 
         if "voy_path" not in cfg:
@@ -112,132 +324,882 @@ class Voy(object):
         else:
             self.batchcat = None
 
+    def _connect(self, cfg):
+        """Open the database connection or session pool and create the sqlalchemy engine."""
+        if cfg.get("pool_max"):
+            # wait for a session when all are in use, instead of failing with ORA-24418
+            if cfg.get("pool_wait_timeout"):
+                wait = {
+                    "getmode": cx.SPOOL_ATTRVAL_TIMEDWAIT,
+                    "wait_timeout": int(cfg["pool_wait_timeout"]),
+                }
+            else:
+                wait = {"getmode": cx.SPOOL_ATTRVAL_WAIT}
+            self.pool = cx.SessionPool(
+                cfg["oracleuser"],
+                cfg["oraclepass"],
+                cfg["oracledsn"],
+                min=int(cfg.get("pool_min", 1)),
+                max=int(cfg["pool_max"]),
+                increment=int(cfg.get("pool_increment", 1)),
+                threaded=True,
+                **wait
+            )
+            # closing a pooled connection releases it back to the session pool
+            self.engine = sqla.create_engine(
+                "oracle://", creator=self.pool.acquire, poolclass=sqla.pool.NullPool
+            )
+        else:
+            self.connection = cx.connect(
+                cfg["oracleuser"], cfg["oraclepass"], cfg["oracledsn"]
+            )
+            self.engine = sqla.create_engine(
+                "oracle://", creator=lambda: self.connection
+            )
+
+    @property
+    def connected(self):
+        """Whether this Voy has a database connection or session pool."""
+        return self.connection is not None or self.pool is not None
+
+    def _set_fetch_sizes(self, cursor, arraysize=None, prefetchrows=None):
+        """Set a cursor's fetch sizes, falling back to this Voy's settings."""
+        if arraysize is None:
+            arraysize = self.arraysize
+        if prefetchrows is None:
+            prefetchrows = self.prefetchrows
+        if arraysize is not None:
+            cursor.arraysize = arraysize
+        if prefetchrows is not None and hasattr(cursor, "prefetchrows"):
+            cursor.prefetchrows = prefetchrows
+        return cursor
+
+    def _before_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        """Apply fetch sizes to cursors created by sqlalchemy."""
+        options = context.execution_options if context is not None else {}
+        self._set_fetch_sizes(
+            cursor, options.get("arraysize"), options.get("prefetchrows")
+        )
+        if self.instrumentation is not None and context is not None:
+            context._pyvger_start = time.perf_counter()
+
+    def _after_cursor_execute(
+        self, conn, cursor, statement, parameters, context, executemany
+    ):
+        """Record a statement run by sqlalchemy, and count the rows fetched from its result."""
+        instrumentation = self.instrumentation
+        if instrumentation is None or context is None:
+            return
+        start = getattr(context, "_pyvger_start", None)
+        if start is None:
+            return
+        stats = instrumentation.record(statement, time.perf_counter() - start)
+        # the result reads from the context's cursor
+        context.cursor = InstrumentedCursor(cursor, instrumentation, stats)
+
+    def instrument(self, instrumentation=None):
+        """Start recording the statements this Voy runs.
+
+        Statements run through sqlalchemy and through the cursors of
+        get_bib, get_mfhd, get_raw_bib, BibRecord.holdings and the other
+        raw SQL methods are counted, with the rows fetched and latency
+        histograms, by the public method that ran them; see
+        pyvger.instrument.QueryInstrumentation. Set the instrumentation
+        attribute to None to stop.
+
+        :param instrumentation: QueryInstrumentation to record into; by default a new one
+        :return: the QueryInstrumentation, whose as_dict and prometheus methods export the data
+        """
+        if instrumentation is None:
+            instrumentation = QueryInstrumentation()
+        self.instrumentation = instrumentation
+        return instrumentation
+
+    def _execute(self, query, arraysize=None, prefetchrows=None):
+        """Execute a sqlalchemy query whose results will be streamed.
+
+        :param query: sqlalchemy query
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: sqlalchemy result
+        """
+        options = {"stream_results": True}
+        if arraysize is not None:
+            options["arraysize"] = arraysize
+        if prefetchrows is not None:
+            options["prefetchrows"] = prefetchrows
+        return self.engine.execute(query.execution_options(**options))
+
+    @contextlib.contextmanager
+    def _cursor(self, arraysize=None, prefetchrows=None):
+        """Get a cursor, checking a session out of the pool if there is one.
+
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        """
+        if self.pool is None:
+            yield self._instrumented(
+                self._set_fetch_sizes(self.connection.cursor(), arraysize, prefetchrows)
+            )
+            return
+        connection = self.pool.acquire()
+        try:
+            yield self._instrumented(
+                self._set_fetch_sizes(connection.cursor(), arraysize, prefetchrows)
+            )
+        finally:
+            self.pool.release(connection)
+
+    def _instrumented(self, cursor):
+        """Wrap a cursor for instrumentation, if it is enabled."""
+        if self.instrumentation is None:
+            return cursor
+        return self.instrumentation.wrap(cursor)
+
+    def close(self):
+        """Close the database connection or session pool."""
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        elif self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _schema_fingerprint(self):
+        """Get a value that changes whenever a table in the schema is altered."""
+        query = sqla.text(
+            """SELECT object_name, TO_CHAR(last_ddl_time, 'YYYYMMDDHH24MISS')
+        FROM all_objects WHERE owner = :owner AND object_type IN ('TABLE', 'VIEW')
+        ORDER BY object_name"""
+        )
+        rows = self.engine.execute(query, owner=self.oracle_database.upper())
+        return hashlib.sha1(repr(rows.fetchall()).encode("utf8")).hexdigest()
+
+    def _load_tables(self):
+        """Create the mapping of lazily reflected tables.
+
+        :return: LazyTables for the tables in TABLE_NAMES
+        """
+        return LazyTables(
+            self.engine,
+            self.oracle_database,
+            cache=self.schema_cache,
+            cache_key=self._schema_cache_key,
+            fingerprint=self._schema_fingerprint,
+        )
+
+    def register_table(self, table_name, relations=()):
+        """Make a table not in TABLE_NAMES available in Voy.tables.
+
+        :param table_name: name of the Voyager table
+        :param relations: pairs of (table, column) tuples, as in pyvger.constants.RELATIONS
+        """
+        self.tables.register(table_name, relations)
+
+    def refresh_schema(self):
+        """Reflect tables again when next used, replacing any cached definitions."""
+        self.tables.refresh()
+
+    def invalidate_schema_cache(self):
+        """Remove this database's table definitions from the schema cache."""
+        if self.schema_cache is not None:
+            self.schema_cache.invalidate(self._schema_cache_key)
+
     def get_raw_bib(self, bibid):
         """Get raw MARC for a bibliographic record.
 
         :param bibid:
         :return: bytes of bib record
         """
-        if self.connection:
-            curs = self.connection.cursor()
-            res = curs.execute(
-                """SELECT
-            utl_i18n.string_to_raw(bib_data.record_segment)
-            as record_segment
-            FROM %(db)s.bib_data
-            WHERE bib_data.bib_id=:bib ORDER BY seqnum"""
-                % {"db": self.oracle_database},
-                {"bib": bibid},
-            )
-            marc_segments = []
-            for data in res:
-                marc_segments.append(data[0])
+        if self.connected:
+            if self.record_cache is not None:
+                entry = self._cached("bib", bibid)
+                if entry is None:
+                    try:
+                        data = self._fetch_bib(bibid)
+                    except PyVgerException:
+                        pass
+                    else:
+                        entry = self.record_cache.put("bib", bibid, data[-1], data)
+                if entry is not None:
+                    return entry.data[0]
+            with self._cursor() as curs:
+                res = curs.execute(
+                    """SELECT
+                utl_i18n.string_to_raw(bib_data.record_segment)
+                as record_segment
+                FROM %(db)s.bib_data
+                WHERE bib_data.bib_id=:bib ORDER BY seqnum"""
+                    % {"db": self.oracle_database},
+                    {"bib": bibid},
+                )
+                marc_segments = []
+                for data in res:
+                    marc_segments.append(data[0])
             return b"".join(marc_segments)
 
-    def get_bib(self, bibid):
+    def get_bib(self, bibid, fields=None, include=()):
         """Get a bibliographic record.
 
+        With a record cache, the cached BibRecord is shared by every caller
+        that gets the record without fields or include; otherwise a new
+        BibRecord is built, so that one caller's projection or related
+        records are never seen by another.
+
         :param bibid: Voyager bibliographic record ID
+        :param fields: list of tags; if given, only these fields are decoded (see BibRecord.project)
+        :param include: related records to load with the bib (see load_related)
         :return: pyvger.core.BibRecord object
         """
-        if self.connection:
-            curs = self.connection.cursor()
+        if self.connected:
             try:
-                res = curs.execute(
-                    """SELECT DISTINCT utl_i18n.string_to_raw(bib_data.record_segment) as record_segment,
-                bib_master.suppress_in_opac, MAX(action_date) over (partition by bib_history.bib_id) maxdate,
-                bib_data.seqnum FROM %(db)s.BIB_HISTORY JOIN %(db)s.bib_master
-                on bib_history.bib_id = bib_master.bib_id JOIN %(db)s.bib_data
-                ON bib_master.bib_id = bib_data.bib_id WHERE bib_history.BIB_ID = :bib
-                ORDER BY seqnum"""
-                    % {"db": self.oracle_database},
-                    {"bib": bibid},
-                )
-                marc_segments = []
-                data = None
-                for data in res:
-                    marc_segments.append(data[0])
-                marc = b"".join(marc_segments)
-                if not marc:
-                    raise PyVgerException("No MARC data for bib %s" % bibid)
-                rec = next(pymarc.MARCReader(marc))
-                if data[1] == "Y":
-                    suppress = True
-                elif data[1] == "N":
-                    suppress = False
+                entry = self._cached("bib", bibid)
+                shared = fields is None and not include
+                if entry is not None and shared:
+                    if entry.record is None:
+                        entry.record = self._make_bib(bibid, *entry.data)
+                    return entry.record
+                if entry is not None:
+                    data = entry.data
                 else:
-                    raise PyVgerException(
-                        "Bad suppression value %r for bib %s" % (data[1], bibid)
-                    )
-                last_date = arrow.get(data[2]).datetime
-                return BibRecord(rec, suppress, bibid, self, last_date)
+                    data = self._fetch_bib(bibid)
+                bib = self._make_bib(bibid, *data, fields=fields)
+                if entry is None and self.record_cache is not None:
+                    self.record_cache.put("bib", bibid, data[-1], data, bib if shared else None)
+                if include:
+                    self.load_related([bib], include)
+                return bib
 
             except Exception:
                 print("error for bibid |%r|" % bibid)
                 raise
 
-    def get_mfhd(self, mfhdid):
-        """Get a HoldingsRecord object for the given Voyager mfhd number.
+    def _fetch_bib(self, bibid):
+        """Fetch the values a BibRecord is built from.
 
-        :param mfhdid: Voyager holdings ID to fetch
-        :return:
+        :param bibid: Voyager bibliographic record ID
+        :return: tuple of MARC bytes, suppress_in_opac value and most recent action_date
         """
-        if self.connection:
-            curs = self.connection.cursor()
+        with span(self.tracer, "fetch", bibid), self._cursor() as curs:
             res = curs.execute(
-                """SELECT DISTINCT utl_i18n.string_to_raw(record_segment)
-             as record_segment,
-             mfhd_master.suppress_in_opac,
-             location.location_code,
-             location.location_display_name,
-             MAX(action_date) over (partition by mfhd_history.mfhd_id) maxdate,
-             mfhd_data.seqnum
-             FROM %(db)s.mfhd_data, %(db)s.mfhd_master, %(db)s.location, %(db)s.mfhd_history
-             WHERE mfhd_data.mfhd_id=:mfhd
-             AND mfhd_data.mfhd_id = mfhd_master.mfhd_id
-             AND location.location_id = mfhd_master.location_id
-             AND mfhd_history.mfhd_id = mfhd_master.mfhd_id
-             ORDER BY seqnum"""
+                """SELECT DISTINCT utl_i18n.string_to_raw(bib_data.record_segment) as record_segment,
+            bib_master.suppress_in_opac, MAX(action_date) over (partition by bib_history.bib_id) maxdate,
+            bib_data.seqnum FROM %(db)s.BIB_HISTORY JOIN %(db)s.bib_master
+            on bib_history.bib_id = bib_master.bib_id JOIN %(db)s.bib_data
+            ON bib_master.bib_id = bib_data.bib_id WHERE bib_history.BIB_ID = :bib
+            ORDER BY seqnum"""
                 % {"db": self.oracle_database},
-                {"mfhd": mfhdid},
+                {"bib": bibid},
             )
             marc_segments = []
             data = None
             for data in res:
                 marc_segments.append(data[0])
+        with span(self.tracer, "join", bibid):
             marc = b"".join(marc_segments)
+        if not marc:
+            raise PyVgerException("No MARC data for bib %s" % bibid)
+        return marc, data[1], data[2]
+
+    def _cached(self, record_type, record_id):
+        """Look up a record in the record cache, checking it is still current.
+
+        :param record_type: "bib" or "mfhd"
+        :param record_id: Voyager record ID
+        :return: pyvger.cache.CacheEntry, or None
+        """
+        if self.record_cache is None:
+            return None
+        last_date = None
+        if self.record_cache.validate:
+            with self._cursor() as curs:
+                (last_date,) = curs.execute(
+                    "SELECT MAX(action_date) FROM %(db)s.%(type)s_history WHERE %(type)s_id = :id"
+                    % {"db": self.oracle_database, "type": record_type},
+                    {"id": record_id},
+                ).fetchone()
+            if last_date is None:
+                return None
+        return self.record_cache.get(record_type, record_id, last_date)
+
+    def get_bibs(
+        self,
+        bibids,
+        batch_size=MAX_IN_LIST,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+        include=(),
+    ):
+        """Get many bibliographic records, fetching them in batches.
+
+        Each batch of IDs is fetched with a single query. Records are
+        yielded in the order of ``bibids``; IDs with no MARC data,
+        malformed MARC or a bad suppression value are skipped with a
+        warning. MARC is only decoded when a record's fields are first
+        used, after a check of its structure.
+
+        :param bibids: iterable of Voyager bibliographic record IDs
+        :param batch_size: number of records to fetch per query (at most 1000)
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see BibRecord.project)
+        :param include: related records to load with each batch of bibs (see load_related)
+        :return: iterator of BibRecord objects
+        """
+        if not self.connected:
+            return
+        include = _includes(include)
+        batch_size = min(batch_size, MAX_IN_LIST)
+        tracer = self.tracer
+        for batch in chunked(bibids, batch_size):
+            binds, params = _bind_list(batch, "bib")
+            records = {}
+            with span(tracer, "fetch") as fetch_span, self._cursor(arraysize, prefetchrows) as curs:
+                res = curs.execute(
+                    """SELECT bib_data.bib_id,
+                utl_i18n.string_to_raw(bib_data.record_segment) as record_segment,
+                bib_master.suppress_in_opac, history.maxdate
+                FROM %(db)s.bib_master JOIN %(db)s.bib_data
+                ON bib_master.bib_id = bib_data.bib_id
+                JOIN (SELECT bib_id, MAX(action_date) maxdate
+                FROM %(db)s.bib_history WHERE bib_id IN (%(binds)s)
+                GROUP BY bib_id) history ON history.bib_id = bib_master.bib_id
+                WHERE bib_master.bib_id IN (%(binds)s)
+                ORDER BY bib_data.bib_id, bib_data.seqnum"""
+                    % {"db": self.oracle_database, "binds": binds},
+                    params,
+                )
+                for bibid, segment, suppress_in_opac, maxdate in res:
+                    bibid = int(bibid)
+                    if bibid not in records:
+                        records[bibid] = ([], suppress_in_opac, maxdate)
+                    records[bibid][0].append(segment)
+                fetch_span.set(records=len(records))
+
+            bibs = []
+            for bibid in batch:
+                try:
+                    segments, suppress_in_opac, maxdate = records[int(bibid)]
+                except KeyError:
+                    warnings.warn("No MARC data for bib %s" % bibid)
+                    continue
+                with span(tracer, "join", bibid):
+                    marc = b"".join(segments)
+                try:
+                    bibs.append(
+                        self._make_bib(
+                            bibid,
+                            marc,
+                            suppress_in_opac,
+                            maxdate,
+                            fields=fields,
+                        )
+                    )
+                except PyVgerException:
+                    warnings.warn("Skipping record %s" % bibid)
+            if include:
+                self.load_related(bibs, include, arraysize, prefetchrows)
+            for bib in bibs:
+                yield bib
+
+    def load_related(self, bibs, include, arraysize=None, prefetchrows=None):
+        """Load the holdings and items of bibs with a few set-based queries.
+
+        The records are attached to the bibs, so that BibRecord.holdings and
+        HoldingsRecord.get_items return them without querying the database.
+        Whatever the number of records, this takes one query for the links
+        between bibs and holdings, and one query per 1000 holdings for the
+        holdings and for their items, and per 1000 items for barcodes and
+        for statuses. The loaded records are a snapshot: later changes in
+        the database are not seen until they are loaded again.
+
+        :param bibs: list of BibRecord objects
+        :param include: names of related records to load: "holdings", "items", "barcodes" and "statuses";
+            items imply holdings, and barcodes and statuses imply items
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: bibs
+        """
+        include = _includes(include)
+        if not include or not bibs:
+            return bibs
+        bmf = self.tables["bib_mfhd"]
+        mit = self.tables["mfhd_item"]
+        links = []
+        for batch in chunked(sorted({int(bib.bibid) for bib in bibs}), MAX_IN_LIST):
+            links.extend(
+                self._execute(
+                    sqla.select([bmf.c.bib_id, bmf.c.mfhd_id], bmf.c.bib_id.in_(batch)).order_by(
+                        bmf.c.bib_id, bmf.c.mfhd_id
+                    ),
+                    arraysize,
+                    prefetchrows,
+                )
+            )
+        holdings = {}
+        for batch in chunked(sorted({int(mfhd_id) for _, mfhd_id in links}), MAX_IN_LIST):
+            binds, params = _bind_list(batch, "mfhd")
+            for mfhd in self._stream_mfhds(
+                "mfhd_master.mfhd_id IN (%s)" % binds, params, arraysize, prefetchrows
+            ):
+                holdings[int(mfhd.mfhdid)] = mfhd
+        if "items" in include:
+            items = {mfhd_id: [] for mfhd_id in holdings}
+            for batch in chunked(sorted(holdings), MAX_IN_LIST):
+                for item in self._load_items(
+                    mit.c.mfhd_id.in_(batch),
+                    include_barcodes="barcodes" in include,
+                    include_statuses="statuses" in include,
+                    batch_size=MAX_IN_LIST,
+                    arraysize=arraysize,
+                    prefetchrows=prefetchrows,
+                ):
+                    items[int(item.holding_id)].append(item)
+            for mfhd_id, mfhd in holdings.items():
+                mfhd._items = (items[mfhd_id], "barcodes" in include, "statuses" in include)
+        by_bib = {}
+        for bib_id, mfhd_id in links:
+            mfhd = holdings.get(int(mfhd_id))
+            if mfhd is not None:
+                by_bib.setdefault(int(bib_id), []).append(mfhd)
+        for bib in bibs:
+            bib._holdings = by_bib.get(int(bib.bibid), [])
+        return bibs
+
+    def _make_bib(self, bibid, marc, suppress_in_opac, action_date, fields=None):
+        """Build a BibRecord from database values.
+
+        :param bibid: Voyager bibliographic record ID
+        :param marc: bytes of the MARC record
+        :param suppress_in_opac: bib_master.suppress_in_opac value
+        :param action_date: most recent bib_history.action_date
+        :param fields: list of tags to decode right away, or None
+        :return: BibRecord, whose MARC is decoded when first used
+        :raises PyVgerException: if the suppression value is bad or the MARC is malformed
+        """
+        tracer = self.tracer
+        suppress = _suppressed(suppress_in_opac, "bib", bibid)
+        _check_marc(marc, "bib", bibid)
+        with span(tracer, "arrow.get", bibid):
+            last_date = arrow.get(action_date).datetime
+        with span(tracer, "construct", bibid):
+            bib = BibRecord(marc, suppress, bibid, self, last_date)
+        if fields is not None:
+            bib.project(fields)
+        return bib
+
+    def get_mfhd(self, mfhdid, fields=None):
+        """Get a HoldingsRecord object for the given Voyager mfhd number.
+
+        With a record cache, the cached HoldingsRecord is shared by every
+        caller that gets the record without fields; with fields, a new
+        HoldingsRecord is built.
+
+        :param mfhdid: Voyager holdings ID to fetch
+        :param fields: list of tags; if given, only these fields are decoded (see HoldingsRecord.project)
+        :return:
+        """
+        if self.connected:
+            entry = self._cached("mfhd", mfhdid)
+            if entry is not None:
+                if fields is not None:
+                    return self._make_mfhd(mfhdid, *entry.data, fields=fields)
+                if entry.record is None:
+                    entry.record = self._make_mfhd(mfhdid, *entry.data)
+                return entry.record
+            with span(self.tracer, "fetch", mfhdid), self._cursor() as curs:
+                res = curs.execute(
+                    """SELECT DISTINCT utl_i18n.string_to_raw(record_segment)
+                 as record_segment,
+                 mfhd_master.suppress_in_opac,
+                 location.location_code,
+                 location.location_display_name,
+                 MAX(action_date) over (partition by mfhd_history.mfhd_id) maxdate,
+                 mfhd_data.seqnum
+                 FROM %(db)s.mfhd_data, %(db)s.mfhd_master, %(db)s.location, %(db)s.mfhd_history
+                 WHERE mfhd_data.mfhd_id=:mfhd
+                 AND mfhd_data.mfhd_id = mfhd_master.mfhd_id
+                 AND location.location_id = mfhd_master.location_id
+                 AND mfhd_history.mfhd_id = mfhd_master.mfhd_id
+                 ORDER BY seqnum"""
+                    % {"db": self.oracle_database},
+                    {"mfhd": mfhdid},
+                )
+                marc_segments = []
+                data = None
+                for data in res:
+                    marc_segments.append(data[0])
+            with span(self.tracer, "join", mfhdid):
+                marc = b"".join(marc_segments)
             if not marc:
                 raise PyVgerException("No MARC data for MFHD %s" % mfhdid)
-            try:
-                rec = next(pymarc.MARCReader(marc))
-            except Exception as e:
-                raise PyVgerException from e
+            data = (marc, data[1], data[2], data[3], data[4])
+            mfhd = self._make_mfhd(mfhdid, *data, fields=fields)
+            if self.record_cache is not None:
+                self.record_cache.put("mfhd", mfhdid, data[-1], data, mfhd if fields is None else None)
+            return mfhd
 
-            if data[1] == "Y":
-                suppress = True
-            elif data[1] == "N":
-                suppress = False
-            else:
-                raise PyVgerException(
-                    "Bad suppression value %r for mfhd %s" % (data[1], mfhdid)
+    def _make_mfhd(
+        self,
+        mfhdid,
+        marc,
+        suppress_in_opac,
+        location_code,
+        location_display_name,
+        action_date,
+        fields=None,
+    ):
+        """Build a HoldingsRecord from database values.
+
+        :param mfhdid: Voyager holdings ID
+        :param marc: bytes of the MARC record
+        :param suppress_in_opac: mfhd_master.suppress_in_opac value
+        :param location_code: location.location_code of the holding
+        :param location_display_name: location.location_display_name of the holding
+        :param action_date: most recent mfhd_history.action_date
+        :param fields: list of tags to decode right away, or None
+        :return: HoldingsRecord, whose MARC is decoded when first used
+        :raises PyVgerException: if the suppression value is bad or the MARC is malformed
+        """
+        tracer = self.tracer
+        suppress = _suppressed(suppress_in_opac, "mfhd", mfhdid)
+        _check_marc(marc, "mfhd", mfhdid)
+        with span(tracer, "arrow.get", mfhdid):
+            last_date = arrow.get(action_date).datetime
+        with span(tracer, "construct", mfhdid):
+            mfhd = HoldingsRecord(
+                marc, suppress, mfhdid, self, location_code, location_display_name, last_date
+            )
+        if fields is not None:
+            mfhd.project(fields)
+        return mfhd
+
+    def _stream_mfhds(
+        self, conditions, params, arraysize=None, prefetchrows=None, fields=None
+    ):
+        """Fetch holdings with a single ordered query.
+
+        Segments are grouped into records as rows arrive, so memory use
+        does not depend on the number of holdings selected. Records that
+        can't be built are skipped with a warning.
+
+        :param conditions: SQL condition selecting mfhd_master rows
+        :param params: bind parameters used by conditions
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags to decode right away, or None
+        :return: iterator of HoldingsRecord objects
+        """
+        with self._cursor(arraysize, prefetchrows) as curs:
+            res = curs.execute(
+                """SELECT mfhd_master.mfhd_id,
+            utl_i18n.string_to_raw(mfhd_data.record_segment) as record_segment,
+            mfhd_master.suppress_in_opac,
+            location.location_code,
+            location.location_display_name,
+            history.maxdate
+            FROM %(db)s.mfhd_master
+            JOIN %(db)s.location ON location.location_id = mfhd_master.location_id
+            JOIN %(db)s.mfhd_data ON mfhd_data.mfhd_id = mfhd_master.mfhd_id
+            JOIN (SELECT mfhd_history.mfhd_id, MAX(mfhd_history.action_date) maxdate
+            FROM %(db)s.mfhd_history
+            JOIN %(db)s.mfhd_master ON mfhd_master.mfhd_id = mfhd_history.mfhd_id
+            JOIN %(db)s.location ON location.location_id = mfhd_master.location_id
+            WHERE %(conditions)s
+            GROUP BY mfhd_history.mfhd_id) history
+            ON history.mfhd_id = mfhd_master.mfhd_id
+            WHERE %(conditions)s
+            ORDER BY mfhd_master.mfhd_id, mfhd_data.seqnum"""
+                % {"db": self.oracle_database, "conditions": conditions},
+                params,
+            )
+            tracer = self.tracer
+            for mfhdid, rows in itertools.groupby(res, key=operator.itemgetter(0)):
+                with span(tracer, "fetch", mfhdid):
+                    rows = list(rows)
+                with span(tracer, "join", mfhdid):
+                    marc = b"".join(row[1] for row in rows if row[1])
+                try:
+                    if not marc:
+                        raise PyVgerException("No MARC data for MFHD %s" % mfhdid)
+                    yield self._make_mfhd(mfhdid, marc, *rows[0][2:], fields=fields)
+                except PyVgerException:
+                    warnings.warn("Skipping record %s" % mfhdid)
+
+    def get_mfhds(
+        self,
+        mfhdids,
+        batch_size=MAX_IN_LIST,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+    ):
+        """Get many holdings records, fetching them in batches.
+
+        Each batch of IDs is fetched with a single query. Records are
+        yielded in the order of ``mfhdids``; IDs with no MARC data,
+        malformed MARC or a bad suppression value are skipped with a
+        warning. MARC is only decoded when a record's fields are first
+        used, after a check of its structure.
+
+        :param mfhdids: iterable of Voyager holdings IDs
+        :param batch_size: number of records to fetch per query (at most 1000)
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see HoldingsRecord.project)
+        :return: iterator of HoldingsRecord objects
+        """
+        if not self.connected:
+            return
+        for batch in chunked(mfhdids, min(batch_size, MAX_IN_LIST)):
+            binds, params = _bind_list(batch, "mfhd")
+            records = {
+                int(mfhd.mfhdid): mfhd
+                for mfhd in self._stream_mfhds(
+                    "mfhd_master.mfhd_id IN (%s)" % binds,
+                    params,
+                    arraysize,
+                    prefetchrows,
+                    fields,
                 )
-            last_date = arrow.get(data[4]).datetime
-            return HoldingsRecord(
-                rec, suppress, mfhdid, self, data[2], data[3], last_date
+            }
+            for mfhdid in batch:
+                try:
+                    yield records[int(mfhdid)]
+                except KeyError:
+                    warnings.warn("No MARC data for MFHD %s" % mfhdid)
+
+    def _iter_batches(self, fetch, ids, batch_size, workers, ordered):
+        """Fetch records for IDs in batches, optionally in a thread pool.
+
+        With workers, all of ids is read before any batch is fetched, so
+        that a streaming ID query has returned its session to the pool
+        before the workers need theirs; the threads only run the queries
+        and build the records, whose MARC is decoded when first used.
+
+        :param fetch: function taking a list of IDs and returning an iterator of records
+        :param ids: iterable of record IDs
+        :param batch_size: number of IDs per batch
+        :param workers: number of threads; with more than one, a session pool is required
+        :param ordered: whether records must be yielded in the order of ids
+        :return: iterator of records
+        """
+        if workers > 1:
+            if self.pool is None:
+                raise ValueError("workers requires a session pool; set pool_max")
+            ids = list(ids)
+        batches = chunked(ids, batch_size)
+        if workers > 1:
+            results = parallel_batches(
+                lambda batch: list(fetch(batch)), batches, workers, ordered
             )
+        else:
+            results = (fetch(batch) for batch in batches)
+        for records in results:
+            for record in records:
+                yield record
 
-    def iter_mfhds(self, locations=None, lib_id=None, include_suppressed=False, last=None):
+    def _paged_scan(
+        self,
+        id_query,
+        id_column,
+        fetch,
+        last,
+        page_size,
+        checkpoint,
+        checkpoint_key,
+        batch_size,
+        workers,
+        ordered,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Fetch records a page of IDs at a time, in ascending ID order.
+
+        Every page is a separate short query for the next ``page_size`` IDs
+        after the last one seen, so a long scan never holds one cursor open
+        for hours. After all the records of a page have been yielded, the
+        page's last ID is saved to the checkpoint store; the checkpoint is
+        cleared when the scan finishes, so that running it again starts over.
+
+        :param id_query: sqlalchemy select of the IDs to scan
+        :param id_column: column selected by id_query
+        :param fetch: function taking a list of IDs and returning an iterator of records
+        :param last: ID after which to start; if None, the checkpointed ID is used
+        :param page_size: number of IDs per page
+        :param checkpoint: checkpoint store (see pyvger.checkpoint), or None
+        :param checkpoint_key: key of this scan in the checkpoint store
+        :param batch_size: number of records to fetch per query
+        :param workers: number of threads fetching batches of records
+        :param ordered: whether records must be yielded in ID order within a page
+        :param arraysize: rows fetched per round trip by the ID queries
+        :param prefetchrows: rows returned with the execution of the ID queries
+        :return: iterator of records
+        """
+        if last is None and checkpoint is not None:
+            last = checkpoint.load(checkpoint_key)
+        while True:
+            query = id_query
+            if last is not None:
+                query = query.where(id_column > last)
+            query = query.order_by(id_column).limit(page_size)
+            ids = [row[0] for row in self._execute(query, arraysize, prefetchrows)]
+            if not ids:
+                break
+            for record in self._iter_batches(fetch, ids, batch_size, workers, ordered):
+                yield record
+            last = ids[-1]
+            if len(ids) < page_size:
+                break
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_key, last)
+        if checkpoint is not None:
+            checkpoint.clear(checkpoint_key)
+
+    def _changed_scan(
+        self,
+        history_table,
+        id_name,
+        fetch,
+        since,
+        page_size,
+        checkpoint,
+        checkpoint_key,
+        batch_size,
+        workers,
+        ordered,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Fetch records changed since a time, in order of their last change.
+
+        Records are paged through in order of their latest history
+        ``action_date``, then ID. The high-water mark is the date and ID
+        of the last record of a page. It is saved to the checkpoint store
+        after all the records of the page have been yielded. A record
+        changed again while the scan runs is yielded again by the next scan.
+
+        :param history_table: name of the history table (bib_history or mfhd_history)
+        :param id_name: name of the record ID column of the history table
+        :param fetch: function taking a list of IDs and returning an iterator of records
+        :param since: datetime after which to look for changes; if None, the checkpointed mark is used
+        :param page_size: number of IDs per page
+        :param checkpoint: checkpoint store (see pyvger.checkpoint), or None
+        :param checkpoint_key: key of this scan in the checkpoint store
+        :param batch_size: number of records to fetch per query
+        :param workers: number of threads fetching batches of records
+        :param ordered: whether records must be yielded in change order within a page
+        :param arraysize: rows fetched per round trip by the ID queries
+        :param prefetchrows: rows returned with the execution of the ID queries
+        :return: iterator of records
+        """
+        history = self.tables[history_table]
+        id_column = history.c[id_name]
+        changed = sqla.func.max(history.c.action_date)
+        mark_date = mark_id = None
+        if since is not None:
+            mark_date = arrow.get(since).naive
+        elif checkpoint is not None:
+            mark = checkpoint.load(checkpoint_key)
+            if mark is not None:
+                mark_date, mark_id = arrow.get(mark[0]).naive, mark[1]
+        while True:
+            query = sqla.select([id_column, changed]).group_by(id_column)
+            if mark_id is not None:
+                query = query.where(history.c.action_date >= mark_date).having(
+                    sqla.or_(
+                        changed > mark_date,
+                        sqla.and_(changed == mark_date, id_column > mark_id),
+                    )
+                )
+            elif mark_date is not None:
+                query = query.where(history.c.action_date > mark_date)
+            query = query.order_by(changed, id_column).limit(page_size)
+            rows = list(self._execute(query, arraysize, prefetchrows))
+            if not rows:
+                return
+            for record in self._iter_batches(
+                fetch, [row[0] for row in rows], batch_size, workers, ordered
+            ):
+                yield record
+            mark_id, mark_date = rows[-1]
+            mark_id = int(mark_id)
+            mark_date = arrow.get(mark_date).naive
+            if checkpoint is not None:
+                checkpoint.save(checkpoint_key, [mark_date.isoformat(), mark_id])
+            if len(rows) < page_size:
+                return
+
+    def iter_mfhds(
+        self,
+        locations=None,
+        lib_id=None,
+        include_suppressed=False,
+        last=None,
+        stream=False,
+        workers=1,
+        ordered=True,
+        batch_size=500,
+        page_size=None,
+        checkpoint=None,
+        checkpoint_key=None,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+    ):
         """Iterate over all of the holdings in the given locations.
 
         You must provide exactly one of locations or lib_id
 
+        With page_size or checkpoint, holdings are scanned in mfhd_id
+        order a page at a time, and the checkpoint store records the last
+        mfhd_id of every completed page so that an interrupted scan can be
+        resumed by running it again with the same arguments. The checkpoint
+        is cleared once the scan finishes.
+
         :param locations: list of locations to iterate over
         :param lib_id: library ID to iterate over instead of using locations
         :param include_suppressed: whether suppressed records should be included
         :param last: last record number processed, to skip ahead
+        :param stream: fetch all records with one ordered query instead of one query per record
+        :param workers: number of threads fetching batches of records; more than one requires a session pool
+            of at least as many sessions
+        :param ordered: with workers, whether to keep records in mfhd_id order instead of yielding them when ready
+        :param batch_size: with workers or paging, number of records to fetch per query
+        :param page_size: number of holdings IDs to select per page
+        :param checkpoint: checkpoint store from pyvger.checkpoint in which to record progress
+        :param checkpoint_key: key for this scan in the checkpoint store; derived from the arguments by default
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see HoldingsRecord.project)
         :return: iterator of HoldingsRecord objects
 
         """
+        if checkpoint is not None and page_size is None:
+            page_size = DEFAULT_PAGE_SIZE
+        if stream and workers == 1 and page_size is None:
+            if locations and lib_id is None:
+                binds, params = _bind_list(locations, "loc")
+                conditions = ["mfhd_master.location_id IN (%s)" % binds]
+            elif lib_id:
+                params = {"lib": lib_id}
+                conditions = ["location.library_id = :lib"]
+            else:
+                raise ValueError("must provide locations or lib_id, and not both")
+            if not include_suppressed:
+                conditions.append("mfhd_master.suppress_in_opac = 'N'")
+            if last is not None:
+                params["last"] = last
+                conditions.append("mfhd_master.mfhd_id > :last")
+            for mfhd in self._stream_mfhds(
+                " AND ".join(conditions), params, arraysize, prefetchrows, fields
+            ):
+                yield mfhd
+            return
+
         mm = self.tables["mfhd_master"]
         if locations and lib_id is None:
             where_clause = mm.c.location_id.in_(locations)
@@ -250,29 +1212,157 @@ class Voy(object):
             raise ValueError("must provide locations or lib_id, and not both")
         if not include_suppressed:
             where_clause = sqla.and_(mm.c.suppress_in_opac == "N", where_clause)
+
+        def get_mfhds(batch):
+            return self.get_mfhds(
+                batch,
+                batch_size=batch_size,
+                arraysize=arraysize,
+                prefetchrows=prefetchrows,
+                fields=fields,
+            )
+
+        if page_size is not None:
+            if checkpoint_key is None:
+                checkpoint_key = _checkpoint_key(
+                    "iter_mfhds",
+                    locations=locations,
+                    lib_id=lib_id,
+                    include_suppressed=include_suppressed,
+                )
+            for mfhd in self._paged_scan(
+                sqla.select([mm.c.mfhd_id], whereclause=where_clause),
+                mm.c.mfhd_id,
+                get_mfhds,
+                last,
+                page_size,
+                checkpoint,
+                checkpoint_key,
+                batch_size,
+                workers,
+                ordered,
+                arraysize,
+                prefetchrows,
+            ):
+                yield mfhd
+            return
         if last is not None:
             where_clause = sqla.and_(mm.c.mfhd_id > last, where_clause)
         q = sqla.select([mm.c.mfhd_id], whereclause=where_clause).order_by(mm.c.mfhd_id)
-        r = self.engine.execute(q)
+        r = self._execute(q, arraysize, prefetchrows)
+        if workers > 1:
+            for mfhd in self._iter_batches(
+                get_mfhds, (row[0] for row in r), batch_size, workers, ordered
+            ):
+                yield mfhd
+            return
         for row in r:
             try:
-                yield self.get_mfhd(row[0])
+                yield self.get_mfhd(row[0], fields=fields)
             except PyVgerException:
                 warnings.warn("Skipping record %s" % row[0])
 
-    def iter_bibs(self, locations=None, lib_id=None, include_suppressed=False):
+    def iter_bibs(
+        self,
+        locations=None,
+        lib_id=None,
+        include_suppressed=False,
+        batch_size=500,
+        workers=1,
+        ordered=True,
+        last=None,
+        page_size=None,
+        checkpoint=None,
+        checkpoint_key=None,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+        include=(),
+    ):
         """Iterate over all of the bibs in the given locations.
 
         You must provide exactly one of locations or lib_id.
 
+        With last, page_size or checkpoint, each bib is yielded once, in
+        bib_id order, from short queries for a page of IDs at a time. The
+        checkpoint store records the last bib_id of every completed page
+        so that an interrupted scan can be resumed by running it again
+        with the same arguments. The checkpoint is cleared once the scan
+        finishes.
+
         :param locations: list of locations to iterate over
         :param lib_id: library ID to iterate over instead of using locations
         :param include_suppressed: whether suppressed records should be included
+        :param batch_size: number of records to fetch per query
+        :param workers: number of threads fetching batches of records; more than one requires a session pool
+            of at least as many sessions
+        :param ordered: with workers, whether to keep the order of the ID query instead of yielding records when ready
+        :param last: last bib_id processed, to skip ahead
+        :param page_size: number of bib IDs to select per page
+        :param checkpoint: checkpoint store from pyvger.checkpoint in which to record progress
+        :param checkpoint_key: key for this scan in the checkpoint store; derived from the arguments by default
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see BibRecord.project)
+        :param include: related records to load with each batch of bibs (see load_related)
         :return: iterator of BibRecord objects
 
         """
         bl = self.tables["bib_location"]
         bm = self.tables["bib_master"]
+        include = _includes(include)
+
+        def get_bibs(batch):
+            return self.get_bibs(
+                batch,
+                batch_size=batch_size,
+                arraysize=arraysize,
+                prefetchrows=prefetchrows,
+                fields=fields,
+                include=include,
+            )
+
+        if page_size is None and (checkpoint is not None or last is not None):
+            page_size = DEFAULT_PAGE_SIZE
+        if page_size is not None:
+            if locations and lib_id is None:
+                id_column = bl.c.bib_id
+                where_clause = bl.c.location_id.in_(locations)
+            elif lib_id:
+                id_column = bm.c.bib_id
+                where_clause = bm.c.library_id == lib_id
+            else:
+                raise ValueError("must provide locations or lib_id, and not both")
+            if not include_suppressed:
+                where_clause = sqla.and_(
+                    where_clause,
+                    bm.c.suppress_in_opac == "N",
+                    bm.c.bib_id == bl.c.bib_id,
+                )
+            if checkpoint_key is None:
+                checkpoint_key = _checkpoint_key(
+                    "iter_bibs",
+                    locations=locations,
+                    lib_id=lib_id,
+                    include_suppressed=include_suppressed,
+                )
+            for bib in self._paged_scan(
+                sqla.select([id_column], where_clause, distinct=True),
+                id_column,
+                get_bibs,
+                last,
+                page_size,
+                checkpoint,
+                checkpoint_key,
+                batch_size,
+                workers,
+                ordered,
+                arraysize,
+                prefetchrows,
+            ):
+                yield bib
+            return
+
         if locations and lib_id is None:
             q = bl.select(bl.c.location_id.in_(locations))
         elif lib_id:
@@ -283,21 +1373,59 @@ class Voy(object):
             q = q.where(
                 sqla.and_(bm.c.suppress_in_opac == "N", bm.c.bib_id == bl.c.bib_id)
             )
-        r = self.engine.execute(q)
-        for row in r:
-            try:
-                yield self.get_bib(row[0])
-            except UnicodeDecodeError:
-                continue
+        r = self._execute(q, arraysize, prefetchrows)
+        for bib in self._iter_batches(
+            get_bibs,
+            (row[0] for row in r),
+            batch_size,
+            workers,
+            ordered,
+        ):
+            yield bib
 
     def iter_items(
-        self, locations, include_temporary=False, include_suppressed_mfhd=False
+        self,
+        locations,
+        include_temporary=False,
+        include_suppressed_mfhd=False,
+        include_barcodes=False,
+        include_statuses=False,
+        batch_size=500,
+        workers=1,
+        ordered=True,
+        last=None,
+        page_size=None,
+        checkpoint=None,
+        checkpoint_key=None,
+        arraysize=None,
+        prefetchrows=None,
     ):
         """Iterate over the item records in one or more locations.
 
+        Items are built from a single query ordered by item ID, or with
+        workers or paging, from one query per batch of IDs.
+
+        With last, page_size or checkpoint, item IDs are selected by short
+        queries for a page at a time. The checkpoint store records the last
+        item_id of every completed page so that an interrupted scan can be
+        resumed by running it again with the same arguments. The checkpoint
+        is cleared once the scan finishes.
+
         :param locations: list of locations to iterate over
         :param include_temporary: bool whether to include items with temporary locations in locations list
         :param include_suppressed_mfhd: bool, whether to include items attached to a suppressed MFHD
+        :param include_barcodes: bool, whether to attach each item's active barcode
+        :param include_statuses: bool, whether to attach each item's statuses
+        :param batch_size: number of items for which barcodes and statuses are fetched per query
+        :param workers: number of threads fetching batches of items; more than one requires a session pool
+            of at least as many sessions
+        :param ordered: with workers, whether to keep items in item_id order instead of yielding them when ready
+        :param last: last item_id processed, to skip ahead
+        :param page_size: number of item IDs to select per page
+        :param checkpoint: checkpoint store from pyvger.checkpoint in which to record progress
+        :param checkpoint_key: key for this scan in the checkpoint store; derived from the arguments by default
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
         """
         item_table = self.tables["item"]
         where_clause = item_table.c.perm_location.in_(locations)
@@ -309,18 +1437,816 @@ class Voy(object):
             where_clause = sqla.and_(
                 self.tables["mfhd_master"].c.suppress_in_opac == "N", where_clause
             )
-        q = sqla.select(
-            [item_table.c.item_id],
-            whereclause=where_clause,
-            from_obj=[
-                item_table.join(self.tables["mfhd_item"]).join(
-                    self.tables["mfhd_master"]
+        if page_size is None and (checkpoint is not None or last is not None):
+            page_size = DEFAULT_PAGE_SIZE
+        if workers > 1 or page_size is not None:
+            query = sqla.select(
+                [item_table.c.item_id],
+                whereclause=where_clause,
+                from_obj=[
+                    item_table.join(self.tables["mfhd_item"]).join(
+                        self.tables["mfhd_master"]
+                    )
+                ],
+                distinct=True,
+            )
+
+            def fetch(batch):
+                return self.get_items(
+                    batch,
+                    include_barcodes=include_barcodes,
+                    include_statuses=include_statuses,
+                    batch_size=batch_size,
+                    arraysize=arraysize,
+                    prefetchrows=prefetchrows,
+                )
+
+            if page_size is None:
+                return self._iter_batches(
+                    fetch,
+                    (
+                        row[0]
+                        for row in self._execute(
+                            query.order_by(item_table.c.item_id),
+                            arraysize,
+                            prefetchrows,
+                        )
+                    ),
+                    batch_size,
+                    workers,
+                    ordered,
+                )
+            if checkpoint_key is None:
+                checkpoint_key = _checkpoint_key(
+                    "iter_items",
+                    locations=locations,
+                    include_temporary=include_temporary,
+                    include_suppressed_mfhd=include_suppressed_mfhd,
                 )
+            return self._paged_scan(
+                query,
+                item_table.c.item_id,
+                fetch,
+                last,
+                page_size,
+                checkpoint,
+                checkpoint_key,
+                batch_size,
+                workers,
+                ordered,
+                arraysize,
+                prefetchrows,
+            )
+        return self._load_items(
+            where_clause,
+            include_barcodes=include_barcodes,
+            include_statuses=include_statuses,
+            batch_size=batch_size,
+            join_mfhd_master=True,
+            arraysize=arraysize,
+            prefetchrows=prefetchrows,
+        )
+
+    def iter_changed_bibs(
+        self,
+        since=None,
+        batch_size=500,
+        workers=1,
+        ordered=True,
+        page_size=DEFAULT_PAGE_SIZE,
+        checkpoint=None,
+        checkpoint_key=None,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+    ):
+        """Iterate over the bibliographic records changed since a given time.
+
+        A record has changed if it has a bib_history row with a later
+        action_date. Records are yielded in order of their latest change,
+        suppressed ones included. With a checkpoint store, the date and
+        ID of the last record of every completed page is saved, and a
+        later call without ``since`` picks up where the last one stopped.
+
+        :param since: datetime after which to look for changes, instead of the checkpointed mark
+        :param batch_size: number of records to fetch per query
+        :param workers: number of threads fetching batches (requires a session pool if more than 1)
+        :param ordered: whether records must be yielded in change order within a page
+        :param page_size: number of changed IDs to look up per query
+        :param checkpoint: checkpoint store (see pyvger.checkpoint) keeping the high-water mark
+        :param checkpoint_key: key of this scan in the checkpoint store
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see BibRecord.project)
+        :return: iterator of BibRecord objects
+        """
+
+        def get_bibs(batch):
+            return self.get_bibs(
+                batch,
+                batch_size=batch_size,
+                arraysize=arraysize,
+                prefetchrows=prefetchrows,
+                fields=fields,
+            )
+
+        if checkpoint_key is None:
+            checkpoint_key = _checkpoint_key("iter_changed_bibs")
+        return self._changed_scan(
+            "bib_history",
+            "bib_id",
+            get_bibs,
+            since,
+            page_size,
+            checkpoint,
+            checkpoint_key,
+            batch_size,
+            workers,
+            ordered,
+            arraysize,
+            prefetchrows,
+        )
+
+    def iter_changed_mfhds(
+        self,
+        since=None,
+        batch_size=500,
+        workers=1,
+        ordered=True,
+        page_size=DEFAULT_PAGE_SIZE,
+        checkpoint=None,
+        checkpoint_key=None,
+        arraysize=None,
+        prefetchrows=None,
+        fields=None,
+    ):
+        """Iterate over the holdings records changed since a given time.
+
+        A record has changed if it has a mfhd_history row with a later
+        action_date. See iter_changed_bibs for ordering and checkpoints.
+
+        :param since: datetime after which to look for changes, instead of the checkpointed mark
+        :param batch_size: number of records to fetch per query
+        :param workers: number of threads fetching batches (requires a session pool if more than 1)
+        :param ordered: whether records must be yielded in change order within a page
+        :param page_size: number of changed IDs to look up per query
+        :param checkpoint: checkpoint store (see pyvger.checkpoint) keeping the high-water mark
+        :param checkpoint_key: key of this scan in the checkpoint store
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :param fields: list of tags; if given, only these fields are decoded (see HoldingsRecord.project)
+        :return: iterator of HoldingsRecord objects
+        """
+
+        def get_mfhds(batch):
+            return self.get_mfhds(
+                batch,
+                batch_size=batch_size,
+                arraysize=arraysize,
+                prefetchrows=prefetchrows,
+                fields=fields,
+            )
+
+        if checkpoint_key is None:
+            checkpoint_key = _checkpoint_key("iter_changed_mfhds")
+        return self._changed_scan(
+            "mfhd_history",
+            "mfhd_id",
+            get_mfhds,
+            since,
+            page_size,
+            checkpoint,
+            checkpoint_key,
+            batch_size,
+            workers,
+            ordered,
+            arraysize,
+            prefetchrows,
+        )
+
+    def _stream_raw(self, record_type, conditions, params, arraysize, prefetchrows):
+        """Fetch raw MARC records with a single ordered query.
+
+        :param record_type: "bib" or "mfhd"
+        :param conditions: SQL condition selecting rows of the record type's data table
+        :param params: bind parameters used by conditions
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: iterator of tuples of record ID and MARC bytes
+        """
+        with self._cursor(arraysize, prefetchrows) as curs:
+            res = curs.execute(
+                """SELECT %(type)s_data.%(type)s_id,
+            utl_i18n.string_to_raw(%(type)s_data.record_segment) as record_segment
+            FROM %(db)s.%(type)s_data
+            WHERE %(conditions)s
+            ORDER BY %(type)s_data.%(type)s_id, %(type)s_data.seqnum"""
+                % {
+                    "db": self.oracle_database,
+                    "type": record_type,
+                    "conditions": conditions,
+                },
+                params,
+            )
+            for record_id, rows in itertools.groupby(res, key=operator.itemgetter(0)):
+                yield record_id, b"".join(row[1] for row in rows if row[1])
+
+    def _export_raw(
+        self,
+        record_type,
+        dest,
+        selections,
+        ids,
+        compress,
+        batch_size,
+        arraysize,
+        prefetchrows,
+    ):
+        """Write raw MARC records to a file or stream.
+
+        :param record_type: "bib" or "mfhd"
+        :param dest: path or writable binary stream
+        :param selections: list of (conditions, params) for _stream_raw, used if ids is None
+        :param ids: iterable of record IDs, or None
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of IDs per query when exporting ids
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution
+        :return: dict of records, bytes (of MARC, before compression), seconds and records_per_second
+        """
+        if ids is not None:
+            selections = (
+                _bind_list(batch, "id")
+                for batch in chunked(ids, min(batch_size, MAX_IN_LIST))
+            )
+            selections = (
+                ("%s_data.%s_id IN (%s)" % (record_type, record_type, binds), params)
+                for binds, params in selections
+            )
+        records = written = 0
+        start = time.perf_counter()
+        with output_stream(dest, compress) as fp:
+            for conditions, params in selections:
+                for _, marc in self._stream_raw(
+                    record_type, conditions, params, arraysize, prefetchrows
+                ):
+                    if marc:
+                        fp.write(marc)
+                        records += 1
+                        written += len(marc)
+        seconds = time.perf_counter() - start
+        return {
+            "records": records,
+            "bytes": written,
+            "seconds": seconds,
+            "records_per_second": records / seconds if seconds else 0.0,
+        }
+
+    def export_raw_bibs(
+        self,
+        dest,
+        locations=None,
+        lib_id=None,
+        bibids=None,
+        include_suppressed=False,
+        compress=None,
+        batch_size=MAX_IN_LIST,
+        arraysize=1000,
+        prefetchrows=None,
+    ):
+        """Write the raw MARC of bibliographic records to a file or stream.
+
+        The stored record segments are concatenated and written as they are,
+        without being parsed, so the output is the ISO 2709 records exactly as
+        Voyager has them. Records are written in bib_id order (within each
+        batch, when exporting bibids); bibs without MARC data are left out.
+
+        You must provide exactly one of locations, lib_id or bibids.
+
+        :param dest: path or writable binary stream
+        :param locations: list of locations whose bibs to export
+        :param lib_id: library ID whose bibs to export
+        :param bibids: iterable of Voyager bibliographic record IDs to export
+        :param include_suppressed: with locations or lib_id, whether suppressed records should be included
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of bibids per query (at most 1000)
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict of records, bytes (of MARC, before compression), seconds and records_per_second
+        """
+        if sum(arg is not None for arg in (locations, lib_id, bibids)) != 1:
+            raise ValueError("must provide one of locations, lib_id or bibids")
+        selections = None
+        if bibids is None:
+            if locations is not None:
+                binds, params = _bind_list(locations, "loc")
+                conditions = [
+                    "bib_data.bib_id IN (SELECT bib_id FROM %s.bib_location WHERE location_id IN (%s))"
+                    % (self.oracle_database, binds)
+                ]
+            else:
+                params = {"lib": lib_id}
+                conditions = [
+                    "bib_data.bib_id IN (SELECT bib_id FROM %s.bib_master WHERE library_id = :lib)"
+                    % self.oracle_database
+                ]
+            if not include_suppressed:
+                conditions.append(
+                    "bib_data.bib_id IN (SELECT bib_id FROM %s.bib_master WHERE suppress_in_opac = 'N')"
+                    % self.oracle_database
+                )
+            selections = [(" AND ".join(conditions), params)]
+        return self._export_raw(
+            "bib",
+            dest,
+            selections,
+            bibids,
+            compress,
+            batch_size,
+            arraysize,
+            prefetchrows,
+        )
+
+    def export_raw_mfhds(
+        self,
+        dest,
+        locations=None,
+        lib_id=None,
+        mfhdids=None,
+        include_suppressed=False,
+        compress=None,
+        batch_size=MAX_IN_LIST,
+        arraysize=1000,
+        prefetchrows=None,
+    ):
+        """Write the raw MARC of holdings records to a file or stream.
+
+        See export_raw_bibs; records are written in mfhd_id order.
+
+        You must provide exactly one of locations, lib_id or mfhdids.
+
+        :param dest: path or writable binary stream
+        :param locations: list of locations whose holdings to export
+        :param lib_id: library ID whose holdings to export
+        :param mfhdids: iterable of Voyager holdings IDs to export
+        :param include_suppressed: with locations or lib_id, whether suppressed records should be included
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of mfhdids per query (at most 1000)
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict of records, bytes (of MARC, before compression), seconds and records_per_second
+        """
+        if sum(arg is not None for arg in (locations, lib_id, mfhdids)) != 1:
+            raise ValueError("must provide one of locations, lib_id or mfhdids")
+        selections = None
+        if mfhdids is None:
+            if locations is not None:
+                binds, params = _bind_list(locations, "loc")
+                master_conditions = ["mfhd_master.location_id IN (%s)" % binds]
+            else:
+                params = {"lib": lib_id}
+                master_conditions = [
+                    "mfhd_master.location_id IN (SELECT location_id FROM %s.location WHERE library_id = :lib)"
+                    % self.oracle_database
+                ]
+            if not include_suppressed:
+                master_conditions.append("mfhd_master.suppress_in_opac = 'N'")
+            conditions = (
+                "mfhd_data.mfhd_id IN (SELECT mfhd_master.mfhd_id FROM %s.mfhd_master WHERE %s)"
+                % (self.oracle_database, " AND ".join(master_conditions))
+            )
+            selections = [(conditions, params)]
+        return self._export_raw(
+            "mfhd",
+            dest,
+            selections,
+            mfhdids,
+            compress,
+            batch_size,
+            arraysize,
+            prefetchrows,
+        )
+
+    def _export_table(
+        self,
+        dest,
+        queries,
+        columns,
+        rows_to_values,
+        key,
+        table_format_name,
+        compress,
+        batch_size,
+        arraysize,
+        prefetchrows,
+    ):
+        """Stream the results of queries into a table, a batch of records at a time.
+
+        :param dest: path or writable binary stream
+        :param queries: list of sqlalchemy selects, each ordered by key, run one after the other
+        :param columns: list of (name, kind) tuples of the table
+        :param rows_to_values: function turning the rows of one record into a tuple of column values
+        :param key: function getting the record key of a row; consecutive rows with the same key are one record
+        :param table_format_name: "csv", "arrow" or "parquet", or None to use the path's ending
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of records per batch
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution
+        :return: dict of rows, batches, seconds and rows_per_second
+        """
+        table_format_name = table_format(dest, table_format_name)
+        names = [name for name, _ in columns]
+        rows = batches = 0
+        start = time.perf_counter()
+        result = itertools.chain.from_iterable(
+            self._execute(query, arraysize, prefetchrows) for query in queries
+        )
+        records = (
+            rows_to_values(list(group)) for _, group in itertools.groupby(result, key)
+        )
+        with output_stream(dest, compress) as fp:
+            writer = table_writer(fp, columns, table_format_name)
+            try:
+                for batch in chunked(records, batch_size):
+                    writer.write(dict(zip(names, (list(c) for c in zip(*batch)))))
+                    rows += len(batch)
+                    batches += 1
+                if not batches:
+                    writer.write({name: [] for name in names})
+            finally:
+                writer.close()
+        seconds = time.perf_counter() - start
+        return {
+            "rows": rows,
+            "batches": batches,
+            "seconds": seconds,
+            "rows_per_second": rows / seconds if seconds else 0.0,
+        }
+
+    def export_items_table(
+        self,
+        dest,
+        locations=None,
+        item_ids=None,
+        include_temporary=False,
+        include_suppressed_mfhd=False,
+        table_format=None,
+        compress=None,
+        batch_size=50000,
+        arraysize=5000,
+        prefetchrows=None,
+    ):
+        """Write a table of item data to a CSV, Arrow IPC or Parquet file.
+
+        Rows are streamed from a single query ordered by item_id, or one
+        query per 1000 item_ids, and written a batch at a time, without
+        building ItemRecords, so memory use depends on batch_size rather
+        than on the number of items. There is one row per item; its notes
+        are gathered into a list. Prices are in cents, as stored. The
+        columns are listed in ITEM_TABLE_COLUMNS.
+
+        You must provide exactly one of locations or item_ids.
+
+        :param dest: path or writable binary stream
+        :param locations: list of location IDs whose items to export
+        :param item_ids: iterable of Voyager item IDs to export
+        :param include_temporary: whether to include items temporarily in locations
+        :param include_suppressed_mfhd: whether to include items with suppressed holdings
+        :param table_format: "csv", "arrow" or "parquet"; by default, from the ending of dest, or CSV
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of items per batch (Arrow record batch or Parquet row group)
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict of rows, batches, seconds and rows_per_second
+        """
+        it = self.tables["item"]
+        mit = self.tables["mfhd_item"]
+        mm = self.tables["mfhd_master"]
+        note = self.tables["item_note"]
+        perm = self.tables["location"].alias("perm_loc")
+        temp = self.tables["location"].alias("temp_loc")
+        if (locations is None) == (item_ids is None):
+            raise ValueError("must provide locations or item_ids, and not both")
+        if item_ids is not None:
+            # sorted, so that the batches' rows come out in item_id order
+            where_clauses = [
+                it.c.item_id.in_(batch)
+                for batch in chunked(sorted({int(item_id) for item_id in item_ids}), MAX_IN_LIST)
+            ]
+        else:
+            where_clause = it.c.perm_location.in_(locations)
+            if include_temporary:
+                where_clause = sqla.or_(where_clause, it.c.temp_location.in_(locations))
+            if not include_suppressed_mfhd:
+                where_clause = sqla.and_(mm.c.suppress_in_opac == "N", where_clause)
+            where_clauses = [where_clause]
+        columns = [
+            it.c.item_id,
+            mit.c.mfhd_id,
+            it.c.perm_location,
+            perm.c.location_code,
+            it.c.temp_location,
+            temp.c.location_code,
+            it.c.item_type_id,
+            it.c.temp_item_type_id,
+            it.c.media_type_id,
+            it.c.copy_number,
+            it.c.pieces,
+            it.c.price,
+            it.c.spine_label,
+            mit.c.item_enum,
+            mit.c.chron,
+            mit.c.year,
+            mit.c.caption,
+            mit.c.freetext,
+            note.c.item_note,
+        ]
+        from_obj = (
+            it.join(mit)
+            .join(mm)
+            .outerjoin(perm, perm.c.location_id == it.c.perm_location)
+            .outerjoin(temp, temp.c.location_id == it.c.temp_location)
+            .outerjoin(note)
+        )
+        queries = [
+            sqla.select(columns, where_clause, from_obj=[from_obj], use_labels=True).order_by(it.c.item_id)
+            for where_clause in where_clauses
+        ]
+
+        def rows_to_values(rows):
+            notes = [row[-1] for row in rows if row[-1] is not None]
+            return tuple(rows[0][:-1]) + (notes,)
+
+        return self._export_table(
+            dest,
+            queries,
+            ITEM_TABLE_COLUMNS,
+            rows_to_values,
+            operator.itemgetter(0),
+            table_format,
+            compress,
+            batch_size,
+            arraysize,
+            prefetchrows,
+        )
+
+    def export_holdings_table(
+        self,
+        dest,
+        locations=None,
+        lib_id=None,
+        include_suppressed=False,
+        table_format=None,
+        compress=None,
+        batch_size=50000,
+        arraysize=5000,
+        prefetchrows=None,
+    ):
+        """Write a table of holdings data to a CSV, Arrow IPC or Parquet file.
+
+        Works like export_items_table, with one row per holdings record and
+        bib it is attached to. The columns are listed in HOLDINGS_TABLE_COLUMNS.
+
+        You must provide exactly one of locations or lib_id.
+
+        :param dest: path or writable binary stream
+        :param locations: list of location IDs whose holdings to export
+        :param lib_id: library ID whose holdings to export
+        :param include_suppressed: whether suppressed records should be included
+        :param table_format: "csv", "arrow" or "parquet"; by default, from the ending of dest, or CSV
+        :param compress: whether to gzip the output; by default, paths ending in .gz are compressed
+        :param batch_size: number of holdings per batch (Arrow record batch or Parquet row group)
+        :param arraysize: rows fetched per round trip
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict of rows, batches, seconds and rows_per_second
+        """
+        mm = self.tables["mfhd_master"]
+        bmf = self.tables["bib_mfhd"]
+        loc = self.tables["location"]
+        mh = self.tables["mfhd_history"]
+        history = (
+            sqla.select(
+                [mh.c.mfhd_id, sqla.func.max(mh.c.action_date).label("last_date")]
+            )
+            .group_by(mh.c.mfhd_id)
+            .alias("history")
+        )
+        if locations and lib_id is None:
+            where_clause = mm.c.location_id.in_(locations)
+        elif lib_id:
+            where_clause = loc.c.library_id == lib_id
+        else:
+            raise ValueError("must provide locations or lib_id, and not both")
+        if not include_suppressed:
+            where_clause = sqla.and_(mm.c.suppress_in_opac == "N", where_clause)
+        query = sqla.select(
+            [
+                mm.c.mfhd_id,
+                bmf.c.bib_id,
+                mm.c.location_id,
+                loc.c.location_code,
+                loc.c.location_display_name,
+                mm.c.display_call_no,
+                mm.c.suppress_in_opac,
+                history.c.last_date,
             ],
+            where_clause,
+            from_obj=[
+                mm.join(loc)
+                .outerjoin(bmf, bmf.c.mfhd_id == mm.c.mfhd_id)
+                .outerjoin(history, history.c.mfhd_id == mm.c.mfhd_id)
+            ],
+            use_labels=True,
+        ).order_by(mm.c.mfhd_id, bmf.c.bib_id)
+
+        def rows_to_values(rows):
+            row = rows[0]
+            return tuple(row[:6]) + (row[6] == "Y", row[7])
+
+        return self._export_table(
+            dest,
+            [query],
+            HOLDINGS_TABLE_COLUMNS,
+            rows_to_values,
+            operator.itemgetter(0, 1),
+            table_format,
+            compress,
+            batch_size,
+            arraysize,
+            prefetchrows,
+        )
+
+    def get_items(
+        self,
+        item_ids,
+        include_barcodes=False,
+        include_statuses=False,
+        batch_size=500,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Get many item records, fetching them in batches.
+
+        Items are yielded in the order of ``item_ids``; IDs that don't
+        exist are skipped with a warning.
+
+        :param item_ids: iterable of Voyager item IDs
+        :param include_barcodes: bool, whether to attach each item's active barcode
+        :param include_statuses: bool, whether to attach each item's statuses
+        :param batch_size: number of items to fetch per query (at most 1000)
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: iterator of ItemRecord objects
+        """
+        item_table = self.tables["item"]
+        for batch in chunked(item_ids, min(batch_size, MAX_IN_LIST)):
+            items = {
+                item.item_id: item
+                for item in self._load_items(
+                    item_table.c.item_id.in_(batch),
+                    include_barcodes=include_barcodes,
+                    include_statuses=include_statuses,
+                    batch_size=MAX_IN_LIST,
+                    arraysize=arraysize,
+                    prefetchrows=prefetchrows,
+                )
+            }
+            for item_id in batch:
+                try:
+                    yield items[int(item_id)]
+                except KeyError:
+                    warnings.warn("item %s not found" % item_id)
+
+    def get_item_batch(
+        self,
+        item_ids,
+        include_barcodes=False,
+        include_statuses=False,
+        batch_size=500,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Get many item records as a compact ItemBatch.
+
+        See get_items; use ``ItemBatch.from_items`` with iter_items to load
+        whole locations the same way.
+
+        :param item_ids: iterable of Voyager item IDs
+        :param include_barcodes: bool, whether to attach each item's active barcode
+        :param include_statuses: bool, whether to attach each item's statuses
+        :param batch_size: number of items to fetch per query (at most 1000)
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: ItemBatch
+        """
+        return ItemBatch.from_items(
+            self.get_items(
+                item_ids,
+                include_barcodes=include_barcodes,
+                include_statuses=include_statuses,
+                batch_size=batch_size,
+                arraysize=arraysize,
+                prefetchrows=prefetchrows,
+            ),
+            self,
         )
-        r = self.engine.execute(q)
-        for row in r:
-            yield self.get_item(row[0])
+
+    def _load_items(
+        self,
+        where_clause,
+        include_barcodes=False,
+        include_statuses=False,
+        batch_size=500,
+        join_mfhd_master=False,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Build item records from one streaming query.
+
+        Rows are ordered by item ID so that the several rows of an item
+        with more than one note can be folded into one record. Barcodes
+        and statuses are then fetched with one query per batch of items.
+
+        :param where_clause: sqlalchemy clause selecting the items
+        :param include_barcodes: bool, whether to attach each item's active barcode
+        :param include_statuses: bool, whether to attach each item's statuses
+        :param batch_size: number of items for which barcodes and statuses are fetched per query
+        :param join_mfhd_master: whether where_clause refers to the mfhd_master table
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: iterator of ItemRecord objects
+        """
+        query = ItemRecord.select_rows(self, where_clause, join_mfhd_master)
+        result = self._execute(
+            query.order_by(self.tables["item"].c.item_id), arraysize, prefetchrows
+        )
+        items = self._items_from_rows(result)
+        batch_size = min(batch_size, MAX_IN_LIST)
+        for batch in chunked(items, batch_size):
+            item_ids = [item.item_id for item in batch]
+            if include_barcodes:
+                barcodes = self._active_barcodes(item_ids, arraysize, prefetchrows)
+                for item in batch:
+                    item.barcode = barcodes.get(item.item_id)
+            if include_statuses:
+                statuses = self._statuses_for_items(item_ids, arraysize, prefetchrows)
+                for item in batch:
+                    item.statuses = statuses.get(item.item_id, [])
+            for item in batch:
+                yield item
+
+    def _items_from_rows(self, result):
+        """Build item records from rows ordered by item ID.
+
+        :param result: rows from the query built by ItemRecord.select_rows
+        :return: iterator of ItemRecord objects
+        """
+        tracer = self.tracer
+        for item_id, rows in itertools.groupby(result, key=lambda row: row["item_id"]):
+            with span(tracer, "fetch", item_id):
+                rows = list(rows)
+            with span(tracer, "construct", item_id):
+                item = ItemRecord.from_rows(rows, self)
+            yield item
+
+    def _active_barcodes(self, item_ids, arraysize=None, prefetchrows=None):
+        """Get the active barcode for each of a list of items.
+
+        :param item_ids: list of at most 1000 Voyager item IDs
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict mapping item ID to barcode
+        """
+        ib = self.tables["item_barcode"]
+        query = sqla.select(
+            [ib.c.item_id, ib.c.item_barcode],
+            sqla.and_(ib.c.item_id.in_(item_ids), ib.c.barcode_status == "1"),
+        )
+        barcodes = {}
+        for item_id, barcode in self._execute(query, arraysize, prefetchrows):
+            barcodes.setdefault(item_id, barcode)
+        return barcodes
+
+    def _statuses_for_items(self, item_ids, arraysize=None, prefetchrows=None):
+        """Get the statuses for each of a list of items.
+
+        :param item_ids: list of at most 1000 Voyager item IDs
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict mapping item ID to a list of status descriptions
+        """
+        status_table = self.tables["item_status"]
+        query = (
+            sqla.sql.select(
+                [status_table.c.item_id, self.tables["item_status_type"].c.item_status_desc]
+            )
+            .select_from(status_table.join(self.tables["item_status_type"]))
+            .where(status_table.c.item_id.in_(item_ids))
+        )
+        statuses = {}
+        for item_id, status in self._execute(query, arraysize, prefetchrows):
+            statuses.setdefault(item_id, []).append(status)
+        return statuses
 
     def get_item(self, item_id=None, barcode=None):
         """
@@ -335,6 +2261,81 @@ class Voy(object):
         else:
             return ItemRecord.from_barcode(barcode, self)
 
+    def get_items_by_barcodes(
+        self,
+        barcodes,
+        include_statuses=False,
+        batch_size=MAX_IN_LIST,
+        arraysize=None,
+        prefetchrows=None,
+    ):
+        """Get the items for many barcodes, resolving them in batches.
+
+        Each batch of barcodes takes one query to find the items and one
+        for the items themselves, whatever the number of barcodes. Like
+        get_barcode, active barcodes (barcode_status "1") are preferred:
+        a barcode is only resolved through an inactive one if no item has
+        it as an active barcode. A barcode still attached to more than
+        one item resolves to the item with the lowest ID, and is listed
+        in duplicates. Each active barcode gets an ItemRecord with its
+        barcode set, even when it shares the item with another barcode.
+
+        :param barcodes: iterable of barcodes
+        :param include_statuses: bool, whether to attach each item's statuses
+        :param batch_size: number of barcodes to resolve per query (at most 1000)
+        :param arraysize: rows fetched per round trip, instead of the Voy's setting
+        :param prefetchrows: rows returned with the execution, instead of the Voy's setting
+        :return: dict of items (dict mapping barcode to ItemRecord), misses (list of barcodes
+            without an item, in the order given) and duplicates (dict mapping barcode to the IDs of its items)
+        """
+        ib = self.tables["item_barcode"]
+        item_table = self.tables["item"]
+        found = {}
+        misses = []
+        duplicates = {}
+        barcodes = list(dict.fromkeys(barcodes))
+        for batch in chunked(barcodes, min(batch_size, MAX_IN_LIST)):
+            candidates = {}
+            query = sqla.select(
+                [ib.c.item_barcode, ib.c.item_id, ib.c.barcode_status],
+                ib.c.item_barcode.in_(batch),
+            )
+            for barcode, item_id, status in self._execute(query, arraysize, prefetchrows):
+                active, inactive = candidates.setdefault(barcode, (set(), set()))
+                (active if status == "1" else inactive).add(int(item_id))
+            resolved = {}
+            for barcode, (active, inactive) in candidates.items():
+                item_ids = sorted(active or inactive)
+                if len(item_ids) > 1:
+                    duplicates[barcode] = item_ids
+                resolved[barcode] = (item_ids[0], bool(active))
+            items = {}
+            item_ids = sorted({item_id for item_id, _ in resolved.values()})
+            if item_ids:
+                for item in self._load_items(
+                    item_table.c.item_id.in_(item_ids),
+                    include_statuses=include_statuses,
+                    batch_size=MAX_IN_LIST,
+                    arraysize=arraysize,
+                    prefetchrows=prefetchrows,
+                ):
+                    items[item.item_id] = item
+            claimed = set()
+            for barcode in batch:
+                item_id, active = resolved.get(barcode, (None, False))
+                item = items.get(item_id)
+                if item is None:
+                    misses.append(barcode)
+                    continue
+                if active:
+                    # an item with several active barcodes gets a record for each
+                    if item_id in claimed:
+                        item = copy.copy(item)
+                    claimed.add(item_id)
+                    item.barcode = barcode
+                found[barcode] = item
+        return {"items": found, "misses": misses, "duplicates": duplicates}
+
     def get_item_statuses(self, item_id):
         """
         Get the statuses from a single item.
@@ -352,22 +2353,58 @@ class Voy(object):
         r = self.engine.execute(query)
         return [row[0] for row in r]
 
+    def get_item_statuses_many(self, item_ids, batch_size=MAX_IN_LIST):
+        """
+        Get the statuses of many items, with one query per batch.
+
+        :param item_ids: iterable of Voyager item IDs
+        :param batch_size: number of items to look up per query (at most 1000)
+        :return: dict mapping each item ID to a list of status descriptions, empty for unknown items
+        """
+        statuses = {}
+        for batch in chunked((int(item_id) for item_id in item_ids), min(batch_size, MAX_IN_LIST)):
+            found = self._statuses_for_items(batch)
+            for item_id in batch:
+                statuses[item_id] = found.get(item_id, [])
+        return statuses
+
     def bib_id_for_item(self, item_id):
         """
         Get the bibliographic record ID associated with an item record.
 
+        An item whose holdings are attached to several bibs, such as a
+        bound-with, gets the lowest of their IDs; see bib_ids_for_items
+        for all of them.
+
         :param int item_id: the Voyager item ID
         :return: int: the bib ID
         """
-        query = (
-            sqla.sql.select([self.tables["bib_mfhd"].c.bib_id])
-            .select_from(self.tables["mfhd_item"].join(self.tables["bib_mfhd"]))
-            .where(self.tables["mfhd_item"].c.item_id == item_id)
-        )
+        bib_ids = self.bib_ids_for_items([item_id]).get(int(item_id))
+        if not bib_ids:
+            raise NoSuchItemException("bib for item %s not found" % item_id)
+        return bib_ids[0]
 
-        result = self.engine.execute(query)
-        (row,) = result
-        return row[0]
+    def bib_ids_for_items(self, item_ids, batch_size=MAX_IN_LIST):
+        """
+        Get the bibliographic record IDs associated with many items, with one query per batch.
+
+        :param item_ids: iterable of Voyager item IDs
+        :param batch_size: number of items to look up per query (at most 1000)
+        :return: dict mapping item ID to a list of bib IDs, lowest first; unknown items are left out
+        """
+        mit = self.tables["mfhd_item"]
+        bmf = self.tables["bib_mfhd"]
+        bib_ids = {}
+        for batch in chunked(item_ids, min(batch_size, MAX_IN_LIST)):
+            query = (
+                sqla.sql.select([mit.c.item_id, bmf.c.bib_id])
+                .select_from(mit.join(bmf))
+                .where(mit.c.item_id.in_(batch))
+                .order_by(mit.c.item_id, bmf.c.bib_id)
+            )
+            for item_id, bib_id in self._execute(query):
+                bib_ids.setdefault(int(item_id), []).append(int(bib_id))
+        return bib_ids
 
     def get_bib_create_datetime(self, bib_id):
         """Get date when a record was added.
@@ -396,12 +2433,190 @@ class Voy(object):
         (row,) = result
         return int(row.location_id)
 
+    def get_cat_location_id(self):
+        """Get the numeric ID of the cataloging location, looking it up only the first time.
+
+        :return: int: numeric location id
+        """
+        if self._cat_location_id is None:
+            self._cat_location_id = self.get_location_id(self.cat_location)
+        return self._cat_location_id
+
+    def save_items(self, items, read_ahead_size=100):
+        """Save many item records back to the database with BatchCat.
+
+        The cataloging location is looked up once for all of the items,
+        and items from an iterator (such as iter_items or get_items) are
+        read in a background thread, so that fetching them overlaps with
+        the BatchCat calls. An item that BatchCat fails to save doesn't
+        stop the others; its error is collected instead of raised.
+
+        :param items: iterable of ItemRecord objects
+        :param read_ahead_size: number of items to read ahead of BatchCat; 0 to read them as they're saved
+        :return: dict of saved and failed counts, results (item ID to UpdateItemData result),
+            errors (item ID to message), seconds and items_per_second
+        """
+        if self.batchcat is None:
+            raise BatchCatNotAvailableError
+        bc = self.batchcat.bc
+        cat_location_id = self.get_cat_location_id()
+        if read_ahead_size:
+            items = read_ahead(items, read_ahead_size)
+        results = {}
+        errors = {}
+        count = 0
+        start = time.perf_counter()
+        for item in items:
+            count += 1
+            try:
+                item._set_batchcat_item(bc.cItem)
+                result = bc.UpdateItemData(CatLocationID=cat_location_id)
+            except Exception as e:
+                errors[item.item_id] = "UpdateItemData exception: {!r}".format(e)
+                continue
+            results[item.item_id] = result
+            if result[0]:
+                errors[item.item_id] = "UpdateItemData error: {}".format(result)
+        seconds = time.perf_counter() - start
+        return {
+            "saved": count - len(errors),
+            "failed": len(errors),
+            "results": results,
+            "errors": errors,
+            "seconds": seconds,
+            "items_per_second": count / seconds if seconds else 0.0,
+        }
+
+
+class _MarcRecord(object):
+    """
+    Base for records holding MARC that is decoded only when it's used.
+
+    The record may be given as a pymarc.Record or as the bytes of a MARC
+    record, which are decoded on first access to the record attribute,
+    to an attribute of the pymarc record, or to a field by tag. A record
+    that can't be decoded raises PyVgerException at that point. Voy
+    checks the leader, directory and encoding of records as it builds
+    them, so that the bulk methods can skip bad records with a warning
+    instead; a record that passes the check but still can't be decoded
+    is rare.
+
+    See project to decode only some of the fields.
+
+    Subclasses set record_type, and id_attribute to the name of the
+    attribute holding the record's Voyager ID.
+    """
+
+    __slots__ = ("_raw", "_record", "_projection")
+
+    record_type = None
+    id_attribute = None
+
+    def _set_record(self, record):
+        if isinstance(record, (bytes, bytearray)):
+            self._raw = bytes(record)
+            self._record = None
+        else:
+            self._raw = None
+            self._record = record
+        self._projection = None
+
+    def _projected(self, tags):
+        """Get the projected fields, if the projection covers all of tags and the record isn't decoded."""
+        if self._projection is None or self._record is not None:
+            return None
+        projected_tags, fields = self._projection
+        if not tags or not projected_tags.issuperset(tags):
+            return None
+        return [field for field in fields if field.tag in tags]
+
+    def project(self, tags):
+        """Decode only the fields with the given tags.
+
+        Fields are found through the record directory and decoded into
+        lightweight pyvger.marc.ControlField and DataField objects, without
+        building a pymarc record. Until the whole record is decoded,
+        get_fields and access by tag for these tags use them; any other
+        use of the record decodes it as usual.
+
+        :param tags: iterable of field tags
+        :return: this record
+        """
+        if self._record is None:
+            tags = frozenset(tags)
+            try:
+                with span(getattr(self.interface, "tracer", None), "project", self.record_id):
+                    fields = extract_fields(self._raw, tags)
+            except (ValueError, UnicodeDecodeError) as e:
+                raise PyVgerException(
+                    "Can't decode MARC for %s %s" % (self.record_type, self.record_id)
+                ) from e
+            self._projection = (tags, fields)
+        return self
+
+    def get_fields(self, *tags):
+        """Get the fields with the given tags, from the projection if it has them."""
+        fields = self._projected(tags)
+        if fields is None:
+            return self.record.get_fields(*tags)
+        return fields
+
+    @property
+    def record_id(self):
+        """Get the Voyager ID of the record."""
+        return getattr(self, self.id_attribute)
+
+    @property
+    def record(self):
+        """Get the pymarc record, decoding the MARC if it hasn't been decoded yet."""
+        if self._record is None and self._raw is not None:
+            with span(getattr(self.interface, "tracer", None), "decode", self.record_id):
+                self._record = _parse_marc(self._raw, self.record_type, self.record_id)
+        return self._record
+
+    @record.setter
+    def record(self, record):
+        self._set_record(record)
+
+    @property
+    def decoded(self):
+        """Whether the MARC has been decoded into a pymarc record."""
+        return self._record is not None
+
+    @property
+    def raw_marc(self):
+        """Get the bytes of the MARC record.
+
+        Until the record has been decoded these are the bytes as stored in
+        Voyager, returned without decoding them; afterwards the pymarc
+        record is serialized, so that changes made to it are included.
+        """
+        if self._record is None:
+            return self._raw
+        return self._record.as_marc()
+
+    def __getattr__(self, item):
+        """Pass on attributes of the pymarc record."""
+        if item in ("_raw", "_record", "_projection", "record"):
+            raise AttributeError(item)
+        if hasattr(self.record, item):
+            return getattr(self.record, item)
+
+    def __getitem__(self, item):
+        """Pass on item access for the pymarc record, or use the projected fields."""
+        fields = self._projected((item,))
+        if fields is None:
+            return self.record[item]
+        if not fields:
+            raise KeyError(item)
+        return fields[0]
+
 
-class BibRecord(object):
+class BibRecord(_MarcRecord):
     """
     A voyager bibliographic record.
 
-    :param record: a valid MARC bibliographic record
+    :param record: a valid MARC bibliographic record, as a pymarc.Record or bytes
     :param suppressed: boolean; whether the record is suppressed in OPAC
     :param bibid: bibliographic record ID
     :param voyager_interface: Voy object to which this record belongs
@@ -413,48 +2628,51 @@ class BibRecord(object):
     will ignore the TZ and fail because it thinks your datetime is off by your local offset.
     """
 
+    __slots__ = ("suppressed", "bibid", "last_date", "interface", "_holdings")
+
+    record_type = "bib"
+    id_attribute = "bibid"
+
     def __init__(self, record, suppressed, bibid, voyager_interface, last_date=None):
-        self.record = record
+        self._set_record(record)
         self.suppressed = suppressed
         self.bibid = bibid
         self.last_date = last_date
         self.interface = voyager_interface
-
-    def __getattr__(self, item):
-        """Pass on attributes of the pymarc record."""
-        if hasattr(self.record, item):
-            return getattr(self.record, item)
-
-    def __getitem__(self, item):
-        """Pass on item access for the pymarc record."""
-        return self.record[item]
+        self._holdings = None
 
     def holdings(self):
         """Get the holdings for this bibliographic record.
 
+        Holdings loaded along with the bib (see Voy.load_related) are
+        returned without querying the database.
+
         :return: a list of HoldingsRecord objects
         """
-        curs = self.interface.connection.cursor()
-        result = curs.execute(
-            """SELECT mfhd_id
-        FROM %(db)s.bib_mfhd
-        WHERE bib_mfhd.bib_id=:bib"""
-            % {"db": self.interface.oracle_database},
-            {"bib": self.bibid},
-        )
+        if self._holdings is not None:
+            return list(self._holdings)
+        with self.interface._cursor() as curs:
+            result = curs.execute(
+                """SELECT mfhd_id
+            FROM %(db)s.bib_mfhd
+            WHERE bib_mfhd.bib_id=:bib"""
+                % {"db": self.interface.oracle_database},
+                {"bib": self.bibid},
+            )
+            mfhdids = [rec[0] for rec in result]
 
         rv = []
-        for rec in result:
-            rv.append(self.interface.get_mfhd(rec[0]))
+        for mfhdid in mfhdids:
+            rv.append(self.interface.get_mfhd(mfhdid))
 
         return rv
 
 
-class HoldingsRecord(object):
+class HoldingsRecord(_MarcRecord):
     """
     A single Voyager holding.
 
-    :param record: a valid MARC-encoded holdings record
+    :param record: a valid MARC-encoded holdings record, as a pymarc.Record or bytes
     :param suppressed: boolean; whether record is suppressed in OPAC
     :param mfhdid: holdings ID in database
     :param voyager_interface: the Voy instance to which this record belongs
@@ -468,6 +2686,19 @@ class HoldingsRecord(object):
     will ignore the TZ and fail because it thinks your datetime is off by your local offset.
     """
 
+    __slots__ = (
+        "suppressed",
+        "mfhdid",
+        "interface",
+        "location",
+        "location_display_name",
+        "last_date",
+        "_items",
+    )
+
+    record_type = "mfhd"
+    id_attribute = "mfhdid"
+
     def __init__(
         self,
         record,
@@ -478,39 +2709,41 @@ class HoldingsRecord(object):
         location_display_name,
         last_date,
     ):
-        self.record = record
+        self._set_record(record)
         self.suppressed = suppressed
         self.mfhdid = mfhdid
         self.interface = voyager_interface
         self.location = location
         self.location_display_name = location_display_name
         self.last_date = last_date
+        self._items = None
 
-    def __getattr__(self, item):
-        """Pass on attributes of the pymarc record."""
-        if hasattr(self.record, item):
-            return getattr(self.record, item)
+    def get_items(self, include_barcodes=False, include_statuses=False):
+        """Return a list of ItemRecords for the holding's items.
 
-    def __getitem__(self, item):
-        """Pass on item access for the pymarc record."""
-        return self.record[item]
+        Items loaded along with the holding (see Voy.load_related) are
+        returned without querying the database, if they were loaded with
+        the barcodes and statuses asked for.
 
-    def get_items(self):
-        """Return a list of ItemRecords for the holding's items."""
+        :param include_barcodes: bool, whether to attach each item's active barcode
+        :param include_statuses: bool, whether to attach each item's statuses
+        """
+        if self._items is not None:
+            items, barcodes, statuses = self._items
+            if (barcodes or not include_barcodes) and (statuses or not include_statuses):
+                return list(items)
         mi_table = self.interface.tables["mfhd_item"]
-        query = sqla.select([mi_table.c.item_id]).where(
-            mi_table.c.mfhd_id == self.mfhdid
+        return list(
+            self.interface._load_items(
+                mi_table.c.mfhd_id == self.mfhdid,
+                include_barcodes=include_barcodes,
+                include_statuses=include_statuses,
+            )
         )
-        res = self.interface.engine.execute(query)
-        try:
-            return [self.interface.get_item(i[0]) for i in res]
-        except NoSuchItemException:
-            print("failed for mfhd %s" % self.mfhdid)
-            raise
 
     def get_bib(self):
         """Return the bib record to which this holding is attached."""
-        return self.interface.get_bib(self.record["004"].data)
+        return self.interface.get_bib(self["004"].data)
 
 
 class ItemRecord(object):
@@ -534,9 +2767,37 @@ class ItemRecord(object):
     :param int temp_type_id:
     :param str year:
     :param Voy voyager_interface:
-    :param str note:
+    :param str note: the item's first note
+    :param list notes: all of the item's notes
+    :param str barcode: the item's active barcode, if it has been loaded
+    :param list statuses: the item's status descriptions, if they have been loaded
     """
 
+    __slots__ = (
+        "holding_id",
+        "item_id",
+        "item_type_id",
+        "perm_location_id",
+        "add_item_to_top",
+        "caption",
+        "chron",
+        "copy_number",
+        "enumeration",
+        "free_text",
+        "media_type_id",
+        "piece_count",
+        "price",
+        "spine_label",
+        "temp_location_id",
+        "temp_type_id",
+        "year",
+        "voyager_interface",
+        "note",
+        "notes",
+        "barcode",
+        "statuses",
+    )
+
     def __init__(
         self,
         holding_id=None,
@@ -558,6 +2819,9 @@ class ItemRecord(object):
         year="",
         voyager_interface=None,
         note="",
+        notes=None,
+        barcode=None,
+        statuses=None,
     ):
         self.holding_id = holding_id
         self.item_id = item_id
@@ -578,6 +2842,11 @@ class ItemRecord(object):
         self.year = year
         self.voyager_interface = voyager_interface
         self.note = note
+        if notes is None:
+            notes = [note] if note else []
+        self.notes = notes
+        self.barcode = barcode
+        self.statuses = statuses
 
     def get_mfhd(self):
         """Retrieve the holdings record to which this item is attached."""
@@ -590,8 +2859,15 @@ class ItemRecord(object):
         return self.voyager_interface.get_mfhd(rows[0]["mfhd_id"])
 
     @classmethod
-    def from_id(cls, item_id, voyager_interface):
-        """Get item given ID."""
+    def select_rows(cls, voyager_interface, whereclause, join_mfhd_master=False):
+        """Build the query for the database rows of items.
+
+        An item with several notes has one row per note.
+
+        :param Voy voyager_interface:
+        :param whereclause: sqlalchemy clause selecting the items
+        :param bool join_mfhd_master: whether to join the mfhd_master table for use in whereclause
+        """
         it = voyager_interface.tables["item"]
         mit = voyager_interface.tables["mfhd_item"]
         item_note_table = voyager_interface.tables["item_note"]
@@ -616,21 +2892,26 @@ class ItemRecord(object):
             mit.c.year,
         ]
 
-        q = sqla.select(
+        joined = it.join(mit)
+        if join_mfhd_master:
+            joined = joined.join(voyager_interface.tables["mfhd_master"])
+
+        return sqla.select(
             columns,
-            it.c.item_id == item_id,
-            from_obj=[it.join(mit).outerjoin(item_note_table)],
+            whereclause,
+            from_obj=[joined.outerjoin(item_note_table)],
             use_labels=False,
         )
-        result = voyager_interface.engine.execute(q)
-        rows = [x for x in result]
-        if not rows:
-            raise NoSuchItemException("item %s not found" % item_id)
-        if len(rows) != 1:
-            print("many notes on item %s" % item_id)
-            print(rows)
 
+    @classmethod
+    def from_rows(cls, rows, voyager_interface):
+        """Build an item from its database rows.
+
+        :param rows: rows from the query built by select_rows for a single item
+        :param Voy voyager_interface:
+        """
         data = rows[0]
+        notes = [row["item_note"] for row in rows if row["item_note"] is not None]
 
         price = f'{Decimal(data["price"]) / 100:.2f}'
 
@@ -640,6 +2921,7 @@ class ItemRecord(object):
             enumeration=data["item_enum"],
             chron=data["chron"],
             note=data["item_note"],
+            notes=notes,
             holding_id=data["mfhd_id"],
             item_type_id=data["item_type_id"],
             caption=data["caption"],
@@ -655,6 +2937,17 @@ class ItemRecord(object):
             voyager_interface=voyager_interface,
         )
 
+    @classmethod
+    def from_id(cls, item_id, voyager_interface):
+        """Get item given ID."""
+        it = voyager_interface.tables["item"]
+        q = cls.select_rows(voyager_interface, it.c.item_id == item_id)
+        result = voyager_interface.engine.execute(q)
+        rows = [x for x in result]
+        if not rows:
+            raise NoSuchItemException("item %s not found" % item_id)
+        return cls.from_rows(rows, voyager_interface)
+
     @classmethod
     def from_barcode(cls, barcode, voyager_interface):
         """Get an item record given its barcode."""
@@ -673,6 +2966,8 @@ class ItemRecord(object):
 
     def get_barcode(self):
         """Look up the active bacode for this item."""
+        if self.barcode is not None:
+            return self.barcode
         ib = self.voyager_interface.tables["item_barcode"]
         q = sqla.select(
             [ib.c.item_barcode],
@@ -688,32 +2983,161 @@ class ItemRecord(object):
 
         return rows[0][0]
 
+    def _set_batchcat_item(self, item):
+        """Copy the item's values onto a BatchCat cItem object."""
+        item.HoldingId = self.holding_id
+        item.ItemID = self.item_id
+        item.ItemTypeID = self.item_type_id
+        item.PermLocationID = self.perm_location_id
+        item.Caption = self.caption or ""
+        item.Chron = self.chron or ""
+        item.CopyNumber = self.copy_number
+        item.Enumeration = self.enumeration or ""
+        item.FreeText = self.free_text or ""
+        item.MediaTypeID = self.media_type_id
+        item.PieceCount = self.piece_count
+        item.Price = self.price
+        item.SpineLabel = self.spine_label or ""
+        item.TempLocationID = self.temp_location_id
+        item.TempTypeID = self.temp_type_id
+        item.Year = self.year or ""
+
     def save(self):
-        """Save the item record back to the database."""
+        """Save the item record back to the database.
+
+        To save many items, Voy.save_items is faster.
+        """
         batchcat = self.voyager_interface.batchcat
         if batchcat is None:
             raise BatchCatNotAvailableError
         bc = batchcat.bc
-        bc.cItem.HoldingId = self.holding_id
-        bc.cItem.ItemID = self.item_id
-        bc.cItem.ItemTypeID = self.item_type_id
-        bc.cItem.PermLocationID = self.perm_location_id
-        bc.cItem.Caption = self.caption or ""
-        bc.cItem.Chron = self.chron or ""
-        bc.cItem.CopyNumber = self.copy_number
-        bc.cItem.Enumeration = self.enumeration or ""
-        bc.cItem.FreeText = self.free_text or ""
-        bc.cItem.MediaTypeID = self.media_type_id
-        bc.cItem.PieceCount = self.piece_count
-        bc.cItem.Price = self.price
-        bc.cItem.SpineLabel = self.spine_label or ""
-        bc.cItem.TempLocationID = self.temp_location_id
-        bc.cItem.TempTypeID = self.temp_type_id
-        bc.cItem.Year = self.year or ""
+        self._set_batchcat_item(bc.cItem)
         result = bc.UpdateItemData(
-            CatLocationID=self.voyager_interface.get_location_id(
-                self.voyager_interface.cat_location
-            )
+            CatLocationID=self.voyager_interface.get_cat_location_id()
         )
         if result[0]:
             raise PyVgerException("UpdateItemData error: {}".format(result))
+
+
+class ItemBatch(object):
+    """
+    Compact, column-oriented collection of items.
+
+    Integer fields are kept in arrays of machine integers and text fields
+    in lists of interned strings, so that the many items sharing a
+    location, type, status or enumeration share one copy of the text.
+    Indexing or iterating builds ItemRecord objects as they're needed.
+
+    For example, ``ItemBatch.from_items(voy.iter_items([1]))`` loads the
+    items of location 1 without keeping an ItemRecord for each.
+
+    :param voyager_interface: Voy given to the ItemRecords built from the batch
+    """
+
+    INT_COLUMNS = (
+        "item_id",
+        "holding_id",
+        "item_type_id",
+        "perm_location_id",
+        "copy_number",
+        "media_type_id",
+        "piece_count",
+        "temp_location_id",
+        "temp_type_id",
+    )
+    TEXT_COLUMNS = (
+        "caption",
+        "chron",
+        "enumeration",
+        "free_text",
+        "price",
+        "spine_label",
+        "year",
+        "note",
+        "barcode",
+    )
+    LIST_COLUMNS = ("notes", "statuses")
+
+    # stands for None in the integer columns
+    NULL = -(2 ** 63)
+
+    __slots__ = ("voyager_interface", "_columns", "_add_item_to_top")
+
+    def __init__(self, voyager_interface=None):
+        self.voyager_interface = voyager_interface
+        self._columns = {name: array.array("q") for name in self.INT_COLUMNS}
+        self._columns.update((name, []) for name in self.TEXT_COLUMNS)
+        self._columns.update((name, []) for name in self.LIST_COLUMNS)
+        self._add_item_to_top = bytearray()
+
+    @classmethod
+    def from_items(cls, items, voyager_interface=None):
+        """Build a batch from ItemRecords.
+
+        :param items: iterable of ItemRecord objects
+        :param voyager_interface: Voy for the batch; by default, that of the first item
+        :return: ItemBatch
+        """
+        batch = cls(voyager_interface)
+        for item in items:
+            if batch.voyager_interface is None:
+                batch.voyager_interface = item.voyager_interface
+            batch.append(item)
+        return batch
+
+    def append(self, item):
+        """Add an ItemRecord to the end of the batch."""
+        columns = self._columns
+        for name in self.INT_COLUMNS:
+            value = getattr(item, name)
+            columns[name].append(self.NULL if value is None else value)
+        for name in self.TEXT_COLUMNS:
+            columns[name].append(_intern(getattr(item, name)))
+        for name in self.LIST_COLUMNS:
+            values = getattr(item, name)
+            if values is not None:
+                values = tuple(_intern(value) for value in values)
+            columns[name].append(values)
+        self._add_item_to_top.append(bool(item.add_item_to_top))
+
+    def __len__(self):
+        return len(self._add_item_to_top)
+
+    def __getitem__(self, index):
+        """Build the ItemRecord at index."""
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("item index out of range")
+        values = {}
+        for name in self.INT_COLUMNS:
+            value = self._columns[name][index]
+            values[name] = None if value == self.NULL else value
+        for name in self.TEXT_COLUMNS:
+            values[name] = self._columns[name][index]
+        for name in self.LIST_COLUMNS:
+            value = self._columns[name][index]
+            values[name] = None if value is None else list(value)
+        return ItemRecord(
+            add_item_to_top=bool(self._add_item_to_top[index]),
+            voyager_interface=self.voyager_interface,
+            **values
+        )
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def column(self, name):
+        """Get the values of one field for all items, without building ItemRecords.
+
+        Integer columns are returned as a list with None for missing values.
+
+        :param name: name of an ItemRecord attribute
+        :return: list of values
+        """
+        if name in self.INT_COLUMNS:
+            return [None if value == self.NULL else value for value in self._columns[name]]
+        if name == "add_item_to_top":
+            return [bool(value) for value in self._add_item_to_top]
+        return list(self._columns[name])
@@ -17,3 +17,9 @@ class NoSuchItemException(PyVgerException):
     """Item doesn't exist in Voyager."""
 
     pass
+
+
+class ArrowNotAvailableError(PyVgerException):
+    """pyarrow isn't available; likely because the Arrow extra wasn't installed."""
+
+    pass
@@ -0,0 +1,138 @@
+"""Writers for tables of Voyager data, in CSV, Arrow IPC and Parquet formats."""
+import csv
+import io
+
+from pyvger.exceptions import ArrowNotAvailableError
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# file name endings and the formats they imply
+SUFFIXES = (
+    (".csv", "csv"),
+    (".csv.gz", "csv"),
+    (".arrow", "arrow"),
+    (".ipc", "arrow"),
+    (".feather", "arrow"),
+    (".parquet", "parquet"),
+)
+
+
+def table_format(dest, table_format=None):
+    """Work out the format of a table from its destination.
+
+    :param dest: path or binary stream
+    :param table_format: "csv", "arrow" or "parquet", or None to use the path's ending
+    :return: format name
+    """
+    if table_format is None:
+        if isinstance(dest, str):
+            for suffix, name in SUFFIXES:
+                if dest.endswith(suffix):
+                    return name
+        return "csv"
+    if table_format not in ("csv", "arrow", "parquet"):
+        raise ValueError("unknown table format %r" % table_format)
+    return table_format
+
+
+class CSVTableWriter(object):
+    """
+    Write batches of columns as CSV rows, with a header row.
+
+    List values are joined with " | ".
+
+    :param fp: writable binary stream; it is left open
+    :param columns: list of (name, kind) tuples
+    """
+
+    def __init__(self, fp, columns):
+        self.columns = columns
+        self._text = io.TextIOWrapper(fp, encoding="utf-8", newline="")
+        self._writer = csv.writer(self._text)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write(self, data):
+        """Write a batch.
+
+        :param data: dict of column name to list of values
+        """
+        columns = []
+        for name, kind in self.columns:
+            values = data[name]
+            if kind == "list":
+                values = [" | ".join(value) for value in values]
+            columns.append(values)
+        self._writer.writerows(zip(*columns))
+
+    def close(self):
+        """Flush the output, leaving the underlying stream open."""
+        self._text.flush()
+        self._text.detach()
+
+
+class ArrowTableWriter(object):
+    """
+    Write batches of columns to an Arrow IPC file or a Parquet file.
+
+    Requires pyarrow.
+
+    :param fp: writable binary stream; it is left open
+    :param columns: list of (name, kind) tuples
+    :param table_format: "arrow" or "parquet"
+    """
+
+    def __init__(self, fp, columns, table_format="arrow"):
+        if pyarrow is None:
+            raise ArrowNotAvailableError("pyarrow is needed for Arrow and Parquet output")
+        types = {
+            "int": pyarrow.int64(),
+            "str": pyarrow.string(),
+            "bool": pyarrow.bool_(),
+            "datetime": pyarrow.timestamp("us"),
+            "list": pyarrow.list_(pyarrow.string()),
+        }
+        self.schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        self.table_format = table_format
+        if table_format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(fp, self.schema)
+        else:
+            self._writer = pyarrow.ipc.new_file(fp, self.schema)
+
+    def write(self, data):
+        """Write a batch as one record batch or Parquet row group.
+
+        :param data: dict of column name to list of values
+        """
+        batch = pyarrow.record_batch(
+            [
+                pyarrow.array(data[field.name], type=field.type)
+                for field in self.schema
+            ],
+            schema=self.schema,
+        )
+        if self.table_format == "parquet":
+            self._writer.write_table(pyarrow.Table.from_batches([batch]))
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        """Finish the file, leaving the underlying stream open."""
+        self._writer.close()
+
+
+def table_writer(fp, columns, table_format):
+    """Create a writer for a table format.
+
+    :param fp: writable binary stream
+    :param columns: list of (name, kind) tuples; kinds are int, str, bool, datetime and list (of strings)
+    :param table_format: "csv", "arrow" or "parquet"
+    :return: CSVTableWriter or ArrowTableWriter
+    """
+    if table_format == "csv":
+        return CSVTableWriter(fp, columns)
+    return ArrowTableWriter(fp, columns, table_format)
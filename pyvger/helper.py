@@ -1,10 +1,154 @@
 """Helper functions."""
+import collections
+from concurrent import futures
+import contextlib
+import gzip
+import itertools
+import queue
+import threading
+
 import sqlalchemy as sqla
 
 raw = sqla.sql.expression.func.utl_i18n.string_to_raw
 nc = sqla.sql.expression.func.utl_i18n.raw_to_nchar
 
+# gzip level for exports; level 9 is several times slower for a few percent less output
+GZIP_LEVEL = 6
+
 
 def recode(column, encoding="utf8"):
     """Generate Oracle function to reencode bytes stored incorrectly."""
     return nc(raw(column), encoding)
+
+
+@contextlib.contextmanager
+def output_stream(dest, compress=None):
+    """Open a binary output stream for an export.
+
+    A path is opened for writing and closed afterwards; a stream is
+    written to and left open.
+
+    :param dest: path or writable binary stream
+    :param compress: whether to gzip the output; by default, only paths ending in .gz are compressed
+    :return: context manager giving a writable binary stream
+    """
+    if compress is None:
+        compress = isinstance(dest, str) and dest.endswith(".gz")
+    if isinstance(dest, str):
+        if compress:
+            fp = gzip.open(dest, "wb", compresslevel=GZIP_LEVEL)
+        else:
+            fp = open(dest, "wb")
+        with fp:
+            yield fp
+    elif compress:
+        with gzip.GzipFile(fileobj=dest, mode="wb", compresslevel=GZIP_LEVEL) as fp:
+            yield fp
+    else:
+        yield dest
+
+
+def chunked(iterable, size):
+    """Split an iterable into lists of at most size items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_ahead(iterable, size):
+    """Iterate over an iterable in a background thread, keeping up to size values ready.
+
+    This lets database fetches for an iterator such as Voy.iter_items
+    overlap with slow work done on its values, while the bounded queue
+    keeps a slow consumer from letting values pile up in memory. An
+    exception raised by the iterable is raised again by this iterator.
+
+    :param iterable: iterable to read
+    :param size: maximum number of values read ahead of the consumer
+    :return: iterator of the values of iterable
+    """
+    values = queue.Queue(maxsize=size)
+    done = object()
+    stop = threading.Event()
+
+    def put(value, error=None):
+        """Queue a value, giving up if the consumer has stopped."""
+        while not stop.is_set():
+            try:
+                values.put((value, error), timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read():
+        try:
+            for value in iterable:
+                if not put(value):
+                    return
+        except BaseException as e:
+            put(done, e)
+            return
+        put(done)
+
+    thread = threading.Thread(target=read, daemon=True)
+    thread.start()
+    try:
+        while True:
+            value, error = values.get()
+            if value is done:
+                if error is not None:
+                    raise error
+                return
+            yield value
+    finally:
+        stop.set()
+        thread.join()
+
+
+def parallel_batches(fetch, batches, workers, ordered=True, prefetch=2, executor=None):
+    """Run fetch on each batch in a thread pool.
+
+    At most ``workers * prefetch`` batches are submitted ahead of the
+    consumer, so a slow consumer doesn't let results pile up in memory.
+
+    :param fetch: function taking a batch and returning a list of results
+    :param batches: iterable of batches
+    :param workers: number of threads
+    :param ordered: if True, yield results in the order of batches; otherwise as soon as they're ready
+    :param prefetch: number of batches to keep in flight per worker
+    :param executor: concurrent.futures.Executor to use instead of a thread pool; it is left running
+    :return: iterator of fetch results
+    """
+    limit = workers * prefetch
+    own_executor = executor is None
+    if own_executor:
+        executor = futures.ThreadPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+    try:
+        for batch in batches:
+            pending.append(executor.submit(fetch, batch))
+            while len(pending) >= limit:
+                for result in _completed(pending, ordered):
+                    yield result
+        while pending:
+            for result in _completed(pending, ordered):
+                yield result
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=True)
+
+
+def _completed(pending, ordered):
+    """Remove finished futures from pending and return their results."""
+    if ordered:
+        return [pending.popleft().result()]
+    done, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+    for future in done:
+        pending.remove(future)
+    return [future.result() for future in done]
@@ -0,0 +1,325 @@
+"""Opt-in instrumentation of the queries a Voy runs."""
+import os
+import re
+import sys
+import threading
+import time
+import warnings
+
+# upper bounds, in seconds, of the statement latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+_TEST_DIR = os.path.join(_PACKAGE_DIR, "test")
+# modules whose functions are plumbing rather than API methods
+_PLUMBING = {os.path.join(_PACKAGE_DIR, name) for name in ("helper.py", "instrument.py")}
+
+# lists of numbered binds, as generated for IN lists, are collapsed so that
+# a statement is counted as one whatever the length of its lists
+_BIND_LIST = re.compile(r"(:[A-Za-z_]+?)_?\d+(?:\s*,\s*:[A-Za-z_]+?_?\d+)+")
+_QMARK_LIST = re.compile(r"\?(?:\s*,\s*\?)+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_statement(statement):
+    """Collapse whitespace and IN lists of binds, so that equivalent statements compare equal."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _BIND_LIST.sub(r"\1...", statement)
+    return _QMARK_LIST.sub("?...", statement)
+
+
+def _is_api(code):
+    """Whether code is a named function or method of pyvger."""
+    filename = code.co_filename
+    if not filename.startswith(_PACKAGE_DIR) or filename.startswith(_TEST_DIR):
+        return False
+    return filename not in _PLUMBING and not code.co_name.startswith("<")
+
+
+def _api_frame():
+    """Find the frame of the outermost pyvger function or method on the stack."""
+    found = None
+    frame = sys._getframe(2)
+    while frame is not None:
+        if _is_api(frame.f_code):
+            found = frame
+        frame = frame.f_back
+    return found
+
+
+class StatementStats(object):
+    """
+    Counters for one statement run by one API method.
+
+    :param api: qualified name of the pyvger method that ran the statement
+    :param statement: normalized statement text
+    :param buckets: upper bounds of the latency histogram buckets
+
+    :ivar count: number of executions
+    :ivar rows: number of rows fetched
+    :ivar execute_seconds: total time spent executing, including the first round trip
+    :ivar fetch_seconds: total time spent fetching rows after the execution
+    :ivar bucket_counts: number of executions whose execution time fell in each bucket, with one more for slower ones
+    """
+
+    __slots__ = ("api", "statement", "count", "rows", "execute_seconds", "fetch_seconds", "buckets", "bucket_counts")
+
+    def __init__(self, api, statement, buckets):
+        self.api = api
+        self.statement = statement
+        self.count = 0
+        self.rows = 0
+        self.execute_seconds = 0.0
+        self.fetch_seconds = 0.0
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+
+    def as_dict(self):
+        """Get the counters as a dict."""
+        return {
+            "api": self.api,
+            "statement": self.statement,
+            "count": self.count,
+            "rows": self.rows,
+            "execute_seconds": self.execute_seconds,
+            "fetch_seconds": self.fetch_seconds,
+            "histogram": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.bucket_counts)),
+        }
+
+
+class InstrumentedCursor(object):
+    """
+    Cursor wrapper that records executions and fetched rows.
+
+    :param cursor: DB-API cursor to wrap
+    :param instrumentation: QueryInstrumentation to record into
+    :param stats: StatementStats of a statement the cursor has already executed, or None
+    """
+
+    __slots__ = ("_cursor", "_instrumentation", "_stats")
+
+    def __init__(self, cursor, instrumentation, stats=None):
+        object.__setattr__(self, "_cursor", cursor)
+        object.__setattr__(self, "_instrumentation", instrumentation)
+        object.__setattr__(self, "_stats", stats)
+
+    def execute(self, statement, *args, **kwargs):
+        """Execute a statement, recording its execution time."""
+        start = time.perf_counter()
+        result = self._cursor.execute(statement, *args, **kwargs)
+        stats = self._instrumentation.record(statement, time.perf_counter() - start)
+        object.__setattr__(self, "_stats", stats)
+        return self if result is self._cursor else result
+
+    def _fetched(self, rows, start):
+        stats = self._stats
+        if stats is not None:
+            with self._instrumentation.lock:
+                stats.rows += rows
+                stats.fetch_seconds += time.perf_counter() - start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = next(self._cursor)
+        self._fetched(1, start)
+        return row
+
+    def fetchone(self):
+        """Fetch a row."""
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(row is not None, start)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        """Fetch several rows."""
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._fetched(len(rows), start)
+        return rows
+
+    def fetchall(self):
+        """Fetch the remaining rows."""
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows), start)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._cursor, name, value)
+
+
+class QueryInstrumentation(object):
+    """
+    Statement counts, rows fetched and latency histograms, by API method.
+
+    Every statement is attributed to the outermost pyvger method or
+    function on the call stack, which is the public method called, such
+    as Voy.iter_bibs or BibRecord.holdings, unless that returned an
+    iterator of a private method (just the method name before Python
+    3.11). Statements that differ only in the length of their IN lists
+    are counted together.
+
+    A statement run at least n_plus_one_threshold times by a single
+    call of an API method, such as a query per record inside an
+    iterator, is reported as an N+1 pattern, with a warning the first
+    time. Calls are told apart by their stack frame, so repeated calls
+    of a method from one loop may be counted together, which also points
+    at a loop that a bulk method could replace.
+
+    Enable it with Voy(instrumentation=True) or Voy.instrument(); it
+    costs a stack walk per statement and a few timer calls per row, and
+    nothing when disabled.
+
+    :param buckets: upper bounds, in seconds, of the latency histogram buckets
+    :param n_plus_one_threshold: executions of a statement in one call that count as an N+1 pattern
+
+    :ivar lock: lock guarding the counters, which may be updated from several threads
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, n_plus_one_threshold=20):
+        self.buckets = tuple(buckets)
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.lock = threading.Lock()
+        self._stats = {}
+        self._n_plus_one = {}
+        self._calls = threading.local()
+
+    def wrap(self, cursor):
+        """Wrap a DB-API cursor so that its executions and fetches are recorded."""
+        return InstrumentedCursor(cursor, self)
+
+    def record(self, statement, seconds):
+        """Record an execution of a statement.
+
+        :param statement: statement text
+        :param seconds: execution time
+        :return: StatementStats of the statement, to which fetched rows should be added
+        """
+        frame = _api_frame()
+        if frame is None:
+            api = "other"
+        else:
+            api = getattr(frame.f_code, "co_qualname", frame.f_code.co_name)
+        statement = normalize_statement(statement)
+        key = (api, statement)
+        bucket = 0
+        while bucket < len(self.buckets) and seconds > self.buckets[bucket]:
+            bucket += 1
+        with self.lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = StatementStats(api, statement, self.buckets)
+            stats.count += 1
+            stats.execute_seconds += seconds
+            stats.bucket_counts[bucket] += 1
+        if frame is not None:
+            self._count_call(frame, key)
+        return stats
+
+    def _count_call(self, frame, key):
+        """Count executions of a statement within the current call of an API method."""
+        call = (id(frame), frame.f_code)
+        if getattr(self._calls, "call", None) != call:
+            self._calls.call = call
+            self._calls.counts = {}
+        counts = self._calls.counts
+        count = counts[key] = counts.get(key, 0) + 1
+        if count < self.n_plus_one_threshold:
+            return
+        with self.lock:
+            first = key not in self._n_plus_one
+            self._n_plus_one[key] = max(count, self._n_plus_one.get(key, 0))
+        if first:
+            warnings.warn(
+                "N+1 queries: %s ran the same statement %d times: %s" % (key[0], count, key[1][:200])
+            )
+
+    def n_plus_one(self):
+        """Get the statements run repeatedly by a single call.
+
+        :return: list of dicts of api, statement and executions (the most in one call)
+        """
+        with self.lock:
+            return [
+                {"api": api, "statement": statement, "executions": count}
+                for (api, statement), count in sorted(self._n_plus_one.items())
+            ]
+
+    def reset(self):
+        """Clear all counters."""
+        with self.lock:
+            self._stats.clear()
+            self._n_plus_one.clear()
+        self._calls = threading.local()
+
+    def as_dict(self):
+        """Get the counters.
+
+        :return: dict of statements (list of StatementStats.as_dict results, most time first) and n_plus_one
+        """
+        with self.lock:
+            statements = [stats.as_dict() for stats in self._stats.values()]
+        statements.sort(key=lambda stats: stats["execute_seconds"] + stats["fetch_seconds"], reverse=True)
+        return {"statements": statements, "n_plus_one": self.n_plus_one()}
+
+    def prometheus(self, prefix="pyvger"):
+        """Get the counters in the Prometheus text exposition format.
+
+        :param prefix: prefix of the metric names
+        :return: str
+        """
+        with self.lock:
+            stats = sorted(self._stats.values(), key=lambda s: (s.api, s.statement))
+            rows = [
+                (s.api, s.statement, s.count, s.rows, s.execute_seconds, s.fetch_seconds, list(s.bucket_counts))
+                for s in stats
+            ]
+        n_plus_one = self.n_plus_one()
+        lines = []
+
+        def header(name, kind, text):
+            lines.append("# HELP %s_%s %s" % (prefix, name, text))
+            lines.append("# TYPE %s_%s %s" % (prefix, name, kind))
+
+        def labels(api, statement, **extra):
+            pairs = [("api", api), ("statement", statement)] + sorted(extra.items())
+            return "{%s}" % ",".join('%s="%s"' % (name, _escape(value)) for name, value in pairs)
+
+        header("statements_total", "counter", "Statements executed.")
+        for api, statement, count, _, _, _, _ in rows:
+            lines.append("%s_statements_total%s %d" % (prefix, labels(api, statement), count))
+        header("rows_fetched_total", "counter", "Rows fetched.")
+        for api, statement, _, fetched, _, _, _ in rows:
+            lines.append("%s_rows_fetched_total%s %d" % (prefix, labels(api, statement), fetched))
+        header("fetch_seconds_total", "counter", "Time spent fetching rows after execution.")
+        for api, statement, _, _, _, fetch_seconds, _ in rows:
+            lines.append("%s_fetch_seconds_total%s %r" % (prefix, labels(api, statement), fetch_seconds))
+        header("statement_seconds", "histogram", "Statement execution time.")
+        for api, statement, count, _, execute_seconds, _, bucket_counts in rows:
+            cumulative = 0
+            for bound, bucket_count in zip([repr(b) for b in self.buckets] + ["+Inf"], bucket_counts):
+                cumulative += bucket_count
+                lines.append(
+                    "%s_statement_seconds_bucket%s %d" % (prefix, labels(api, statement, le=bound), cumulative)
+                )
+            lines.append("%s_statement_seconds_sum%s %r" % (prefix, labels(api, statement), execute_seconds))
+            lines.append("%s_statement_seconds_count%s %d" % (prefix, labels(api, statement), count))
+        header("n_plus_one_executions", "gauge", "Most executions of a repeated statement in one API call.")
+        for finding in n_plus_one:
+            lines.append(
+                "%s_n_plus_one_executions%s %d"
+                % (prefix, labels(finding["api"], finding["statement"]), finding["executions"])
+            )
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value):
+    """Escape a Prometheus label value."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
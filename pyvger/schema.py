@@ -0,0 +1,212 @@
+"""Reflection of Voyager tables, and a persistent cache of their metadata."""
+from collections.abc import Mapping
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+
+import sqlalchemy as sqla
+
+from pyvger.constants import RELATIONS, TABLE_NAMES
+from pyvger.version import __version__
+
+
+def _cache_format():
+    """Identify the library versions and relations a cache file was written with."""
+    signature = repr((__version__, sqla.__version__, RELATIONS))
+    return hashlib.sha1(signature.encode("utf8")).hexdigest()
+
+
+class SchemaCache(object):
+    """
+    Reflected sqlalchemy metadata saved in a local file.
+
+    Entries are keyed by database and schema, and an entry is only used
+    while the schema fingerprint it was saved with still matches the one
+    computed from the database.
+
+    :param path: path of the cache file
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def _read(self):
+        """Read all entries from the cache file."""
+        try:
+            with open(self.path, "rb") as fp:
+                contents = pickle.load(fp)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            # an unreadable cache is a cache miss, never an error
+            return {}
+        if not isinstance(contents, dict) or contents.get("format") != _cache_format():
+            return {}
+        return contents["entries"]
+
+    def _write(self, entries):
+        """Atomically replace the cache file with the given entries."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                pickle.dump(
+                    {"format": _cache_format(), "entries": entries},
+                    fp,
+                    protocol=pickle.HIGHEST_PROTOCOL,
+                )
+            os.replace(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def load(self, key, fingerprint):
+        """Get cached metadata.
+
+        :param key: database and schema identifier
+        :param fingerprint: current schema fingerprint
+        :return: sqlalchemy.MetaData, or None if there is no valid entry
+        """
+        entry = self._read().get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        return entry[1]
+
+    def store(self, key, fingerprint, metadata):
+        """Save metadata to the cache.
+
+        :param key: database and schema identifier
+        :param fingerprint: schema fingerprint the metadata was reflected with
+        :param metadata: sqlalchemy.MetaData to save
+        """
+        entries = self._read()
+        entries[key] = (fingerprint, metadata)
+        self._write(entries)
+
+    def invalidate(self, key=None):
+        """Remove cached metadata.
+
+        :param key: database and schema identifier to remove; if None, remove everything
+        """
+        if key is None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+            return
+        entries = self._read()
+        if entries.pop(key, None) is not None:
+            self._write(entries)
+
+
+class LazyTables(Mapping):
+    """
+    Mapping of table names to sqlalchemy Tables, reflected on first access.
+
+    When a table is reflected, the relations between it and any table
+    that has already been reflected are added as foreign keys, so joins
+    between tables that have both been accessed work as usual. Reflection
+    is serialized, so the mapping can be shared between threads.
+
+    :param engine: sqlalchemy engine used for reflection
+    :param schema: database schema containing the tables
+    :param table_names: names of the tables available through the mapping
+    :param relations: pairs of (table, column) tuples, as in pyvger.constants.RELATIONS
+    :param cache: SchemaCache in which to save reflected tables
+    :param cache_key: database and schema identifier for the cache
+    :param fingerprint: function returning the current schema fingerprint
+    """
+
+    def __init__(
+        self,
+        engine,
+        schema,
+        table_names=TABLE_NAMES,
+        relations=RELATIONS,
+        cache=None,
+        cache_key=None,
+        fingerprint=None,
+    ):
+        self.engine = engine
+        self.schema = schema
+        self.table_names = list(table_names)
+        self.relations = list(relations)
+        self.cache = cache
+        self.cache_key = cache_key
+        self.fingerprint = fingerprint
+        self._fingerprint = None
+        self._lock = threading.RLock()
+        self.metadata = None
+        self.refresh(use_cache=True)
+
+    def refresh(self, use_cache=False):
+        """Forget reflected tables so they will be reflected again.
+
+        :param use_cache: bool, whether tables may be loaded from the cache
+        """
+        with self._lock:
+            metadata = None
+            if self.cache is not None:
+                self._fingerprint = self.fingerprint()
+                if use_cache:
+                    metadata = self.cache.load(self.cache_key, self._fingerprint)
+            if metadata is None:
+                metadata = sqla.MetaData()
+            self.metadata = metadata
+
+    def register(self, table_name, relations=()):
+        """Make another table available through the mapping.
+
+        :param table_name: name of the table in the database schema
+        :param relations: pairs of (table, column) tuples relating the table to others
+        """
+        with self._lock:
+            if table_name not in self.table_names:
+                self.table_names.append(table_name)
+            for relation in relations:
+                if relation not in self.relations:
+                    self.relations.append(relation)
+                    self._add_relations(relation[0][0])
+
+    def _key(self, table_name):
+        return "%s.%s" % (self.schema, table_name)
+
+    def _loaded(self, table_name):
+        return self._key(table_name) in self.metadata.tables
+
+    def _add_relations(self, table_name):
+        """Add foreign keys for relations between the table and other loaded tables."""
+        for parent, foreign in self.relations:
+            if table_name not in (parent[0], foreign[0]):
+                continue
+            if not (self._loaded(parent[0]) and self._loaded(foreign[0])):
+                continue
+            parent_column = self.metadata.tables[self._key(parent[0])].c[parent[1]]
+            foreign_column = self.metadata.tables[self._key(foreign[0])].c[foreign[1]]
+            if not parent_column.references(foreign_column):
+                parent_column.append_foreign_key(sqla.ForeignKey(foreign_column))
+
+    def __getitem__(self, table_name):
+        if table_name not in self.table_names:
+            raise KeyError(table_name)
+        with self._lock:
+            if not self._loaded(table_name):
+                sqla.Table(
+                    table_name,
+                    self.metadata,
+                    schema=self.schema,
+                    autoload=True,
+                    autoload_with=self.engine,
+                )
+                self._add_relations(table_name)
+                if self.cache is not None:
+                    self.cache.store(self.cache_key, self._fingerprint, self.metadata)
+            return self.metadata.tables[self._key(table_name)]
+
+    def __iter__(self):
+        return iter(self.table_names)
+
+    def __len__(self):
+        return len(self.table_names)
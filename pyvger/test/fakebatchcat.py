@@ -0,0 +1,73 @@
+"""Stand-in for the BatchCat COM object, for tests and benchmarks on any platform."""
+import time
+
+# cItem properties ItemRecord.save sets
+ITEM_PROPERTIES = (
+    "HoldingId",
+    "ItemID",
+    "ItemTypeID",
+    "PermLocationID",
+    "Caption",
+    "Chron",
+    "CopyNumber",
+    "Enumeration",
+    "FreeText",
+    "MediaTypeID",
+    "PieceCount",
+    "Price",
+    "SpineLabel",
+    "TempLocationID",
+    "TempTypeID",
+    "Year",
+)
+
+
+class FakeItem(object):
+    """Stand-in for the cItem object of BatchCat.ClassBatchCat; any property can be set."""
+
+
+class FakeBatchCat(object):
+    """
+    Stand-in for a connected BatchCat.ClassBatchCat object.
+
+    Only UpdateItemData is supported. Like the COM method, it saves the
+    properties currently set on cItem and returns a tuple whose first
+    value is 0 on success.
+
+    :param latency: seconds each call takes
+    :param errors: dict mapping item IDs to the nonzero return code UpdateItemData should give for them
+
+    :ivar updates: list of dicts of the cItem properties and CatLocationID of each UpdateItemData call
+    """
+
+    def __init__(self, latency=0, errors=None):
+        self.cItem = FakeItem()
+        self.latency = latency
+        self.errors = errors or {}
+        self.updates = []
+
+    def UpdateItemData(self, CatLocationID):  # noqa: N802, N803 - BatchCat's names
+        """Save the item set on cItem."""
+        if self.latency:
+            time.sleep(self.latency)
+        update = {name: getattr(self.cItem, name, None) for name in ITEM_PROPERTIES}
+        update["CatLocationID"] = CatLocationID
+        self.updates.append(update)
+        return (self.errors.get(update["ItemID"], 0),)
+
+
+class FakeBatchCatClient(object):
+    """
+    Stand-in for pyvger.batchcat.BatchCatClient.
+
+    Assign one to a Voy's batchcat attribute to save items without
+    Voyager, for example: ``voy.batchcat = FakeBatchCatClient(voy)``.
+
+    :param voy_interface: the Voy using the client
+    :param latency: seconds each BatchCat call takes
+    :param errors: dict mapping item IDs to the nonzero return code UpdateItemData should give for them
+    """
+
+    def __init__(self, voy_interface=None, latency=0, errors=None):
+        self.voy_interface = voy_interface
+        self.bc = FakeBatchCat(latency, errors)
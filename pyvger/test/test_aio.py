@@ -0,0 +1,114 @@
+"""Test suite for aio module."""
+import asyncio
+import threading
+import time
+import types
+
+from pyvger.aio import AsyncVoy
+
+
+class FakeVoy(object):
+    """Voy stand-in whose lookups block for a moment."""
+
+    def __init__(self, pool_max=8):
+        self.pool = None if pool_max is None else types.SimpleNamespace(max=pool_max)
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+
+    def get_bib(self, bibid, fields=None):
+        """Return bibid after a short wait."""
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        time.sleep(0.02)
+        with self.lock:
+            self.running -= 1
+        return bibid
+
+    def iter_bibs(self, lib_id):
+        """Yield numbers up to lib_id, counting as running until closed."""
+        with self.lock:
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+        try:
+            for bibid in range(lib_id):
+                yield bibid
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+def test_async_get_bib_concurrency():
+    """Test that lookups run concurrently up to the limit."""
+    voy = FakeVoy()
+
+    async def lookups():
+        async with AsyncVoy(voy, max_concurrency=3) as avoy:
+            return await asyncio.gather(*(avoy.get_bib(n) for n in range(9)))
+
+    assert _run(lookups()) == list(range(9))
+    assert voy.most_running == 3
+
+
+def test_async_single_connection():
+    """Test that lookups on a Voy without a session pool run one at a time."""
+    voy = FakeVoy(pool_max=None)
+
+    async def lookups():
+        async with AsyncVoy(voy, max_concurrency=3) as avoy:
+            return await asyncio.gather(*(avoy.get_bib(n) for n in range(4)))
+
+    assert _run(lookups()) == list(range(4))
+    assert voy.most_running == 1
+
+
+def test_async_iter_bibs():
+    """Test iterating asynchronously in chunks."""
+
+    async def collect():
+        async with AsyncVoy(FakeVoy(), chunk_size=4) as avoy:
+            return [bib async for bib in avoy.iter_bibs(lib_id=10)]
+
+    assert _run(collect()) == list(range(10))
+
+
+def test_async_pool_size():
+    """Test that concurrency is limited by the session pool, with each iterator holding a session."""
+    voy = FakeVoy(pool_max=2)
+
+    async def lookups():
+        async with AsyncVoy(voy, max_concurrency=8, chunk_size=1) as avoy:
+            assert avoy.max_concurrency == 2
+
+            async def iterate():
+                return [bib async for bib in avoy.iter_bibs(lib_id=3)]
+
+            return await asyncio.gather(iterate(), *(avoy.get_bib(n) for n in range(4)))
+
+    assert _run(lookups()) == [[0, 1, 2], 0, 1, 2, 3]
+    assert voy.most_running == 2
+
+
+def test_async_event_loops():
+    """Test using one AsyncVoy on one event loop after another."""
+    voy = FakeVoy()
+    avoy = AsyncVoy(voy, max_concurrency=2)
+
+    async def lookups():
+        return await asyncio.gather(*(avoy.get_bib(n) for n in range(3)))
+
+    try:
+        assert _run(lookups()) == [0, 1, 2]
+        assert _run(lookups()) == [0, 1, 2]
+    finally:
+        avoy.close()
+    assert voy.most_running == 2
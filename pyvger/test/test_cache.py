@@ -0,0 +1,51 @@
+"""Test suite for cache module."""
+import datetime
+
+from pyvger.cache import RecordCache, SQLiteRecordStore
+
+DAY1 = datetime.datetime(2020, 1, 1)
+DAY2 = datetime.datetime(2020, 1, 2)
+
+
+def test_lru_eviction():
+    """Test that the least recently used records are evicted first."""
+    cache = RecordCache(maxsize=2)
+    cache.put("bib", 1, DAY1, (b"one", "N", DAY1))
+    cache.put("bib", 2, DAY1, (b"two", "N", DAY1))
+    assert cache.get("bib", 1, DAY1).data[0] == b"one"
+    cache.put("bib", 3, DAY1, (b"three", "N", DAY1))
+    assert cache.get("bib", 2, DAY1) is None
+    assert cache.get("bib", 1, DAY1) is not None
+    assert cache.stats() == {
+        "hits": 2,
+        "misses": 1,
+        "evictions": 1,
+        "stale": 0,
+        "records": 2,
+        "bytes": 8,
+    }
+
+
+def test_byte_limit_and_stale_entries():
+    """Test the byte limit, and that a changed record is a miss."""
+    cache = RecordCache(max_bytes=5)
+    cache.put("mfhd", 1, DAY1, (b"abc",))
+    cache.put("mfhd", 2, DAY1, (b"def",))
+    assert len(cache) == 1
+    assert cache.get("mfhd", 2, DAY2) is None
+    assert cache.stale == 1
+    assert len(cache) == 0
+
+
+def test_store_survives_eviction(tmp_path):
+    """Test that evicted records are promoted back from the store."""
+    store = SQLiteRecordStore(str(tmp_path / "records.db"))
+    cache = RecordCache(maxsize=1, store=store)
+    cache.put("bib", 1, DAY1, (b"one", "N", DAY1), record=object())
+    cache.put("bib", 2, DAY1, (b"two", "N", DAY1))
+    entry = cache.get("bib", 1, DAY1)
+    assert entry.data == (b"one", "N", DAY1)
+    assert entry.record is None
+    assert RecordCache(store=SQLiteRecordStore(store.path)).get("bib", 2, DAY1)
+    assert cache.get("bib", 1, DAY2) is None
+    assert store.get("bib:1") is None
@@ -0,0 +1,24 @@
+"""Test suite for checkpoint module."""
+import pytest
+
+from pyvger.checkpoint import FileCheckpoint, SQLiteCheckpoint
+
+
+@pytest.fixture(params=[FileCheckpoint, SQLiteCheckpoint])
+def store(request, tmp_path):
+    """Each kind of checkpoint store."""
+    return request.param(str(tmp_path / "checkpoint"))
+
+
+def test_checkpoint_roundtrip(store):
+    """Test saving, loading and clearing checkpoints."""
+    assert store.load("scan") is None
+    store.save("scan", 10)
+    store.save("scan", 20)
+    store.save("other", "2020-01-01T00:00:00")
+    assert type(store)(store.path).load("scan") == 20
+    store.clear("scan")
+    assert store.load("scan") is None
+    assert store.load("other") == "2020-01-01T00:00:00"
+    store.clear()
+    assert store.load("other") is None
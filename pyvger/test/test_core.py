@@ -1,9 +1,25 @@
 """Test suite for core module."""
+import datetime
+import io
+
+import pymarc
 
 import pytest
 
+import sqlalchemy
+
 import pyvger
 import pyvger.exceptions
+from pyvger.cache import RecordCache
+from pyvger.checkpoint import FileCheckpoint
+from pyvger.test.fakebatchcat import FakeBatchCatClient
+
+
+def _marc(control_number):
+    """Build MARC bytes for a minimal record."""
+    record = pymarc.Record()
+    record.add_field(pymarc.Field(tag="001", data=str(control_number)))
+    return record.as_marc()
 
 
 def test_vger(mocker):
@@ -20,3 +36,461 @@ def test_voy_bc(mocker):
     mocker.patch("pyvger.batchcat.win32com", return_value=(0, []))
     pyvger.core.Voy(voy_username="test", voy_password="test")
     assert pyvger.batchcat.win32com.client.Dispatch.called
+
+
+def test_get_bibs(mocker):
+    """Test fetching a batch of bibs with one query."""
+    voy = pyvger.core.Voy()
+    voy.connection = mocker.Mock()
+    date = datetime.datetime(2020, 1, 1)
+    first = _marc(1)
+    voy.connection.cursor.return_value.execute.return_value = [
+        (1, first[:10], "N", date),
+        (1, first[10:], "N", date),
+        (2, _marc(2), "Y", date),
+        (4, _marc(4)[:30], "N", date),
+    ]
+    with pytest.warns(UserWarning) as warned:
+        bibs = list(voy.get_bibs([2, 3, 1, 4]))
+    assert [str(warning.message) for warning in warned] == ["No MARC data for bib 3", "Skipping record 4"]
+    assert voy.connection.cursor.return_value.execute.call_count == 1
+    assert [bib.bibid for bib in bibs] == [2, 1]
+    assert [bib["001"].data for bib in bibs] == ["2", "1"]
+    assert [bib.suppressed for bib in bibs] == [True, False]
+    assert bibs[0].last_date.tzinfo is not None
+
+
+def test_iter_mfhds_stream(mocker):
+    """Test streaming holdings from a single ordered query."""
+    voy = pyvger.core.Voy()
+    voy.connection = mocker.Mock()
+    execute = voy.connection.cursor.return_value.execute
+    date = datetime.datetime(2020, 1, 1)
+    first = _marc(10)
+    execute.return_value = [
+        (10, first[:10], "N", "hill", "Hillman", date),
+        (10, first[10:], "N", "hill", "Hillman", date),
+        (11, _marc(11), "X", "hill", "Hillman", date),
+        (12, _marc(12), "N", "law", "Law", date),
+        (13, _marc(13)[:27] + b"x" + _marc(13)[28:], "N", "law", "Law", date),
+    ]
+    with pytest.warns(UserWarning) as warned:
+        mfhds = list(voy.iter_mfhds(locations=[1, 2], last=9, stream=True))
+    assert [str(warning.message) for warning in warned] == ["Skipping record 11", "Skipping record 13"]
+    assert execute.call_count == 1
+    assert execute.call_args[0][1] == {"loc0": 1, "loc1": 2, "last": 9}
+    assert [mfhd.mfhdid for mfhd in mfhds] == [10, 12]
+    assert [mfhd.location for mfhd in mfhds] == ["hill", "law"]
+    assert mfhds[0]["001"].data == "10"
+
+
+def test_item_from_rows_several_notes():
+    """Test that an item with several notes keeps all of them."""
+    row = {
+        "item_id": 4,
+        "perm_location": 1,
+        "item_enum": "v.1",
+        "item_note": "first",
+        "chron": None,
+        "mfhd_id": 11,
+        "item_type_id": 1,
+        "caption": None,
+        "copy_number": 1,
+        "freetext": None,
+        "media_type_id": None,
+        "pieces": 1,
+        "price": 1234,
+        "spine_label": None,
+        "temp_location": None,
+        "temp_item_type_id": None,
+        "year": None,
+    }
+    rows = [row, dict(row, item_note="second")]
+    item = pyvger.core.ItemRecord.from_rows(rows, None)
+    assert item.item_id == 4
+    assert item.note == "first"
+    assert item.notes == ["first", "second"]
+    assert item.price == "12.34"
+    assert item.barcode is None
+
+
+def test_vger_pool(mocker):
+    """Test creating a Voy object backed by a session pool."""
+    mocker.patch("pyvger.core.sqla")
+    mocker.patch("pyvger.core.cx")
+    voy = pyvger.core.Voy(
+        oracleuser="foo", oraclepass="bar", oracledsn="baz", pool_max=8, pool_min=2
+    )
+    pyvger.core.cx.SessionPool.assert_called_once_with(
+        "foo",
+        "bar",
+        "baz",
+        min=2,
+        max=8,
+        increment=1,
+        threaded=True,
+        getmode=pyvger.core.cx.SPOOL_ATTRVAL_WAIT,
+    )
+    assert not pyvger.core.cx.connect.called
+    assert voy.connection is None
+    assert voy.connected
+
+    pool = pyvger.core.cx.SessionPool.return_value
+    with voy._cursor() as curs:
+        assert curs is pool.acquire.return_value.cursor.return_value
+        assert not pool.release.called
+    pool.release.assert_called_once_with(pool.acquire.return_value)
+
+    pyvger.core.cx.SessionPool.reset_mock()
+    pyvger.core.Voy(oracleuser="foo", oraclepass="bar", oracledsn="baz", pool_max=8, pool_wait_timeout="5000")
+    kwargs = pyvger.core.cx.SessionPool.call_args[1]
+    assert kwargs["getmode"] is pyvger.core.cx.SPOOL_ATTRVAL_TIMEDWAIT
+    assert kwargs["wait_timeout"] == 5000
+
+
+def test_cursor_fetch_sizes(mocker):
+    """Test that cursors get the Voy's fetch sizes unless a call overrides them."""
+    voy = pyvger.core.Voy(arraysize=1000, prefetchrows=1001)
+    voy.connection = mocker.Mock()
+    with voy._cursor() as curs:
+        assert curs.arraysize == 1000
+        assert curs.prefetchrows == 1001
+    with voy._cursor(arraysize=50) as curs:
+        assert curs.arraysize == 50
+        assert curs.prefetchrows == 1001
+
+
+def test_iter_bibs_workers_need_pool(mocker):
+    """Test that parallel iteration refuses to share a single connection."""
+    voy = pyvger.core.Voy()
+    voy.connection = mocker.Mock()
+    voy.engine = mocker.Mock()
+    voy.engine.execute.return_value = [(1,), (2,)]
+    voy.tables = mocker.MagicMock()
+    with pytest.raises(ValueError):
+        list(voy.iter_bibs(lib_id=1, include_suppressed=True, workers=2))
+
+
+def test_iter_batches_reads_ids_first(mocker):
+    """Test that workers only start once the ID query has been read, so it holds no session."""
+    voy = pyvger.core.Voy()
+    voy.pool = mocker.Mock()
+    read = []
+
+    def ids():
+        yield from range(5)
+        read.append(True)
+
+    def fetch(batch):
+        assert read
+        return batch
+
+    assert list(voy._iter_batches(fetch, ids(), 2, 2, True)) == [0, 1, 2, 3, 4]
+
+
+def test_paged_scan_checkpoints(mocker):
+    """Test that a paged scan saves progress after each page and resumes."""
+    voy = pyvger.core.Voy()
+    voy.engine = mocker.Mock()
+    voy.engine.execute.side_effect = [[(5,), (7,)], [(9,)]]
+    checkpoint = mocker.Mock()
+    checkpoint.load.return_value = 3
+    id_column = sqlalchemy.column("bib_id")
+
+    records = list(
+        voy._paged_scan(
+            sqlalchemy.select([id_column]),
+            id_column,
+            lambda batch: [n * 10 for n in batch],
+            None,
+            2,
+            checkpoint,
+            "scan",
+            500,
+            1,
+            True,
+        )
+    )
+    assert records == [50, 70, 90]
+    assert voy.engine.execute.call_count == 2
+    first_page = voy.engine.execute.call_args_list[0][0][0]
+    assert first_page.compile().params == {"bib_id_1": 3, "param_1": 2}
+    assert checkpoint.save.call_args_list == [mocker.call("scan", 7)]
+    checkpoint.clear.assert_called_once_with("scan")
+
+
+def test_paged_scan_rerun(tmp_path):
+    """Test that a finished scan starts over when run again, and an interrupted one resumes."""
+    voy = pyvger.core.Voy()
+    voy.engine = sqlalchemy.create_engine("sqlite://")
+    table = sqlalchemy.Table("bib_master", sqlalchemy.MetaData(), sqlalchemy.Column("bib_id", sqlalchemy.Integer))
+    table.create(voy.engine)
+    voy.engine.execute(table.insert(), [{"bib_id": n} for n in range(1, 6)])
+    checkpoint = FileCheckpoint(str(tmp_path / "checkpoint.json"))
+
+    def scan():
+        return voy._paged_scan(
+            sqlalchemy.select([table.c.bib_id]), table.c.bib_id, list, None, 2, checkpoint, "scan", 500, 1, True
+        )
+
+    assert list(scan()) == [1, 2, 3, 4, 5]
+    assert checkpoint.load("scan") is None
+    assert list(scan()) == [1, 2, 3, 4, 5]
+    records = scan()
+    assert [next(records) for _ in range(3)] == [1, 2, 3]
+    records.close()
+    assert list(scan()) == [3, 4, 5]
+
+
+def test_changed_scan_high_water_mark(mocker):
+    """Test that a change scan resumes from the checkpointed date and ID."""
+    voy = pyvger.core.Voy()
+    voy.engine = mocker.Mock()
+    voy.engine.execute.side_effect = [
+        [(4, datetime.datetime(2020, 1, 2)), (2, datetime.datetime(2020, 1, 3))],
+        [],
+    ]
+    voy.tables = {
+        "bib_history": sqlalchemy.Table(
+            "bib_history",
+            sqlalchemy.MetaData(),
+            sqlalchemy.Column("bib_id", sqlalchemy.Integer),
+            sqlalchemy.Column("action_date", sqlalchemy.DateTime),
+        )
+    }
+    checkpoint = mocker.Mock()
+    checkpoint.load.return_value = ["2020-01-02T00:00:00", 3]
+
+    records = list(
+        voy._changed_scan(
+            "bib_history",
+            "bib_id",
+            lambda batch: [n * 10 for n in batch],
+            None,
+            2,
+            checkpoint,
+            "changes",
+            500,
+            1,
+            True,
+        )
+    )
+    assert records == [40, 20]
+    first_page = voy.engine.execute.call_args_list[0][0][0].compile().params
+    assert first_page["bib_id_1"] == 3
+    assert datetime.datetime(2020, 1, 2) in first_page.values()
+    checkpoint.save.assert_called_once_with("changes", ["2020-01-03T00:00:00", 2])
+
+
+def test_export_raw_bibs(mocker):
+    """Test that raw export writes concatenated segments without parsing."""
+    voy = pyvger.core.Voy()
+    voy.connection = mocker.Mock()
+    curs = voy.connection.cursor.return_value
+    curs.execute.return_value = [(1, b"ab"), (1, b"c"), (2, b"d"), (3, None)]
+    buf = io.BytesIO()
+    stats = voy.export_raw_bibs(buf, bibids=[1, 2, 3])
+    assert buf.getvalue() == b"abcd"
+    assert stats["records"] == 2
+    assert stats["bytes"] == 4
+    sql, params = curs.execute.call_args[0]
+    assert "bib_data.bib_id IN (:id0, :id1, :id2)" in sql
+    assert params == {"id0": 1, "id1": 2, "id2": 3}
+    with pytest.raises(ValueError):
+        voy.export_raw_bibs(buf, lib_id=1, bibids=[1])
+
+
+def test_lazy_marc_decoding():
+    """Test that record MARC is only decoded when fields are used."""
+    marc = _marc(5)
+    bib = pyvger.core.BibRecord(marc, False, 5, None)
+    assert bib.raw_marc == marc
+    assert not bib.decoded
+    assert bib["001"].data == "5"
+    assert bib.decoded
+
+    bib = pyvger.core.BibRecord(marc, False, 5, None).project(["001", "245"])
+    assert bib["001"].data == "5"
+    assert bib.get_fields("245") == []
+    assert not bib.decoded
+
+    mfhd = pyvger.core.HoldingsRecord(b"garbage", False, 6, None, "hill", "Hillman", None)
+    assert mfhd.location == "hill"
+    assert mfhd.raw_marc == b"garbage"
+    with pytest.raises(pyvger.exceptions.PyVgerException, match="mfhd 6"):
+        mfhd.record
+
+
+def test_item_batch_round_trip():
+    """Test that items come out of a batch as they went in."""
+    items = [
+        pyvger.core.ItemRecord(
+            item_id=1, holding_id=10, enumeration="v.1", notes=["a", "b"], statuses=["Charged"]
+        ),
+        pyvger.core.ItemRecord(item_id=2, holding_id=10, temp_location_id=None, barcode="39"),
+    ]
+    batch = pyvger.core.ItemBatch.from_items(items)
+    assert len(batch) == 2
+    assert batch.column("item_id") == [1, 2]
+    assert batch.column("temp_location_id") == [None, None]
+    for original, copy in zip(items, batch):
+        for name in pyvger.core.ItemRecord.__slots__:
+            assert getattr(copy, name) == getattr(original, name)
+    assert batch[-1].barcode == "39"
+    with pytest.raises(IndexError):
+        batch[2]
+
+
+def test_load_related(mocker):
+    """Test that holdings and items are loaded for all bibs at once and reused."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    bibs = [pyvger.core.BibRecord(_marc(n), False, n, voy) for n in (1, 2, 3)]
+    mfhds = [pyvger.core.HoldingsRecord(_marc(n), False, n, voy, "hill", "Hillman", None) for n in (10, 11)]
+    items = [pyvger.core.ItemRecord(item_id=n, holding_id=10) for n in (100, 101)]
+    mocker.patch.object(voy, "_execute", return_value=[(1, 10), (1, 11), (2, 11)])
+    stream_mfhds = mocker.patch.object(voy, "_stream_mfhds", return_value=mfhds)
+    load_items = mocker.patch.object(voy, "_load_items", return_value=items)
+    voy.load_related(bibs, ["barcodes"])
+    assert stream_mfhds.call_count == load_items.call_count == 1
+    assert load_items.call_args[1]["include_barcodes"]
+    assert [h.mfhdid for h in bibs[0].holdings()] == [10, 11]
+    assert bibs[1].holdings()[0] is bibs[0].holdings()[1]
+    assert bibs[2].holdings() == []
+    assert mfhds[0].get_items(include_barcodes=True) == items
+    assert mfhds[1].get_items() == []
+    mfhds[1].get_items(include_statuses=True)
+    assert load_items.call_count == 2
+    with pytest.raises(ValueError):
+        voy.load_related(bibs, ["loans"])
+
+
+def test_save_items(mocker):
+    """Test saving items in bulk with one location lookup, collecting errors."""
+    voy = pyvger.core.Voy(cat_location="cat")
+    mocker.patch.object(voy, "get_location_id", return_value=7)
+    voy.batchcat = FakeBatchCatClient(voy, errors={2: -1})
+    items = (pyvger.core.ItemRecord(item_id=n, holding_id=10, enumeration=None) for n in (1, 2, 3))
+    stats = voy.save_items(items)
+    assert voy.get_location_id.call_count == 1
+    assert stats["saved"] == 2
+    assert stats["failed"] == 1
+    assert "UpdateItemData error" in stats["errors"][2]
+    assert [update["ItemID"] for update in voy.batchcat.bc.updates] == [1, 2, 3]
+    assert voy.batchcat.bc.updates[0]["CatLocationID"] == 7
+    assert voy.batchcat.bc.updates[0]["Enumeration"] == ""
+
+    mocker.patch.object(voy.batchcat.bc, "UpdateItemData", side_effect=RuntimeError("COM error"))
+    stats = voy.save_items([pyvger.core.ItemRecord(item_id=5)], read_ahead_size=0)
+    assert "COM error" in stats["errors"][5]
+
+
+def test_get_items_by_barcodes(mocker):
+    """Test resolving barcodes in one batch, preferring active barcodes and reporting misses and duplicates."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    rows = [
+        ("b1", 1, "1"),
+        ("b1", 2, "2"),
+        ("b2", 3, "2"),
+        ("b3", 4, "1"),
+        ("b3", 5, "1"),
+        ("b4", 6, "1"),
+    ]
+    mocker.patch.object(voy, "_execute", return_value=rows)
+    items = [pyvger.core.ItemRecord(item_id=n) for n in (1, 3, 4)]
+    load_items = mocker.patch.object(voy, "_load_items", return_value=items)
+    result = voy.get_items_by_barcodes(["b1", "b2", "b3", "b4", "b5", "b1"])
+    assert voy._execute.call_count == load_items.call_count == 1
+    assert {barcode: item.item_id for barcode, item in result["items"].items()} == {"b1": 1, "b2": 3, "b3": 4}
+    assert result["items"]["b1"].barcode == "b1"
+    assert result["items"]["b2"].barcode is None
+    assert result["misses"] == ["b4", "b5"]
+    assert result["duplicates"] == {"b3": [4, 5]}
+
+
+def test_get_items_by_barcodes_same_item(mocker):
+    """Test that two active barcodes of one item each get a record with their own barcode."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    mocker.patch.object(voy, "_execute", return_value=[("b1", 1, "1"), ("b2", 1, "1")])
+    mocker.patch.object(voy, "_load_items", return_value=[pyvger.core.ItemRecord(item_id=1)])
+    found = voy.get_items_by_barcodes(["b1", "b2"])["items"]
+    assert found["b1"].item_id == found["b2"].item_id == 1
+    assert (found["b1"].barcode, found["b2"].barcode) == ("b1", "b2")
+
+
+def test_bib_ids_and_statuses_for_items(mocker):
+    """Test the batched lookups, and bib_id_for_item with a bound-with item."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    mocker.patch.object(voy, "_execute", return_value=[(1, 10), (2, 20), (2, 21)])
+    assert voy.bib_ids_for_items([1, 2, 3]) == {1: [10], 2: [20, 21]}
+    assert voy.bib_id_for_item(2) == 20
+    voy._execute.return_value = []
+    with pytest.raises(pyvger.core.NoSuchItemException):
+        voy.bib_id_for_item(3)
+
+    statuses = mocker.patch.object(voy, "_statuses_for_items", return_value={1: ["Not Charged"]})
+    assert voy.get_item_statuses_many(["1", 2], batch_size=1) == {1: ["Not Charged"], 2: []}
+    assert statuses.call_count == 2
+
+
+def test_export_items_table_many_ids(mocker):
+    """Test that item IDs are exported with one query per 1000, in ID order."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    execute = mocker.patch.object(voy, "_execute", return_value=[])
+    stats = voy.export_items_table(io.BytesIO(), item_ids=range(2500, 0, -1), table_format="csv")
+    assert execute.call_count == 3
+    in_ = voy.tables["item"].c.item_id.in_
+    assert [len(call[0][0]) for call in in_.call_args_list] == [1000, 1000, 500]
+    assert in_.call_args_list[0][0][0][:2] == [1, 2]
+    assert stats["rows"] == 0
+
+
+def test_load_items_fetch_sizes(mocker):
+    """Test that barcode and status queries use the fetch sizes passed for the items."""
+    voy = pyvger.core.Voy()
+    voy.tables = mocker.MagicMock()
+    mocker.patch("pyvger.core.sqla")
+    mocker.patch.object(pyvger.core.ItemRecord, "select_rows")
+    execute = mocker.patch.object(voy, "_execute", side_effect=[[], [(1, "b1")], [(1, "Not Charged")]])
+    mocker.patch.object(voy, "_items_from_rows", return_value=[pyvger.core.ItemRecord(item_id=1)])
+    (item,) = voy._load_items(None, include_barcodes=True, include_statuses=True, arraysize=5000, prefetchrows=10)
+    assert (item.barcode, item.statuses) == ("b1", ["Not Charged"])
+    assert [call[0][1:] for call in execute.call_args_list] == [(5000, 10)] * 3
+
+
+def test_get_bib_cache_not_mutated(mocker):
+    """Test that projections and related records are never attached to the shared cached bib."""
+    voy = pyvger.core.Voy(record_cache=RecordCache(validate=False))
+    voy.connection = mocker.Mock()
+    fetch = mocker.patch.object(voy, "_fetch_bib", return_value=(_marc(1), "N", datetime.datetime(2020, 1, 1)))
+    load_related = mocker.patch.object(voy, "load_related")
+    projected = voy.get_bib(1, fields=["001"])
+    shared = voy.get_bib(1)
+    assert shared is not projected
+    assert voy.get_bib(1) is shared
+    assert voy.get_bib(1, fields=["001"]) is not shared
+    assert voy.get_bib(1, include=["holdings"]) is not shared
+    assert load_related.call_args[0][0][0] is not shared
+    assert fetch.call_count == 1
+    assert shared._projection is None
+
+
+def test_holdings_get_bib_uses_projection(mocker):
+    """Test that a projected holdings record finds its bib without a full decode."""
+    voy = mocker.Mock(tracer=None)
+    record = pymarc.Record()
+    record.add_field(pymarc.Field(tag="004", data="42"))
+    mfhd = pyvger.core.HoldingsRecord(record.as_marc(), False, 10, voy, "hill", "Hillman", None)
+    mfhd.project(["004"])
+    mfhd.get_bib()
+    voy.get_bib.assert_called_once_with("42")
+    assert not mfhd.decoded
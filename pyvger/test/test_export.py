@@ -0,0 +1,64 @@
+"""Test suite for export module."""
+import datetime
+import io
+
+import pytest
+
+from pyvger import export
+
+COLUMNS = [("id", "int"), ("name", "str"), ("flag", "bool"), ("date", "datetime"), ("notes", "list")]
+DATA = {
+    "id": [1, 2],
+    "name": ["one", None],
+    "flag": [True, False],
+    "date": [datetime.datetime(2020, 1, 2, 3, 4, 5), None],
+    "notes": [["a", "b"], []],
+}
+
+
+def test_table_format():
+    """Test that formats are taken from file name endings."""
+    assert export.table_format("items.parquet") == "parquet"
+    assert export.table_format("items.csv.gz") == "csv"
+    assert export.table_format(io.BytesIO()) == "csv"
+    assert export.table_format("items.csv", "arrow") == "arrow"
+    with pytest.raises(ValueError):
+        export.table_format("items.csv", "xlsx")
+
+
+def test_csv_table_writer():
+    """Test that the CSV writer writes a header and joins lists, leaving the stream open."""
+    fp = io.BytesIO()
+    writer = export.table_writer(fp, COLUMNS, "csv")
+    writer.write(DATA)
+    writer.close()
+    assert fp.getvalue().decode("utf-8").splitlines() == [
+        "id,name,flag,date,notes",
+        "1,one,True,2020-01-02 03:04:05,a | b",
+        "2,,False,,",
+    ]
+
+
+@pytest.mark.parametrize("table_format", ["arrow", "parquet"])
+def test_arrow_table_writer(table_format):
+    """Test that Arrow and Parquet files read back with their types."""
+    pyarrow = pytest.importorskip("pyarrow")
+    fp = io.BytesIO()
+    writer = export.table_writer(fp, COLUMNS, table_format)
+    writer.write(DATA)
+    writer.write({name: [] for name, _ in COLUMNS})
+    writer.close()
+    fp.seek(0)
+    if table_format == "parquet":
+        table = pyarrow.parquet.read_table(fp)
+    else:
+        table = pyarrow.ipc.open_file(fp).read_all()
+    assert table.schema.field("notes").type == pyarrow.list_(pyarrow.string())
+    assert table.to_pydict() == DATA
+
+
+def test_arrow_not_available(mocker):
+    """Test that Arrow output without pyarrow raises a clear error."""
+    mocker.patch.object(export, "pyarrow", None)
+    with pytest.raises(export.ArrowNotAvailableError):
+        export.table_writer(io.BytesIO(), COLUMNS, "parquet")
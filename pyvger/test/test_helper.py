@@ -0,0 +1,92 @@
+"""Test suite for helper module."""
+import gzip
+import io
+import itertools
+import threading
+import time
+
+import pytest
+
+from pyvger.helper import chunked, output_stream, parallel_batches, read_ahead
+
+
+def test_chunked():
+    """Test splitting an iterable into lists."""
+    assert list(chunked(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(chunked([], 2)) == []
+
+
+def test_output_stream(tmp_path):
+    """Test compressing by file name, and leaving streams open."""
+    path = str(tmp_path / "out.mrc.gz")
+    with output_stream(path) as fp:
+        fp.write(b"data")
+    with gzip.open(path) as fp:
+        assert fp.read() == b"data"
+
+    buf = io.BytesIO()
+    with output_stream(buf) as fp:
+        fp.write(b"data")
+    assert buf.getvalue() == b"data"
+    with output_stream(buf, compress=True) as fp:
+        fp.write(b"more")
+    assert not buf.closed
+    assert gzip.decompress(buf.getvalue()[4:]) == b"more"
+
+
+def test_parallel_batches_ordered():
+    """Test that ordered results keep the order of the batches."""
+
+    def fetch(batch):
+        time.sleep(0.01 * (5 - batch[0]))
+        return [n * 10 for n in batch]
+
+    batches = [[n] for n in range(5)]
+    results = list(parallel_batches(fetch, batches, workers=3))
+    assert results == [[0], [10], [20], [30], [40]]
+
+
+def test_parallel_batches_unordered():
+    """Test that unordered results are yielded as they finish."""
+    release = threading.Event()
+
+    def fetch(batch):
+        if batch == ["slow"]:
+            release.wait(5)
+        return batch
+
+    results = parallel_batches(fetch, [["slow"], ["fast"]], workers=2, ordered=False)
+    assert next(results) == ["fast"]
+    release.set()
+    assert list(results) == [["slow"]]
+
+
+def test_parallel_batches_bounded():
+    """Test that only a bounded number of batches is submitted ahead."""
+    submitted = []
+
+    def batches():
+        for n in range(100):
+            submitted.append(n)
+            yield [n]
+
+    results = parallel_batches(lambda batch: batch, batches(), workers=2, prefetch=2)
+    next(results)
+    assert len(submitted) <= 5
+    results.close()
+
+
+def test_read_ahead():
+    """Test reading ahead of the consumer, passing on errors and stopping early."""
+    assert list(read_ahead(range(10), 3)) == list(range(10))
+
+    def failing():
+        yield 1
+        raise KeyError("boom")
+
+    with pytest.raises(KeyError):
+        list(read_ahead(failing(), 3))
+
+    reader = read_ahead(itertools.count(), 2)
+    assert next(reader) == 0
+    reader.close()
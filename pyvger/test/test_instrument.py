@@ -0,0 +1,59 @@
+"""Test suite for instrument module."""
+import sqlite3
+
+import pytest
+
+import sqlalchemy
+
+import pyvger.core
+from pyvger.instrument import normalize_statement
+
+
+def test_normalize_statement():
+    """Test that statements differing in IN list length are counted as one."""
+    assert normalize_statement("SELECT x\n  FROM t WHERE id IN (:bib0, :bib1, :bib2)") == (
+        "SELECT x FROM t WHERE id IN (:bib...)"
+    )
+    assert normalize_statement("WHERE a IN (?, ?) AND b = ?") == "WHERE a IN (?...) AND b = ?"
+
+
+def test_instrumented_voy(mocker):
+    """Test counting raw and sqlalchemy statements, rows and N+1 patterns."""
+    voy = pyvger.core.Voy()
+    voy.connection = sqlite3.connect(":memory:")
+    voy.connection.execute("ATTACH DATABASE ':memory:' AS pittdb")
+    voy.connection.execute("CREATE TABLE pittdb.bib_mfhd (bib_id INTEGER, mfhd_id INTEGER)")
+    voy.connection.executemany("INSERT INTO pittdb.bib_mfhd VALUES (1, ?)", [(n,) for n in range(25)])
+    voy.engine = sqlalchemy.create_engine("sqlite://", creator=lambda: voy.connection)
+    sqlalchemy.event.listen(voy.engine, "before_cursor_execute", voy._before_cursor_execute)
+    sqlalchemy.event.listen(voy.engine, "after_cursor_execute", voy._after_cursor_execute)
+    instrumentation = voy.instrument()
+
+    def get_mfhd(mfhdid):
+        with voy._cursor() as curs:
+            return curs.execute("SELECT ?", (mfhdid,)).fetchone()
+
+    mocker.patch.object(voy, "get_mfhd", side_effect=get_mfhd)
+    bib = pyvger.core.BibRecord(b"", False, 1, voy)
+    with pytest.warns(UserWarning, match="N\\+1 queries: .*holdings ran the same statement 20 times"):
+        assert len(bib.holdings()) == 25
+    rows = list(voy._execute(sqlalchemy.select([sqlalchemy.literal(1)]).union_all(sqlalchemy.select([2]))))
+    assert len(rows) == 2
+
+    stats = {s["statement"]: s for s in instrumentation.as_dict()["statements"]}
+    listing = stats["SELECT mfhd_id FROM pittdb.bib_mfhd WHERE bib_mfhd.bib_id=:bib"]
+    assert listing["api"].endswith("holdings")
+    assert (listing["count"], listing["rows"]) == (1, 25)
+    assert stats["SELECT ?"]["count"] == 25
+    assert sum(stats["SELECT ?"]["histogram"].values()) == 25
+    assert [s["rows"] for s in stats.values() if s["api"].endswith("_execute")] == [2]
+    assert instrumentation.n_plus_one()[0]["executions"] == 25
+
+    text = instrumentation.prometheus()
+    assert '# TYPE pyvger_statement_seconds histogram' in text
+    assert 'pyvger_statement_seconds_bucket{api="' in text
+    assert 'le="+Inf"} 25' in text
+
+    voy.instrumentation = None
+    with voy._cursor() as curs:
+        assert isinstance(curs, sqlite3.Cursor)
@@ -0,0 +1,68 @@
+"""Test suite for marc module."""
+import pymarc
+
+import pytest
+
+from pyvger.core import BibRecord
+from pyvger.marc import decode_records, extract_fields
+
+
+def _record():
+    """Build MARC bytes with control, repeated and unwanted fields."""
+    record = pymarc.Record(force_utf8=True)
+    record.add_field(pymarc.Field(tag="001", data="42"))
+    record.add_field(
+        pymarc.Field(
+            tag="245",
+            indicators=["1", "0"],
+            subfields=[pymarc.Subfield("a", "Café :"), pymarc.Subfield("b", "a subtitle")],
+        )
+    )
+    for value in ("one", "two"):
+        record.add_field(
+            pymarc.Field(tag="500", indicators=[" ", " "], subfields=[pymarc.Subfield("a", value)])
+        )
+    return record.as_marc()
+
+
+def test_extract_fields_matches_pymarc():
+    """Test that projected fields read the same as pymarc's."""
+    marc = _record()
+    fields = extract_fields(marc, ["001", "500", "245"])
+    assert [str(field) for field in fields] == [
+        str(field) for field in pymarc.Record(marc).get_fields("001", "245", "500")
+    ]
+    title = fields[1]
+    assert title["a"] == "Café :"
+    assert title.indicator1 == "1"
+    assert title.get("z") is None
+    assert title.get_subfields("a", "b") == ["Café :", "a subtitle"]
+    assert fields[0].value() == "42"
+    assert extract_fields(marc, ["650"]) == []
+
+
+def test_extract_fields_malformed():
+    """Test that a malformed leader is an error."""
+    with pytest.raises(ValueError):
+        extract_fields(b"garbage", ["245"])
+
+
+def _title(record):
+    """Get the title of a pymarc record, in a worker process."""
+    return record["245"]["a"]
+
+
+def test_decode_records():
+    """Test decoding records in a process pool, skipping bad ones."""
+    bibs = [BibRecord(_record(), False, n, None) for n in (1, 2, 3)]
+    bibs[1] = BibRecord(b"garbage", False, 2, None)
+    with pytest.warns(UserWarning, match="Skipping record 2"):
+        decoded = list(decode_records(iter(bibs), workers=2, batch_size=2))
+    assert decoded == [bibs[0], bibs[2]]
+    assert decoded[0].decoded
+    assert decoded[1]["001"].data == "42"
+
+    bibs = [BibRecord(_record(), False, n, None) for n in (1, 2)]
+    results = list(decode_records(bibs, workers=2, transform=_title))
+    assert results == [(bibs[0], "Café :"), (bibs[1], "Café :")]
+    assert not bibs[0].decoded
@@ -0,0 +1,96 @@
+"""Test suite for schema module."""
+import pytest
+
+import sqlalchemy as sqla
+
+from pyvger.schema import LazyTables, SchemaCache
+
+
+def _metadata():
+    metadata = sqla.MetaData()
+    sqla.Table(
+        "item", metadata, sqla.Column("item_id", sqla.Integer), schema="pittdb"
+    )
+    return metadata
+
+
+def test_schema_cache_roundtrip(tmp_path):
+    """Test that cached metadata is returned while the fingerprint matches."""
+    cache = SchemaCache(str(tmp_path / "schema.cache"))
+    assert cache.load("db", "abc") is None
+    cache.store("db", "abc", _metadata())
+    loaded = SchemaCache(cache.path).load("db", "abc")
+    assert "pittdb.item" in loaded.tables
+    assert cache.load("db", "changed") is None
+    assert cache.load("other", "abc") is None
+
+
+def test_schema_cache_invalidate(tmp_path):
+    """Test removing one entry and the whole cache."""
+    cache = SchemaCache(str(tmp_path / "schema.cache"))
+    cache.store("db", "abc", _metadata())
+    cache.store("other", "abc", _metadata())
+    cache.invalidate("db")
+    assert cache.load("db", "abc") is None
+    assert cache.load("other", "abc") is not None
+    cache.invalidate()
+    assert cache.load("other", "abc") is None
+
+
+def test_schema_cache_unreadable(tmp_path):
+    """Test that a corrupt cache file is treated as empty."""
+    path = tmp_path / "schema.cache"
+    path.write_bytes(b"not a pickle")
+    assert SchemaCache(str(path)).load("db", "abc") is None
+
+
+@pytest.fixture
+def engine():
+    """In-memory database with a schema of three small tables."""
+    engine = sqla.create_engine("sqlite://")
+    engine.execute("ATTACH DATABASE ':memory:' AS pittdb")
+    engine.execute("CREATE TABLE pittdb.item (item_id INTEGER)")
+    engine.execute("CREATE TABLE pittdb.item_barcode (item_id INTEGER)")
+    engine.execute("CREATE TABLE pittdb.patron (patron_id INTEGER)")
+    return engine
+
+
+def test_lazy_tables(engine):
+    """Test that tables are reflected and related only when accessed."""
+    relations = [(("item", "item_id"), ("item_barcode", "item_id"))]
+    tables = LazyTables(
+        engine, "pittdb", ["item", "item_barcode", "patron"], relations
+    )
+    assert not tables.metadata.tables
+    item = tables["item"]
+    assert list(tables.metadata.tables) == ["pittdb.item"]
+    barcode = tables["item_barcode"]
+    assert item.c.item_id.references(barcode.c.item_id)
+    assert "pittdb.patron" not in tables.metadata.tables
+    with pytest.raises(KeyError):
+        tables["circ_transactions"]
+
+
+def test_lazy_tables_register(engine):
+    """Test registering a table that isn't in the default list."""
+    tables = LazyTables(engine, "pittdb", ["item"], [])
+    item = tables["item"]
+    tables.register(
+        "item_barcode", [(("item", "item_id"), ("item_barcode", "item_id"))]
+    )
+    assert "item_barcode" in tables
+    assert item.c.item_id.references(tables["item_barcode"].c.item_id)
+
+
+def test_lazy_tables_cache(engine, tmp_path):
+    """Test that reflected tables are saved to and loaded from the cache."""
+    cache = SchemaCache(str(tmp_path / "schema.cache"))
+    tables = LazyTables(
+        engine, "pittdb", ["item"], [], cache, "db", fingerprint=lambda: "abc"
+    )
+    tables["item"]
+    cached = LazyTables(
+        None, "pittdb", ["item"], [], cache, "db", fingerprint=lambda: "abc"
+    )
+    assert "pittdb.item" in cached.metadata.tables
+    assert cached["item"].c.item_id is not None
@@ -0,0 +1,49 @@
+"""Test suite for tracing module."""
+import datetime
+import io
+import json
+
+import pymarc
+
+import pyvger.core
+from pyvger.tracing import CallbackExporter, ChromeTraceExporter, NULL_SPAN, Tracer, span
+
+
+def _marc(control_number):
+    """Build the bytes of a MARC record with only an 001 field."""
+    record = pymarc.Record()
+    record.add_field(pymarc.Field(tag="001", data=control_number))
+    return record.as_marc()
+
+
+def test_traced_stages():
+    """Test that building and decoding a bib reports each stage, and that sampling keeps records whole."""
+    events = []
+    voy = pyvger.core.Voy(tracer=Tracer(CallbackExporter(events.append)))
+    bib = voy._make_bib(7, _marc("7"), "N", datetime.datetime(2020, 1, 2))
+    assert bib["001"].data == "7"
+    assert [event["name"] for event in events] == ["arrow.get", "construct", "decode"]
+    assert all(event["args"] == {"record_id": 7} and event["duration"] >= 0 for event in events)
+
+    tracer = Tracer(CallbackExporter(events.append), sample_rate=0.5)
+    sampled = [record_id for record_id in range(1000) if tracer.sampled(record_id)]
+    assert 400 < len(sampled) < 600
+    assert all((tracer.span("decode", record_id) is NULL_SPAN) == (record_id not in sampled) for record_id in range(50))
+    assert tracer.span("fetch") is not NULL_SPAN
+    assert span(None, "fetch") is NULL_SPAN
+
+
+def test_chrome_trace_exporter():
+    """Test that the trace is a JSON array of complete events."""
+    out = io.BytesIO()
+    tracer = Tracer(ChromeTraceExporter(out))
+    with tracer.span("fetch") as fetch_span:
+        fetch_span.set(records=2)
+    with tracer.span("join", 1):
+        pass
+    tracer.close()
+    events = json.loads(out.getvalue())
+    assert [(event["name"], event["ph"]) for event in events] == [("fetch", "X"), ("join", "X")]
+    assert events[0]["args"] == {"records": 2}
+    assert events[1]["args"] == {"record_id": 1}
+    assert events[1]["ts"] >= events[0]["ts"] + events[0]["dur"]
@@ -0,0 +1,202 @@
+"""Lightweight tracing of the stages records go through, from fetching to building record objects."""
+import json
+import os
+import threading
+import time
+import zlib
+
+from pyvger.helper import output_stream
+
+
+class _NullSpan(object):
+    """Span that records nothing, used when tracing is off or a record isn't sampled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **args):
+        """Do nothing."""
+
+
+NULL_SPAN = _NullSpan()
+
+
+def span(tracer, name, record_id=None):
+    """Start a span if there is a tracer, or get a span that does nothing.
+
+    :param tracer: Tracer, or None
+    :param name: stage name
+    :param record_id: ID of the record the stage works on, or None for stages working on batches
+    :return: context manager giving the span
+    """
+    if tracer is None:
+        return NULL_SPAN
+    return tracer.span(name, record_id)
+
+
+class Span(object):
+    """
+    A timed stage, as a context manager.
+
+    :param tracer: Tracer to report to
+    :param name: stage name
+    :param record_id: ID of the record the stage works on, or None
+    """
+
+    __slots__ = ("tracer", "name", "record_id", "args", "start")
+
+    def __init__(self, tracer, name, record_id=None):
+        self.tracer = tracer
+        self.name = name
+        self.record_id = record_id
+        self.args = None
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.tracer._finish(self, time.perf_counter())
+        return False
+
+    def set(self, **args):
+        """Attach values to the span, such as the number of rows fetched."""
+        if self.args is None:
+            self.args = {}
+        self.args.update(args)
+
+
+class Tracer(object):
+    """
+    Times the stages of record pipelines and passes the spans to an exporter.
+
+    Stages working on a single record (segment join, decode, date
+    conversion, construction) are traced for a sample of records: a
+    record is either traced in every stage or in none, chosen by a hash
+    of its ID, so traces stay small enough to leave on in production.
+    Stages working on a whole batch, such as a query for a batch of
+    records, are always traced.
+
+    Pass it to Voy(tracer=...) or set a Voy's tracer attribute; with no
+    tracer, a stage costs one function call.
+
+    :param exporter: object with an export(event) method taking a dict, and a close() method,
+        such as ChromeTraceExporter or CallbackExporter
+    :param sample_rate: fraction of records to trace
+    """
+
+    def __init__(self, exporter, sample_rate=1.0):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self._threshold = int(sample_rate * 0xFFFFFFFF)
+        self.epoch = time.perf_counter()
+
+    def sampled(self, record_id):
+        """Whether a record is traced."""
+        if self.sample_rate >= 1:
+            return True
+        return zlib.crc32(str(record_id).encode("ascii")) <= self._threshold
+
+    def span(self, name, record_id=None):
+        """Start a span.
+
+        :param name: stage name
+        :param record_id: ID of the record the stage works on, or None for stages working on batches
+        :return: Span, or a span that does nothing if the record isn't sampled
+        """
+        if record_id is not None and not self.sampled(record_id):
+            return NULL_SPAN
+        return Span(self, name, record_id)
+
+    def _finish(self, finished, end):
+        event = {
+            "name": finished.name,
+            "start": finished.start - self.epoch,
+            "duration": end - finished.start,
+            "thread": threading.get_ident(),
+            "args": finished.args or {},
+        }
+        if finished.record_id is not None:
+            event["args"]["record_id"] = finished.record_id
+        self.exporter.export(event)
+
+    def close(self):
+        """Close the exporter."""
+        self.exporter.close()
+
+
+class CallbackExporter(object):
+    """
+    Pass each finished span to a function.
+
+    Events are dicts of name, start and duration (seconds, with start
+    relative to the tracer's creation), thread and args (including
+    record_id for record stages).
+
+    :param callback: function taking an event dict
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def export(self, event):
+        """Pass on an event."""
+        self.callback(event)
+
+    def close(self):
+        """Do nothing."""
+
+
+class ChromeTraceExporter(object):
+    """
+    Write spans as Chrome trace events, for chrome://tracing or Perfetto.
+
+    Events are written as they finish, so memory use doesn't grow with
+    the length of the trace; the file is complete once the exporter (or
+    its tracer) is closed.
+
+    :param dest: path or writable binary stream
+    """
+
+    def __init__(self, dest):
+        self._context = output_stream(dest)
+        self._fp = self._context.__enter__()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._first = True
+        self._fp.write(b"[")
+
+    def export(self, event):
+        """Write an event."""
+        line = json.dumps(
+            {
+                "name": event["name"],
+                "cat": "pyvger",
+                "ph": "X",
+                "ts": event["start"] * 1e6,
+                "dur": event["duration"] * 1e6,
+                "pid": self._pid,
+                "tid": event["thread"],
+                "args": event["args"],
+            },
+            default=str,
+        ).encode("utf-8")
+        with self._lock:
+            self._fp.write(line if self._first else b",\n" + line)
+            self._first = False
+
+    def close(self):
+        """Finish the trace and close the file if the exporter opened it."""
+        with self._lock:
+            if self._fp is None:
+                return
+            self._fp.write(b"]\n")
+            self._fp.flush()
+            self._context.__exit__(None, None, None)
+            self._fp = None
@@ -24,6 +24,6 @@ setup(
         "six",
         "arrow",
     ],
-    extras_require={"BatchCat": ["pywin32"]},
+    extras_require={"BatchCat": ["pywin32"], "Arrow": ["pyarrow"]},
     tests_require=["mock", "pytest", "pytest-mock"],
 )